@@ -0,0 +1,77 @@
+"""
+Import time benchmark for elijere.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter, reports the
+cumulative import time of the module and of its heaviest dependencies, and fails if
+the budget is exceeded or if a training / evaluation / plotting dependency is loaded.
+
+Usage: python benchmarks/importtime.py [--module elijere.model] [--budget 1.0] [--top 10]
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# only needed to train, evaluate or plot, or to parse texts, they must not be loaded on import
+FORBIDDEN = ['pandas', 'sklearn', 'scipy', 'matplotlib', 'Levenshtein', 'nervaluate', 'spacy']
+
+
+def importTime(module: str) -> dict:
+    """
+    Imports module in a fresh interpreter with -X importtime
+
+    :param module: Module to import
+    :type module: str
+    :return: Dictionary of cumulative import time in seconds for each imported module
+    :rtype: dict
+    """
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([SRC, env.get('PYTHONPATH', '')])
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], env=env, capture_output=True, text=True)
+    if res.returncode != 0:
+        raise Exception(f'Could not import {module}:\n{res.stderr}')
+
+    # lines are formatted as "import time: self [us] | cumulative | imported package"
+    dict_time = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        dict_time[name.strip()] = int(cumulative) / 1e6
+
+    return dict_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import time benchmark for elijere')
+    parser.add_argument('--module', default='elijere.model')
+    parser.add_argument('--budget', type=float, default=1.0, help='Maximum import time in seconds')
+    parser.add_argument('--top', type=int, default=10, help='Number of heaviest top level dependencies to show')
+    args = parser.parse_args()
+
+    dict_time = importTime(args.module)
+    total = dict_time[args.module]
+
+    top_level = {k: v for k, v in dict_time.items() if '.' not in k and k != args.module}
+    for name, t in sorted(top_level.items(), key=lambda x: x[1], reverse=True)[:args.top]:
+        print(f'{name:<30} {t:.3f}s')
+    print(f'{args.module:<30} {total:.3f}s (budget {args.budget:.3f}s)')
+
+    errors = []
+    loaded = [x for x in FORBIDDEN if x in dict_time]
+    if loaded:
+        errors.append(f'{args.module} imports {", ".join(loaded)}')
+    if total > args.budget:
+        errors.append(f'{args.module} takes {total:.3f}s to import, over the {args.budget:.3f}s budget')
+
+    if errors:
+        print('\n'.join(errors))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Load generator for the elijere HTTP service (python -m elijere.server).
+
+Sends POST /extract requests over keep-alive connections, with a fixed number of concurrent clients,
+then reports the throughput, the latency percentiles and the number of requests by status, e.g. the
+503 answers given when the queue of the server is full.
+
+Usage: python benchmarks/loadgen.py [--url http://127.0.0.1:8000] [--texts sentences.txt] [--requests 1000] [--concurrency 32]
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+from urllib.parse import urlparse
+
+# used when no file of texts is given
+TEXTS = [
+    'George Washington was born on February 22, 1732.',
+    'Marie Curie studied in Paris.',
+    'Victor Hugo died in Paris in 1885.',
+    'Ada Lovelace worked with Charles Babbage.',
+    'Frida Kahlo married Diego Rivera in 1929.',
+]
+
+
+async def client(host: str, port: int, texts: list, n_requests: int, latencies: list, statuses: Counter, rng: random.Random) -> None:
+    """
+    Sends n_requests requests over a single keep-alive connection
+
+    :param host: Host of the service
+    :type host: str
+    :param port: Port of the service
+    :type port: int
+    :param texts: Texts to send, chosen at random
+    :type texts: list
+    :param n_requests: Number of requests to send
+    :type n_requests: int
+    :param latencies: List where the latency of each request is added
+    :type latencies: list
+    :param statuses: Counter of the status of the answers
+    :type statuses: Counter
+    :param rng: Random generator
+    :type rng: random.Random
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(n_requests):
+            body = json.dumps({"text": rng.choice(texts)}).encode('utf-8')
+            request = (
+                f'POST /extract HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+                f'Content-Length: {len(body)}\r\n\r\n'
+            ).encode('latin-1') + body
+
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                key, _, value = line.decode('latin-1').partition(':')
+                if key.strip().lower() == 'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.
+
+
+async def run(args: argparse.Namespace, texts: list) -> dict:
+    url = urlparse(args.url)
+    latencies, statuses = [], Counter()
+
+    # requests are shared among the clients
+    n_requests = [args.requests // args.concurrency + (1 if i < args.requests % args.concurrency else 0) for i in range(args.concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(url.hostname, url.port or 80, texts, n, latencies, statuses, random.Random(args.seed + i))
+        for i, n in enumerate(n_requests) if n
+    ])
+    duration = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies),
+        "concurrency": args.concurrency,
+        "seconds": duration,
+        "requests_per_second": len(latencies) / duration,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "latency": {
+            "mean": sum(latencies) / len(latencies) if latencies else 0.,
+            "p50": percentile(latencies, .5),
+            "p90": percentile(latencies, .9),
+            "p99": percentile(latencies, .99),
+            "max": max(latencies, default=0.)
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load generator for the elijere HTTP service')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--texts', default='', help='File with one text per line')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32, help='Number of concurrent connections')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='', help='Path of the JSON results')
+    args = parser.parse_args()
+
+    texts = TEXTS
+    if args.texts:
+        with open(args.texts, 'r', encoding='utf-8') as f:
+            texts = [x.strip() for x in f if x.strip()]
+
+    report = asyncio.run(run(args, texts))
+    print(json.dumps(report, indent=4))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
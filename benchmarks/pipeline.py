@@ -0,0 +1,168 @@
+"""
+Pipeline benchmark for elijere.
+
+Generates synthetic corpora of increasing size with benchmarks/synthetic.py, then times each stage
+of the pipeline on them: loading and preparing the corpus, building the Indices, loading the model,
+and inference on held-out sentences (predict on their SDP graphs, extractCandidatesFromGraph on their
+dependency graphs, and extractFacts on their Docs). Results are written as JSON, alongside the commit
+they were measured on, and can be compared with the results of another commit with --baseline.
+
+Usage: python benchmarks/pipeline.py [--scales 100,1000] [--output pipeline.json] [--baseline previous.json]
+"""
+
+import os
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from datetime import datetime
+
+# also adds src to the path
+from synthetic import generateCorpus
+from elijere.utils import loadCorpus, prepare_corpus
+from elijere.model import ELIJERE, SyntacticIndex, SemanticIndex
+
+# stages of the pipeline, in the order they are run
+STAGES = ['loadCorpus', 'prepare_corpus', 'trainSyntacticIndex', 'trainSemanticIndex', 'load_model', 'predict', 'extractCandidatesFromGraph', 'extractFacts']
+
+
+def timeStage(func, *args, **kwargs) -> tuple:
+    """
+    Runs func, without its progress messages
+
+    :param func: Function to time
+    :type func: Callable
+    :return: Result of func and its duration in seconds
+    :rtype: tuple
+    """
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        res = func(*args, **kwargs)
+        duration = time.perf_counter() - start
+    return res, duration
+
+
+def runScale(n_docs: int, args: argparse.Namespace) -> dict:
+    """
+    Benchmarks the pipeline on a synthetic corpus of n_docs documents
+
+    :param n_docs: Number of documents of the training corpus
+    :type n_docs: int
+    :param args: Parameters of the benchmark
+    :type args: argparse.Namespace
+    :return: Duration in seconds and number of items processed by each stage
+    :rtype: dict
+    """
+    savepath = tempfile.mkdtemp(prefix=f'elijere_bench_{n_docs}_')
+    anchor_textvalue = ['lemma', 'pos']
+    results = {}
+
+    try:
+        for _ in generateCorpus(n_docs, args.sents, args.relations, skew=args.skew, seed=args.seed, savepath=savepath):
+            pass
+        # held-out sentences for inference, from the same relations
+        heldout = list(generateCorpus(max(1, args.queries // args.sents), args.sents, args.relations, skew=args.skew, seed=args.seed + 1))
+        sdpgraphs = [sdp['sdpgraph'] for document, _ in heldout for dict_sent in document['content'] for dict_prop in dict_sent['props']
+                     if dict_prop['prop'] != 'Other' for sdp in dict_prop['sdpgraphs'] if not isinstance(sdp['sdpgraph'], str)]
+        graphs = [dict_sent['graph'] for document, _ in heldout for dict_sent in document['content']]
+        docs = [doc for _, list_docs in heldout for doc in list_docs]
+
+        corpus, results['loadCorpus'] = timeStage(loadCorpus, savepath)
+        data, results['prepare_corpus'] = timeStage(prepare_corpus, corpus, train_size=1, clean=True)
+
+        _, results['trainSyntacticIndex'] = timeStage(
+            SyntacticIndex().trainSyntacticIndex, list_graphs=data['X_train'], anchor_textvalue=anchor_textvalue,
+            graphkey='sdpgraph', propkey='prop', savepath=savepath
+        )
+        _, results['trainSemanticIndex'] = timeStage(
+            SemanticIndex().trainSemanticIndex, list_graphs=data['X_train'], textvalue=anchor_textvalue, removePROPN=True, savepath=savepath
+        )
+
+        with open(f"{savepath}/model/elijere_config.json", 'w', encoding='utf-8') as f:
+            json.dump({"spacy_model": "blank:en", "anchor_textvalue": anchor_textvalue}, f, indent=4)
+
+        model = ELIJERE()
+        # inference is run on Docs, the spaCy model is not needed
+        _, results['load_model'] = timeStage(model.load_model, savepath, load_nlp=False)
+
+        _, results['predict'] = timeStage(lambda: [model.predict(x) for x in sdpgraphs])
+        _, results['extractCandidatesFromGraph'] = timeStage(lambda: [list(model.extractCandidatesFromGraph(x)) for x in graphs])
+        _, results['extractFacts'] = timeStage(lambda: [model.extractFacts(x) for x in docs])
+
+        sizes = {
+            'loadCorpus': n_docs,
+            'prepare_corpus': len(corpus),
+            'trainSyntacticIndex': len(data['X_train']),
+            'trainSemanticIndex': len(data['X_train']),
+            'load_model': 1,
+            'predict': len(sdpgraphs),
+            'extractCandidatesFromGraph': len(graphs),
+            'extractFacts': len(docs),
+        }
+    finally:
+        if not args.keep:
+            shutil.rmtree(savepath, ignore_errors=True)
+
+    return {stage: {"seconds": results[stage], "n": sizes[stage], "per_second": sizes[stage] / results[stage] if results[stage] else None} for stage in STAGES}
+
+
+def getCommit() -> str:
+    res = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    return res.stdout.strip() if res.returncode == 0 else ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pipeline benchmark for elijere')
+    parser.add_argument('--scales', default='100,1000', help='Comma separated numbers of training documents')
+    parser.add_argument('--sents', type=int, default=5, help='Number of sentences per document')
+    parser.add_argument('--relations', type=int, default=20)
+    parser.add_argument('--skew', type=float, default=1.1, help='Exponent of the Zipf distribution of relations and verbs')
+    parser.add_argument('--queries', type=int, default=500, help='Number of held-out sentences for inference')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='pipeline.json', help='Path of the JSON results')
+    parser.add_argument('--baseline', default='', help='JSON results of a previous run to compare with')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated projects')
+    args = parser.parse_args()
+
+    scales = [int(x) for x in args.scales.split(',')]
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    # imported lazily by the package, imported here so that their import time is not counted in the first scale
+    import pandas
+    import sklearn.feature_extraction.text
+
+    results = {}
+    for n_docs in scales:
+        print(f'Scale {n_docs} documents')
+        results[str(n_docs)] = runScale(n_docs, args)
+
+        for stage, res in results[str(n_docs)].items():
+            line = f'  {stage:<28} {res["seconds"]:>9.3f}s {res["n"]:>8} items'
+            if stage in baseline.get(str(n_docs), {}):
+                # compared by item, as the number of items can change with the parameters
+                previous = baseline[str(n_docs)][stage]
+                line += f'  x{(res["seconds"] / res["n"]) / (previous["seconds"] / previous["n"]):.2f} vs baseline'
+            print(line)
+
+    report = {
+        "commit": getCommit(),
+        "date": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {k: v for k, v in vars(args).items() if k not in ('output', 'baseline', 'keep')},
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4)
+    print(f'Results saved in {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,339 @@
+"""
+Synthetic corpus generator for the elijere benchmarks.
+
+Writes documents in the same graph_<id>.json format as the Processor, so that they can be
+loaded with loadCorpus and used to build the Indices, without depending on Wikidata or on a
+trained spaCy model. Sentences are built from templates giving realistic dependency trees
+(compound names, passive auxiliaries, prepositional attachments, appositions, adverbial clauses),
+and the trigger verbs of the relations follow a Zipf distribution, so that a few anchors group
+most of the patterns, as in DARES.
+
+Usage: python benchmarks/synthetic.py --savepath projects/synthetic [--docs 1000] [--sents 5] [--relations 20] [--seed 0]
+"""
+
+import os
+import sys
+import random
+import argparse
+from itertools import accumulate
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC)
+
+from spacy.tokens import Doc
+from spacy.vocab import Vocab
+from elijere.utils import doc2graph, getSDPsFromHeads, saveDocument
+
+VERBS = [
+    'bear', 'die', 'marry', 'work', 'found', 'live', 'study', 'write', 'teach', 'direct',
+    'play', 'compose', 'build', 'design', 'lead', 'join', 'own', 'train', 'publish', 'paint',
+    'serve', 'represent', 'coach', 'produce', 'elect', 'appoint', 'bury', 'educate', 'employ', 'sign',
+]
+NOUNS = ['painter', 'writer', 'politician', 'composer', 'engineer', 'actor', 'architect', 'scientist']
+ADJECTIVES = ['famous', 'young', 'french', 'american', 'local', 'former']
+FIRST_NAMES = ['John', 'Mary', 'George', 'Anna', 'Louis', 'Clara', 'Henri', 'Sofia', 'Peter', 'Marie']
+LAST_NAMES = ['Washington', 'Curie', 'Martin', 'Dupont', 'Smith', 'Bernard', 'Keller', 'Rossi', 'Novak', 'Moreau']
+PLACES = [['Paris'], ['London'], ['New', 'York'], ['Saint', 'Petersburg'], ['Lyon'], ['Buenos', 'Aires'], ['Vienna']]
+ORGS = [['Acme', 'Corporation'], ['National', 'Museum'], ['Royal', 'Society'], ['Harvard', 'University'], ['Paris', 'Opera']]
+
+# entity types of the targets, with the preposition introducing them
+TARGETS = {'LOC': 'in', 'ORG': 'at', 'DATE': 'in', 'PER': 'with'}
+
+
+def zipf(n: int, s: float) -> list:
+    """
+    Cumulative weights of a Zipf distribution over n ranks
+
+    :param n: Number of ranks
+    :type n: int
+    :param s: Exponent of the distribution
+    :type s: float
+    :return: Cumulative weights, for random.choices
+    :rtype: list
+    """
+    return list(accumulate(1 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def makeRelations(n_relations: int, verbs_per_relation: int = 3, seed: int = 0) -> list:
+    """
+    Creates the relations of the corpus, each with its trigger verbs and the types of its entities.
+    Verbs are taken from VERBS, then made up when there are not enough of them
+
+    :param n_relations: Number of relations
+    :type n_relations: int
+    :param verbs_per_relation: Number of trigger verbs of each relation, defaults to 3
+    :type verbs_per_relation: int, optional
+    :param seed: Random seed, defaults to 0
+    :type seed: int, optional
+    :return: List of relations
+    :rtype: list
+    """
+    rng = random.Random(seed)
+    verbs = VERBS + [f'verb{i}' for i in range(max(0, n_relations * verbs_per_relation - len(VERBS)))]
+    rng.shuffle(verbs)
+
+    relations = []
+    for i in range(n_relations):
+        relations.append(
+            {
+                "prop": f"P{i + 1}",
+                "verbs": verbs[i * verbs_per_relation:(i + 1) * verbs_per_relation],
+                "source_type": 'PER' if rng.random() < .8 else 'ORG',
+                "target_type": rng.choice(list(TARGETS.keys())),
+            }
+        )
+    return relations
+
+
+class SentenceBuilder:
+    """
+    NOT TO USE DIRECTLY
+    Accumulates the tokens of a sentence, with the index of their head
+    """
+
+    def __init__(self):
+        self.words, self.heads, self.deps, self.pos, self.lemmas = [], [], [], [], []
+
+    def add(self, word: str, pos: str, dep: str, head: int = None, lemma: str = None) -> int:
+        self.words.append(word)
+        self.heads.append(head)
+        self.deps.append(dep)
+        self.pos.append(pos)
+        self.lemmas.append(lemma or word.lower() if pos != 'PROPN' else word)
+        return len(self.words) - 1
+
+    def attach(self, i: int, head: int) -> None:
+        self.heads[i] = head
+
+    def addEntity(self, tokens: list, pos: str, dep: str) -> list:
+        # the last token is the root of the entity, the other ones are compounds
+        nodes = [self.add(x, pos, 'compound') for x in tokens]
+        for i in nodes[:-1]:
+            self.attach(i, nodes[-1])
+        self.deps[nodes[-1]] = dep
+        return nodes
+
+    def doc(self, vocab: Vocab) -> Doc:
+        return Doc(vocab, words=self.words, heads=self.heads, deps=self.deps, pos=self.pos, lemmas=self.lemmas)
+
+
+def entityTokens(rng: random.Random, ent_type: str) -> list:
+    if ent_type == 'PER':
+        return [rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)]
+    if ent_type == 'LOC':
+        return list(rng.choice(PLACES))
+    if ent_type == 'ORG':
+        return list(rng.choice(ORGS))
+    return [str(rng.randint(1500, 2020))]
+
+
+def makeSentence(rng: random.Random, relation: dict, verb: str, vocab: Vocab) -> tuple:
+    """
+    Builds a sentence expressing relation with verb, from a randomly chosen template
+
+    :param rng: Random generator
+    :type rng: random.Random
+    :param relation: Relation expressed by the sentence
+    :type relation: dict
+    :param verb: Trigger verb
+    :type verb: str
+    :param vocab: Vocabulary of the Doc
+    :type vocab: Vocab
+    :return: Doc of the sentence, and nodes of the source and target entities
+    :rtype: tuple
+    """
+    s = SentenceBuilder()
+    template = rng.choice(['active', 'passive', 'apposition', 'clause'])
+
+    if template == 'clause':
+        # "After studying in Paris , John Smith worked at Acme Corporation ."
+        after = s.add('After', 'ADP', 'mark')
+        other_verb = rng.choice(VERBS)
+        other = s.add(f'{other_verb}ing', 'VERB', 'advcl', lemma=other_verb)
+        s.attach(after, other)
+        prep = s.add('in', 'ADP', 'prep', other)
+        place = s.addEntity(entityTokens(rng, 'LOC'), 'PROPN', 'pobj')
+        s.attach(place[-1], prep)
+        comma = s.add(',', 'PUNCT', 'punct')
+
+    source = s.addEntity(entityTokens(rng, relation['source_type']), 'PROPN', 'nsubj')
+
+    if template == 'apposition':
+        # "John Smith , a famous painter , worked at Acme Corporation ."
+        s.add(',', 'PUNCT', 'punct', source[-1])
+        det = s.add('a', 'DET', 'det')
+        adj = s.add(rng.choice(ADJECTIVES), 'ADJ', 'amod')
+        noun = s.add(rng.choice(NOUNS), 'NOUN', 'appos', source[-1])
+        s.attach(det, noun)
+        s.attach(adj, noun)
+        s.add(',', 'PUNCT', 'punct', source[-1])
+
+    if template == 'passive':
+        # "John Smith was born in Paris ."
+        aux = s.add('was', 'AUX', 'auxpass', lemma='be')
+        s.deps[source[-1]] = 'nsubjpass'
+
+    root = s.add(f'{verb}ed', 'VERB', 'ROOT', lemma=verb)
+    s.attach(root, root)
+    s.attach(source[-1], root)
+    if template == 'passive':
+        s.attach(aux, root)
+    if template == 'clause':
+        s.attach(other, root)
+        s.attach(comma, root)
+
+    target_tokens = entityTokens(rng, relation['target_type'])
+    if relation['target_type'] == 'PER' or (relation['target_type'] == 'ORG' and rng.random() < .3):
+        # direct object, possibly with a modifier: "John Smith married the young Mary Curie ."
+        if rng.random() < .5:
+            det = s.add('the', 'DET', 'det')
+            adj = s.add(rng.choice(ADJECTIVES), 'ADJ', 'amod')
+        else:
+            det = adj = None
+        target = s.addEntity(target_tokens, 'PROPN', 'dobj')
+        s.attach(target[-1], root)
+        for i in (det, adj):
+            if i is not None:
+                s.attach(i, target[-1])
+    else:
+        prep = s.add(TARGETS[relation['target_type']], 'ADP', 'prep', root)
+        target = s.addEntity(target_tokens, 'PROPN' if relation['target_type'] != 'DATE' else 'NUM', 'pobj')
+        s.attach(target[-1], prep)
+
+    if rng.random() < .4:
+        # extra adjunct, outside of the Shortest Dependency Path
+        prep = s.add('in', 'ADP', 'prep', root)
+        s.add(str(rng.randint(1500, 2020)), 'NUM', 'pobj', prep)
+
+    s.add('.', 'PUNCT', 'punct', root)
+    return s.doc(vocab), source, target
+
+
+def makeDocument(rng: random.Random, id: str, relations: list, n_sents: int, vocab: Vocab, weights: list, verb_weights: list,
+                 other_ratio: float = .1) -> tuple:
+    """
+    Builds a document of the corpus, as processed by the Processor
+
+    :param rng: Random generator
+    :type rng: random.Random
+    :param id: Id of the document
+    :type id: str
+    :param relations: Relations of the corpus
+    :type relations: list
+    :param n_sents: Number of sentences
+    :type n_sents: int
+    :param vocab: Vocabulary of the Docs
+    :type vocab: Vocab
+    :param weights: Cumulative weights of the relations
+    :type weights: list
+    :param verb_weights: Cumulative weights of the trigger verbs of a relation
+    :type verb_weights: list
+    :param other_ratio: Ratio of sentences annotated as Other, defaults to .1
+    :type other_ratio: float, optional
+    :return: Document, and Docs of its sentences
+    :rtype: tuple
+    """
+    content = []
+    docs = []
+    for sent_i in range(n_sents):
+        relation = rng.choices(relations, cum_weights=weights)[0]
+        verb = rng.choices(relation['verbs'], cum_weights=verb_weights[:len(relation['verbs'])])[0]
+        doc, source, target = makeSentence(rng, relation, verb, vocab)
+        docs.append(doc)
+
+        dict_sent = {'sent': doc.text, 'sent_i': sent_i}
+        dict_graph = doc2graph(doc)
+        dict_sent.update(dict_graph)
+
+        dict_prop = {
+            'prop': 'Other' if rng.random() < other_ratio else relation['prop'],
+            'source': ' '.join(doc[i].text for i in source),
+            'target': ' '.join(doc[i].text for i in target),
+            'sent': doc.text,
+            'source_type': relation['source_type'],
+            'target_type': relation['target_type'],
+        }
+
+        if dict_prop['prop'] != 'Other':
+            sdp = getSDPsFromHeads([x.head.i for x in doc], [(source[-1], target[-1])])[0]
+            dict_prop['sdpgraphs'] = [
+                {
+                    "sourceNode": source,
+                    "targetNode": target,
+                    "sourceNodeRoot": source[-1],
+                    "targetNodeRoot": target[-1],
+                    "sdpgraph": sdp if isinstance(sdp, str) else dict_graph['graph'].subgraph(sdp)
+                }
+            ]
+        else:
+            dict_prop['sdpgraphs'] = [
+                {
+                    "sourceNode": None,
+                    "targetNode": None,
+                    "sourceNodeRoot": None,
+                    "targetNodeRoot": None,
+                    "sdpgraph": dict_graph['graph']
+                }
+            ]
+
+        dict_sent['props'] = [dict_prop]
+        content.append(dict_sent)
+
+    return {"id": id, "content": content}, docs
+
+
+def generateCorpus(n_docs: int, n_sents: int = 5, n_relations: int = 20, verbs_per_relation: int = 3, skew: float = 1.1,
+                   other_ratio: float = .1, seed: int = 0, savepath: str = ''):
+    """
+    Generates a synthetic corpus, document by document
+
+    :param n_docs: Number of documents
+    :type n_docs: int
+    :param n_sents: Number of sentences of each document, defaults to 5
+    :type n_sents: int, optional
+    :param n_relations: Number of relations, defaults to 20
+    :type n_relations: int, optional
+    :param verbs_per_relation: Number of trigger verbs of each relation, defaults to 3
+    :type verbs_per_relation: int, optional
+    :param skew: Exponent of the Zipf distributions of the relations and of their verbs, defaults to 1.1
+    :type skew: float, optional
+    :param other_ratio: Ratio of sentences annotated as Other, defaults to .1
+    :type other_ratio: float, optional
+    :param seed: Random seed, defaults to 0
+    :type seed: int, optional
+    :param savepath: Path to project where to save the documents as graph_<id>.json, defaults to ''
+    :type savepath: str, optional
+    :yield: Document, and Docs of its sentences
+    :rtype: tuple
+    """
+    rng = random.Random(seed)
+    vocab = Vocab()
+    relations = makeRelations(n_relations, verbs_per_relation, seed)
+    weights = zipf(n_relations, skew)
+    verb_weights = zipf(verbs_per_relation, skew)
+
+    for i in range(n_docs):
+        document, docs = makeDocument(rng, f"S{seed}_{i}", relations, n_sents, vocab, weights, verb_weights, other_ratio)
+        if savepath:
+            saveDocument(savepath=savepath, data=document)
+        yield document, docs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetic corpus generator for elijere')
+    parser.add_argument('--savepath', required=True, help='Path to project where to save the corpus folder')
+    parser.add_argument('--docs', type=int, default=1000)
+    parser.add_argument('--sents', type=int, default=5, help='Number of sentences per document')
+    parser.add_argument('--relations', type=int, default=20)
+    parser.add_argument('--verbs', type=int, default=3, help='Number of trigger verbs per relation')
+    parser.add_argument('--skew', type=float, default=1.1, help='Exponent of the Zipf distribution of relations and verbs')
+    parser.add_argument('--other', type=float, default=.1, help='Ratio of sentences annotated as Other')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    n = sum(1 for _ in generateCorpus(args.docs, args.sents, args.relations, args.verbs, args.skew, args.other, args.seed, args.savepath))
+    print(f'{n} documents saved in {args.savepath}/corpus')
+
+
+if __name__ == '__main__':
+    main()
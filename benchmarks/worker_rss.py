@@ -0,0 +1,213 @@
+"""
+Memory benchmark of the workers of the elijere HTTP service (python -m elijere.server).
+
+Starts the service with an increasing number of workers, either forked after loading the model (--prefork) or loading
+their own copy of it (--workers), sends requests to every worker with benchmarks/loadgen.py so that they read the index,
+then reads the memory of each worker in /proc/<pid>/smaps_rollup (Linux only):
+    * uss: memory of the worker only (Private_Clean + Private_Dirty), freed if the worker exits
+    * private_dirty: memory the worker has copied or allocated, which is not backed by a file
+    * pss: memory of the worker, with its shared pages divided by the number of processes sharing them
+    * index_cache: frozen size of the patterns each worker keeps decoded, as given by /health (--prefork with --runtime only)
+The total PSS of the service stays flat as workers are added when they share the model, and grows by the size of the
+model with each worker otherwise. With --max-uss-mb, the benchmark fails if the mean USS of the forked workers exceeds it.
+
+Usage: python benchmarks/worker_rss.py --model projects/Q5 [--runtime] [--workers 1,2,4] [--modes prefork,workers] [--texts sentences.txt]
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import argparse
+import subprocess
+import urllib.request
+
+from loadgen import TEXTS, run
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+SMAPS_FIELDS = ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty')
+
+
+def readMemory(pid: int) -> dict:
+    """
+    Reads the memory of a process, in MB
+
+    :param pid: Process ID
+    :type pid: int
+    :return: RSS, PSS, USS and private dirty memory of the process
+    :rtype: dict
+    """
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in SMAPS_FIELDS:
+                values[key] = int(value.split()[0]) / 1024
+
+    return {
+        'rss': values['Rss'],
+        'pss': values['Pss'],
+        'uss': values['Private_Clean'] + values['Private_Dirty'],
+        'private_dirty': values['Private_Dirty']
+    }
+
+
+def getChildren(pid: int) -> list:
+    """
+    Returns the IDs of the child processes of a process
+    """
+    children = []
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat', 'r') as f:
+                # the name of the command is between parentheses and can contain spaces
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(name))
+    return sorted(children)
+
+
+def waitHealthy(url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise Exception(f'The service exited with status {process.returncode}')
+        try:
+            with urllib.request.urlopen(f'{url}/health', timeout=1) as res:
+                if res.status == 200:
+                    return
+        except OSError:
+            time.sleep(.2)
+    raise Exception(f'The service did not answer in {timeout} seconds')
+
+
+def readIndexCaches(url: str, n_workers: int) -> dict:
+    """
+    Reads the index cache of the workers in /health. Each request opens a new connection, accepted by any worker,
+    so the workers are queried until all of them have answered, or after a bounded number of requests
+
+    :param url: URL of the service
+    :type url: str
+    :param n_workers: Number of workers
+    :type n_workers: int
+    :return: Index cache of each worker, by process ID
+    :rtype: dict
+    """
+    caches = {}
+    for _ in range(50 * n_workers):
+        with urllib.request.urlopen(f'{url}/health', timeout=5) as res:
+            health = json.load(res)
+        if 'index_cache' not in health:
+            break
+        caches[str(health['pid'])] = health['index_cache']
+        if len(caches) == n_workers:
+            break
+    return caches
+
+
+def runService(mode: str, n_workers: int, args: argparse.Namespace, texts: list) -> dict:
+    """
+    Starts the service, loads it, then measures the memory of its processes
+
+    :param mode: "prefork" or "workers"
+    :type mode: str
+    :param n_workers: Number of workers
+    :type n_workers: int
+    :param args: Parameters of the benchmark
+    :type args: argparse.Namespace
+    :param texts: Texts to send
+    :type texts: list
+    :return: Memory of the parent process and of each worker, in MB
+    :rtype: dict
+    """
+    url = f'http://127.0.0.1:{args.port}'
+    command = [sys.executable, '-m', 'elijere.server', '--model', args.model, '--port', str(args.port), f'--{mode}', str(n_workers)]
+    if args.runtime:
+        command.append('--runtime')
+    command.extend(args.server_args)
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(x for x in [SRC, os.environ.get('PYTHONPATH', '')] if x))
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, env=env)
+    try:
+        waitHealthy(url, process, args.timeout)
+        load = argparse.Namespace(url=url, requests=args.requests * n_workers, concurrency=args.concurrency * n_workers, seed=0)
+        report = asyncio.run(run(load, texts))
+
+        parent = readMemory(process.pid)
+        workers = [readMemory(pid) for pid in getChildren(process.pid)]
+        caches = readIndexCaches(url, n_workers)
+    finally:
+        # stops the service as Ctrl+C does, so that it stops its workers
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(args.timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    return {
+        'statuses': report['statuses'],
+        'parent': parent,
+        'workers': workers,
+        'index_cache': caches,
+        'mean_index_cache': sum(x['bytes'] for x in caches.values()) / len(caches) / 1024 / 1024 if caches else None,
+        'mean_uss': sum(x['uss'] for x in workers) / len(workers) if workers else 0.,
+        'mean_private_dirty': sum(x['private_dirty'] for x in workers) / len(workers) if workers else 0.,
+        'total_pss': parent['pss'] + sum(x['pss'] for x in workers)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory benchmark of the workers of the elijere HTTP service')
+    parser.add_argument('--model', required=True, help='Path to project storing the model folder')
+    parser.add_argument('--runtime', action='store_true', help='Serve the model compiled with compileModel')
+    parser.add_argument('--workers', default='1,2,4', help='Comma separated numbers of workers')
+    parser.add_argument('--modes', default='prefork,workers', help='Comma separated modes of the service: prefork and / or workers')
+    parser.add_argument('--texts', default='', help='File with one text per line')
+    parser.add_argument('--requests', type=int, default=200, help='Number of requests sent per worker')
+    parser.add_argument('--concurrency', type=int, default=4, help='Number of connections per worker')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--timeout', type=float, default=300, help='Maximum time in seconds to start or stop the service')
+    parser.add_argument('--max-uss-mb', type=float, default=0, help='Fails if the mean USS of the forked workers exceeds it')
+    parser.add_argument('--output', default='', help='Path of the JSON results')
+    parser.add_argument('server_args', nargs='*', help='Other arguments of the service, after --')
+    args = parser.parse_args()
+
+    texts = TEXTS
+    if args.texts:
+        with open(args.texts, 'r', encoding='utf-8') as f:
+            texts = [x.rstrip('\n') for x in f if x.strip()]
+
+    results = {}
+    failed = False
+    for mode in args.modes.split(','):
+        results[mode] = {}
+        for n_workers in [int(x) for x in args.workers.split(',')]:
+            res = runService(mode, n_workers, args, texts)
+            results[mode][str(n_workers)] = res
+            print(f'{mode:<8} {n_workers:>3} workers  total PSS {res["total_pss"]:>9.1f} MB  mean USS {res["mean_uss"]:>8.1f} MB  '
+                  f'mean private dirty {res["mean_private_dirty"]:>8.1f} MB  parent RSS {res["parent"]["rss"]:>8.1f} MB  statuses {res["statuses"]}')
+            if res['mean_index_cache'] is not None:
+                print(f'{"":<8} mean index cache {res["mean_index_cache"]:.2f} MB of {len(res["index_cache"])} workers')
+
+            if mode == 'prefork' and args.max_uss_mb and res['mean_uss'] > args.max_uss_mb:
+                print(f'  mean USS of the workers exceeds {args.max_uss_mb} MB')
+                failed = True
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        print(f'Results saved in {args.output}')
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
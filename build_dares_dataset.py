@@ -16,9 +16,22 @@ dares_config = {
         "items_per_pages": 10,
         "source_doc": 'wikipedia',
         "score_cutoff": 95,
+        # "fuzzy" scores every sentence against every property value, "staged" first keeps
+        # exact matches and only scores sentences sharing a rare word with a value
+        # (much faster, check the recall with matcher.matchRecall), "exact" only keeps exact matches
+        "match_strategy": 'fuzzy',
         "getOther": True,
         "maxsizesent": True,
-        "removeNoMatch": True
+        "removeNoMatch": True,
+        # if True, each entity goes through every processing step independently,
+        # instead of waiting for all entities to be done with a step
+        "streaming": False,
+        # "process" runs the syntactic processing of the corpus in separate processes, each
+        # loading its own spaCy model, instead of threads. The corpus is then only saved on disk
+        "processing_mode": 'thread',
+        # pipeline used to split Wikipedia pages into sentences: "full" runs the whole spaCy model,
+        # "senter" only its senter component, "sentencizer" a rule-based sentencizer (fastest)
+        "segmenter": 'full'
     },
     "entities":[
         {
@@ -79,10 +92,9 @@ dares_config = {
 
 wp = DARES(**dares_config)
 
-# collects url links to wikidata items
-wp.collect_Wikidata_links()
-
-# collects data about entities
+# collects data about entities. As collect_Wikidata_links() is not called
+# beforehand, the links to wikidata items are collected while the data of
+# the entities is fetched
 wp.processListEntities()
 
 # extracting shortest dependency path
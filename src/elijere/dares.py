@@ -6,20 +6,26 @@ import re
 from bs4 import BeautifulSoup
 from typing import List, Callable, TypeVar
 from multiprocessing.dummy import Pool
+from multiprocessing import Pool as ProcessPool
+from queue import Queue
+from threading import Thread, Lock
 import os
+import time
 # from segmenter.segmenter import Segmenter
 
 from datetime import datetime
 from babel.dates import format_date
 from functools import partial
 from rapidfuzz import process, fuzz
-import pandas as pd
+import numpy as np
 from glob import glob
 import json
 from itertools import groupby
-from .utils import saveWhatLinksHere, saveWikidataLinks, loadWhatLinksHereLinks, saveEntitiesData, getRelationNames
+from .utils import saveWhatLinksHere, saveWikidataLinks, loadWhatLinksHereLinks, appendWhatLinksHereItems, loadWhatLinksHereItems, appendEntityJournal, loadEntityJournal, loadEntitiesData, getRelationNames
 import spacy
+from spacy.language import Language
 from .processor import TextProcessor
+from .matcher import LabelAutomaton, stagedSimMatrix
 
 
 class WhatLinksHere:
@@ -34,98 +40,198 @@ class WhatLinksHere:
     """
 
     re_wikiHref = re.compile(r'/wiki/Q.*')
+    re_fromToken = re.compile(r'[?&]from=([^&]+)')
     url = f'https://www.wikidata.org/w/index.php?title=Special:WhatLinksHere'
 
+    @staticmethod
+    def getPage(url: str, retries: int = 3, backoff: float = 1.) -> requests.Response:
+        """
+        Downloads a WhatLinksHere page. Rate-limited (429) and server error (5xx) answers are retried after an increasing delay,
+        or the one given by their Retry-After header
+
+        :param url: URL of the page
+        :type url: str
+        :param retries: Number of retries, defaults to 3
+        :type retries: int, optional
+        :param backoff: Delay in seconds before the first retry, doubled at each retry, defaults to 1.
+        :type backoff: float, optional
+        :raises requests.HTTPError: If the page cannot be downloaded
+        :return: Answer of the server
+        :rtype: requests.Response
+        """
+        for attempt in range(retries + 1):
+            req = requests.get(url)
+            if (req.status_code == 429 or req.status_code >= 500) and attempt < retries:
+                retry_after = req.headers.get('Retry-After', '')
+                time.sleep(float(retry_after) if retry_after.isdigit() else backoff * 2 ** attempt)
+                continue
+            req.raise_for_status()
+            return req
+
     def collect_Wikidata_links(self, dict_rel:dict, limit: int = 100, m_size: int = 0, save_step: int = 10, folderpath: str="", n_core:int=4)  -> List[str]:
 
         entitytype = {x['type']: x['label'] for x in dict_rel}
 
-        list_urls = self.getWhatLinksHere(entitytype, limit, m_size, save_step, folderpath)
-        list_entities = self.multi_getWikidataLinks(list_urls, n_core, folderpath)
+        # item ids are extracted while crawling the WhatLinksHere pages,
+        # so there is no need to download the pages a second time
+        list_data = self.getWhatLinksHere(entitytype, limit, m_size, save_step, folderpath)
+        list_entities = [{"type": data['type'], "ent_id": data['ent_id']} for data in list_data]
+
+        if folderpath:
+            saveWikidataLinks(savepath=folderpath, data=list_entities)
+
         return list_entities
 
-    def __getNextPageURL(self, entity_type:str, url: str, results: List[str], limit: int = 50, m_size: int = 0, folderpath: str = "", save_step: int = 0 ) -> List[str]:
+    def __extractItemIds(self, soup: BeautifulSoup) -> List[str]:
         """
-        NOT TO USE DIRECTLY  
-        Finds the URL leading the next limit number of entities on WhatLinksHere pages recursively.
+        NOT TO USE DIRECTLY
+        Extracts the ids of the Wikidata items listed in a parsed WhatLinksHere page
 
-        :param url: URL to parse
-        :type url: str
-        :param results: list of already processed urls
-        :type results: List[str]
-        :param limit: limit of URL to process at the same time, defaults to 50
+        :param soup: Parsed WhatLinksHere page
+        :type soup: BeautifulSoup
+        :return: List of item ids
+        :rtype: List[str]
+        """
+        tag_ul = soup.find('ul', {'id' : 'mw-whatlinkshere-list'})
+        if not tag_ul:
+            return []
+
+        list_anchor = tag_ul.find_all('a', {'href' : self.re_wikiHref})
+        list_anchor = [a['href'] for a in list_anchor]
+        # TODO : faire en sorte de retirer Q...?response=no
+        list_anchor = [a.replace('/wiki/', '') for a in list_anchor]
+        list_anchor = list(filter(lambda x: not '?' in x, list_anchor))
+        return list_anchor
+
+    def iterWhatLinksHere(self, entity_type:str, limit: int = 100, m_size: int = 0, save_step: int = 10, folderpath: str = ""):
+        """
+        Crawls the WhatLinksHere pages of the given type iteratively, and yields the URL of each page with the item ids it lists.
+        The next page is fetched in the background while the ids of the current page are extracted and saved.
+
+        If folderpath is given, the ids are appended to a **ID-items.txt** file as soon as a page is parsed, and every save_step pages
+        the crawler checkpoints its cursor (the 'from=' token of the next page) in the **ID-whatlinkshere.json** file.
+        When restarting, the URLs of the previous run are yielded first (with no ids), then its ids (with None as URL), as the ids are
+        not saved by page, then the crawl resumes from the cursor.
+
+        :param entity_type: type of entity to find
+        :type entity_type: str
+        :param limit: limit of URL to process at the same time, defaults to 100
         :type limit: int, optional
-        :param m_size: maximum of url to process, defaults to 0
+        :param m_size: maximum of pages to process, defaults to 0
         :type m_size: int, optional
-        :param folderpath: path to folder containing 'whatlinkshere.txt' txt file where results are save , defaults to None
-        :type folderpath: str, optional
-        :param save_step: specify at which every step to save results, defaults to 0
+        :param save_step: specify at which every page to checkpoint the crawler, defaults to 10
         :type save_step: int, optional
-        :return: list of URL pages which contain sets of link to Wikidata entity pages
-        :rtype: List[str]
+        :param folderpath: path to project folder where results are saved, defaults to ""
+        :type folderpath: str, optional
+        :raises requests.HTTPError: If a page cannot be downloaded, once the crawler is checkpointed to resume from this page
+        :yield: tuple containing the URL of the page and the list of item ids it contains
+        :rtype: Iterator[tuple]
         """
-        if len(results) % save_step == 0 and save_step != 0:
+
+        data = loadWhatLinksHereLinks(entity_type=entity_type, folderpath=folderpath)
+        list_urls = data['urls']
+        cursor = data.get('cursor', '')
+        done = data.get('done', False)
+
+        if list_urls and not cursor and not done:
+            # files written before the crawler kept a cursor do not record
+            # which pages had their ids extracted, so the crawl starts over
+            print('No cursor found, starting from first url')
+            list_urls = []
+
+        n_items = data.get('n_items', 0) if list_urls else 0
+        # the pages crawled before the checkpoint are given back, so that the result of a resumed crawl is complete
+        for page_url in list(list_urls):
+            yield page_url, []
+        list_items = loadWhatLinksHereItems(entity_type=entity_type, folderpath=folderpath, n_items=n_items)
+        if list_items:
+            yield None, list_items
+
+        def checkpoint(cursor:str, done:bool) -> None:
             if folderpath:
-                saveWhatLinksHere(entity_type=entity_type,savepath=folderpath, list_urls=results)
-                # with open(f"{folderpath}", 'w', encoding='utf-8') as f:
-                #     f.write('\n'.join(results))
-            else:
-                raise Exception('A path to a file with a .txt extension must be given')
+                saveWhatLinksHere(entity_type=entity_type, savepath=folderpath, list_urls=list_urls, cursor=cursor, n_items=n_items, done=done)
 
-        if len(results) == m_size and m_size != 0:
-            return results
-        else:
-            req = requests.get(url)
-            soup = BeautifulSoup(req.content, 'lxml')
-            next_tag = soup.find('a', string=f"next {limit}")
+        if done or (m_size and len(list_urls) >= m_size):
+            return
 
-            if next_tag:
-                next_url = f"https://www.wikidata.org{next_tag['href']}"
-                results.append(next_url)
-                results = self.__getNextPageURL(entity_type=entity_type, url = next_url, results=results, limit=limit, m_size=m_size, folderpath=folderpath, save_step=save_step)
-                return results
-            
-            else:
-                
-                return results
+        if cursor:
+            print('Starting from last cursor...')
+            url = f'{self.url}/{entity_type}&namespace=0&limit={limit}&from={cursor}'
+        else:
+            print('Starting from first url')
+            url = f'{self.url}/{entity_type}&namespace=0&limit={limit}'
 
+        with Pool(1) as p:
+            pending = p.apply_async(self.getPage, (url,))
 
-    def getWhatLinksHere(self, entitytype:str, limit: int = 100, m_size: int = 0, save_step: int = 10, folderpath: str="") -> List[str]:
+            while pending:
+                try:
+                    req = pending.get()
+                except Exception:
+                    # the cursor points to the page that failed, so that it is fetched again on resume
+                    checkpoint(cursor=cursor, done=False)
+                    raise
+                soup = BeautifulSoup(req.content, 'lxml')
+                list_urls.append(url)
+
+                # the next page is requested before extracting the ids of the current one
+                page_url = url
+                next_tag = soup.find('a', string=f"next {limit}")
+                if next_tag and not (m_size and len(list_urls) >= m_size):
+                    url = f"https://www.wikidata.org{next_tag['href']}"
+                    pending = p.apply_async(self.getPage, (url,))
+                else:
+                    pending = None
+
+                if next_tag:
+                    search_cursor = self.re_fromToken.search(next_tag['href'])
+                    cursor = search_cursor.group(1) if search_cursor else cursor
+                # only a page downloaded successfully and without next page ends the crawl
+                done = next_tag is None
+
+                list_items = self.__extractItemIds(soup)
+                n_items += len(list_items)
+                if folderpath:
+                    appendWhatLinksHereItems(entity_type=entity_type, savepath=folderpath, list_items=list_items)
+
+                if not pending or (save_step and len(list_urls) % save_step == 0):
+                    checkpoint(cursor=cursor, done=done)
+
+                yield page_url, list_items
+
+    def getWhatLinksHere(self, entitytype:str, limit: int = 100, m_size: int = 0, save_step: int = 10, folderpath: str="") -> List[dict]:
         """
-        Wrapper to retrieve and save on disk WhatLinksHere pages
+        Wrapper to retrieve and save on disk WhatLinksHere pages, alongside the item ids they list
 
         :param entitytype: type of entity to find
         :type entitytype: str
         :param limit: limit of URL to process at the same time, defaults to 100
         :type limit: int, optional
-        :param m_size: maximum of url to process, defaults to 0
+        :param m_size: maximum of pages to process, defaults to 0
         :type m_size: int, optional
-        :param save_step: specify at which every step to save results, defaults to 0
+        :param save_step: specify at which every page to checkpoint the crawler, defaults to 10
         :type save_step: int, optional
-        :param folderpath: path to folder containing 'whatlinkshere.txt' file where results are saved , defaults to None
+        :param folderpath: path to project folder where results are saved, defaults to ""
         :type folderpath: str, optional
-        :return: list of URL pages which contain sets of link to Wikidata entity pages
-        :rtype: str
+        :return: list of dictionnaries containing the URL pages and the item ids found in them, for each type
+        :rtype: List[dict]
         """
 
         def process(ent:str):
             print(f'Processing {ent} type...')
 
-            data = loadWhatLinksHereLinks(entity_type=ent, folderpath=folderpath)
-            if data['urls']:
-                print('Starting from last parsed url...')
-                url = data['urls'][-1]
-                data['urls'] = self.__getNextPageURL(entity_type=ent, url=url, results=data['urls'], limit=limit, m_size = m_size, folderpath=folderpath, save_step=save_step)
-            else:
-                print('Starting from first url')
-                url = f'{self.url}/{ent}&namespace=0&limit={limit}'
-                data['urls'].append(url)
-                data['urls'] = self.__getNextPageURL(entity_type=ent, url=url, results=data['urls'], limit=limit, m_size = m_size, folderpath=folderpath, save_step=save_step)
+            data = {
+                "type": ent,
+                "urls": [],
+                "ent_id": []
+            }
 
-            print(f'Done processing {ent} type')
-            if folderpath:
-                saveWhatLinksHere(entity_type=ent,savepath=folderpath, list_urls=data['urls'])
+            for url, list_items in self.iterWhatLinksHere(entity_type=ent, limit=limit, m_size=m_size, save_step=save_step, folderpath=folderpath):
+                if url:
+                    data['urls'].append(url)
+                data['ent_id'].extend(list_items)
 
+            print(f'Done processing {ent} type')
             return data
 
         results = []
@@ -160,14 +266,7 @@ class WhatLinksHere:
         for url in dict_url['urls']:
             req = requests.get(url)
             soup = BeautifulSoup(req.content, 'lxml')
-            tag_ul = soup.find('ul', {'id' : 'mw-whatlinkshere-list'})
-            list_anchor = tag_ul.find_all('a', {'href' : self.re_wikiHref})
-
-            list_anchor = [a['href'] for a in list_anchor]
-            # TODO : faire en sorte de retirer Q...?response=no
-            list_anchor = [a.replace('/wiki/', '') for a in list_anchor]
-            list_anchor = list(filter(lambda x: not '?' in x, list_anchor))
-            data['ent_id'].extend(list_anchor)
+            data['ent_id'].extend(self.__extractItemIds(soup))
         
         if savepath:
             saveWikidataLinks(savepath=savepath, data=data)
@@ -206,6 +305,8 @@ class WhatLinksHere:
 class DARES:
     
     base_url_entity = "https://www.wikidata.org/wiki/Special:EntityData"
+    # stages of processListEntities, as recorded in the journal of each entity
+    stages = ['entityData', 'content', 'labels', 'properties', 'sentences', 'other']
 
     # def __init__(self, lg:str, nlp_model:str) -> None:
     def __init__(self, project_name:str, lg:str, spacy_model:str, n_core:int, dares_parameters:dict, entities:dict):
@@ -219,7 +320,9 @@ class DARES:
         self.parameters = dares_parameters
 
         self.wlh = WhatLinksHere()
-        self.tp = TextProcessor(nlp=self.nlp)
+        self.tp = TextProcessor(nlp=self.nlp, spacy_model=spacy_model)
+        # pipeline only used to split Wikipedia pages into sentences
+        self.segmenter = self.loadSegmenter(spacy_model, self.parameters.get('segmenter', 'full'))
 
         # # select type of Wikimedia content to process (e.g. Wikipedia, Wikinews...). Only tested with Wikipedia for now
         # self.source_doc = 'wikipedia'
@@ -231,6 +334,35 @@ class DARES:
 
         self.relation_names = getRelationNames(entities)
 
+        # filled by collect_Wikidata_links, or by streamEntityData
+        self.list_entities = []
+
+    def loadSegmenter(self, spacy_model: str, mode: str = 'full') -> Language:
+        """
+        Loads the pipeline used to split Wikipedia pages into sentences. The sentences are parsed again later on, so the full pipeline is not needed there
+
+        :param spacy_model: Name of the spaCy model
+        :type spacy_model: str
+        :param mode: Either "full" (the whole pipeline, as self.nlp), "senter" (only the senter component of the model) or "sentencizer" (the rule-based sentencizer on a blank pipeline of the same language), defaults to 'full'
+        :type mode: str, optional
+        :return: spaCy pipeline setting sentence boundaries
+        :rtype: Language
+        """
+
+        if mode == 'full':
+            return self.nlp
+
+        if mode == 'senter':
+            if 'senter' in self.nlp.component_names:
+                return spacy.load(spacy_model, enable=['senter'])
+            print(f'No senter component in {spacy_model}, using the sentencizer instead')
+
+        elif mode != 'sentencizer':
+            raise Exception(f'Unknown segmenter {mode}. Please use either full, senter or sentencizer')
+
+        segmenter = spacy.blank(self.nlp.lang)
+        segmenter.add_pipe('sentencizer')
+        return segmenter
 
     # def initiate_project(self, projectname:str, dict_rel:dict):
 
@@ -279,6 +411,83 @@ class DARES:
 
         return self.wlh.getWhatLinksHere(entitytype, limit, m_size, save_step, folderpath)
 
+    def __saveStage(self, entityData: dict, stage: str, keys: List[str] = [], dropped: bool = False) -> None:
+        """
+        NOT TO USE DIRECTLY
+        Records in the journal of the entity that the stage is done, alongside the keys it updated
+
+        :param entityData: Dictionary containing data about an entity
+        :type entityData: dict
+        :param stage: Name of the stage, one of DARES.stages
+        :type stage: str
+        :param keys: Keys of entityData updated by the stage. If empty, the whole entity is saved, defaults to []
+        :type keys: List[str], optional
+        :param dropped: Whether the stage discarded the entity, defaults to False
+        :type dropped: bool, optional
+        """
+        appendEntityJournal(savepath=self.folderpath, entityData=entityData, stage=stage, keys=keys, dropped=dropped)
+        entityData.setdefault('stages', []).append(stage)
+
+    def __runStage(self, entityData: dict, stage: str, func: Callable, **kwargs) -> dict:
+        """
+        NOT TO USE DIRECTLY
+        Applies func to entityData, unless the journal of the entity shows the stage was already done in a previous run
+
+        :param entityData: Dictionary containing data about an entity
+        :type entityData: dict
+        :param stage: Name of the stage, one of DARES.stages
+        :type stage: str
+        :param func: Function implementing the stage
+        :type func: Callable
+        :return: Updated entityData dictionary
+        :rtype: dict
+        """
+        if stage in entityData.get('stages', []):
+            return entityData
+        return func(entityData, **kwargs)
+
+    def projectEntityData(self, rawData: dict, entityID: str, entityType: str = '', default_lg: str = 'en') -> dict:
+        """
+        Projects the raw Special:EntityData payload of an entity into a slim record holding only
+        what later stages use: the labels in the selected and default languages, the aliases in the
+        selected language, the Wikipedia sitelink URL and the datavalues of the properties configured
+        for the entity type.
+
+        :param rawData: JSON payload returned by Special:EntityData
+        :type rawData: dict
+        :param entityID: ID of the entity
+        :type entityID: str
+        :param entityType: Type of the entity, e.g. Q5. Claims are only kept for configured types, defaults to ''
+        :type entityType: str, optional
+        :param default_lg: Fallback language for labels, defaults to 'en'
+        :type default_lg: str, optional
+        :return: Slim record with keys "labels", "aliases", "sitelink" and "claims"
+        :rtype: dict
+        """
+
+        # the payload is keyed by the target id if the entity was redirected,
+        # in which case the record is left empty and the entity gets dropped later
+        data = rawData.get('entities', {}).get(entityID, {})
+
+        labels = data.get('labels', {})
+        aliases = data.get('aliases', {})
+        sitelink = data.get('sitelinks', {}).get(f'{self.lg}wiki', {})
+
+        props = [x['props'] for x in self.entities if x['type'] == entityType]
+        props = props[0] if props else {}
+        claims = {}
+        for propertyID, list_claims in data.get('claims', {}).items():
+            if propertyID in props:
+                # claims without any value do not have a datavalue
+                claims[propertyID] = [x['mainsnak']['datavalue'] for x in list_claims if 'datavalue' in x['mainsnak']]
+
+        return {
+            "labels": {lg: labels[lg]['value'] for lg in (self.lg, default_lg) if lg in labels},
+            "aliases": [x['value'] for x in aliases.get(self.lg, [])],
+            "sitelink": sitelink.get('url', ''),
+            "claims": claims
+        }
+
     def getEntityData(self, entityID: str, entityType: str = '', format: str = 'json', save2disk : bool = True) -> dict:
         """
         Retrieves data about given entity and returns it with given format (default: json)
@@ -294,12 +503,28 @@ class DARES:
         :return: Data about the entity from its corresponding Wikidata page
         :rtype: dict
         """
+        if save2disk:
+            # resumes from the journal of a previous run, if any
+            journalpath = f"{self.folderpath}/entity_data/{entityType}/{entityID}.jsonl"
+            if os.path.exists(journalpath):
+                entityData = loadEntityJournal(journalpath)
+                if 'entityData' in entityData['stages']:
+                    if entityData.get('dropped'):
+                        return None
+                    # journals written before records were projected
+                    # still carry the raw payload
+                    if 'entities' in entityData['data']:
+                        entityData['data'] = self.projectEntityData(entityData['data'], entityID, entityType)
+                    return entityData
+
         req = requests.get(f"{self.base_url_entity}/{entityID}.{format}")
+        # only keeps what later stages need from the raw payload
+        data = self.projectEntityData(req.json(), entityID, entityType)
         # the key "property" is to be filled up later
-        entityData = {'id': entityID, 'type': entityType, 'data': req.json(), 'properties': []}
+        entityData = {'id': entityID, 'type': entityType, 'data': data, 'properties': []}
 
         if save2disk:
-            saveEntitiesData(savepath=self.folderpath, entityData=entityData)
+            self.__saveStage(entityData, stage='entityData')
             # with open(f"{savepath}/{entityID}.json", 'w', encoding='utf-8') as f:
             #     json.dump(data, f, indent=4)
 
@@ -325,12 +550,227 @@ class DARES:
             print(f'Processing {dict_data["type"]} type...')
             with Pool(n_core) as p:
                 partial_func = partial(self.getEntityData, entityType=dict_data['type'], save2disk=save2disk)
-                list_entities_data.extend(p.map(partial_func, dict_data['ent_id']))
+                list_entities_data.extend([x for x in p.map(partial_func, dict_data['ent_id']) if x])
             print(f"Processing {dict_data['type']} done")
         
         self.list_entities_data = list_entities_data
         return list_entities_data
 
+    def __iterEntityIds(self):
+        """
+        NOT TO USE DIRECTLY
+        Yields the id and type of each entity to process. They are taken from self.list_entities if collect_Wikidata_links
+        was called, otherwise they are listed from the WhatLinksHere pages while they are crawled. In that case, fills
+        self.list_entities and saves the item ids in the **wikidatalinks** folder once the crawl is done.
+
+        :yield: tuple containing the entity id and its type
+        :rtype: Iterator[tuple]
+        """
+        if self.list_entities:
+            for dict_data in self.list_entities:
+                for entityID in dict_data['ent_id']:
+                    yield entityID, dict_data['type']
+            return
+
+        limit = self.parameters['item_limit']
+        m_size = self.parameters['items_per_pages']
+        save_step = self.parameters['item_save_step']
+
+        list_entities = [{"type": x['type'], "ent_id": []} for x in self.entities]
+        for dict_ent in list_entities:
+            print(f'Processing {dict_ent["type"]} type...')
+            for url, list_items in self.wlh.iterWhatLinksHere(entity_type=dict_ent['type'], limit=limit, m_size=m_size, save_step=save_step, folderpath=self.folderpath):
+                dict_ent['ent_id'].extend(list_items)
+                for entityID in list_items:
+                    yield entityID, dict_ent['type']
+            print(f"Processing {dict_ent['type']} done")
+
+        saveWikidataLinks(savepath=self.folderpath, data=list_entities)
+        self.list_entities = list_entities
+
+    def __streamStages(self, source, list_stages: List[tuple], queue_size: int, return_results: bool = True) -> List[dict]:
+        """
+        NOT TO USE DIRECTLY
+        Streaming executor: each item of source flows through the stages independently, the stages being connected by bounded queues.
+        Each stage is a tuple (name, func, n_workers, mode), where mode is either 'thread' or 'process'. 'thread' stages call func in
+        n_workers threads, which suits I/O-bound stages. 'process' stages send the items to a pool of n_workers processes, which suits CPU-bound stages.
+        func must then be picklable. An entity whose journal already records the stage skips it.
+        The first error stops the stream and is raised once every worker is done.
+
+        :param source: Iterable of items to feed to the first stage
+        :type source: Iterable
+        :param list_stages: List of stages to apply
+        :type list_stages: List[tuple]
+        :param queue_size: Maximum number of items waiting between two stages
+        :type queue_size: int
+        :param return_results: Whether to keep the output of the last stage in memory, defaults to True
+        :type return_results: bool, optional
+        :return: List of items processed by every stage, or an empty list if return_results is False
+        :rtype: List[dict]
+        """
+
+        queues = [Queue(maxsize=queue_size) for _ in range(len(list_stages) + 1)]
+        errors = []
+        workers = []
+        process_pools = []
+
+        def produce():
+            try:
+                for item in source:
+                    if errors:
+                        break
+                    queues[0].put(item)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                # one stop signal per worker of the first stage
+                for _ in range(list_stages[0][2]):
+                    queues[0].put(None)
+
+        def work(stage_i: int, stage: str, func: Callable, pool, remaining: list, n_next: int, lock):
+            queue_in, queue_out = queues[stage_i], queues[stage_i + 1]
+            while True:
+                item = queue_in.get()
+                if item is None:
+                    break
+                # after an error, keeps emptying the queue so that no worker is blocked
+                if errors:
+                    continue
+                try:
+                    if isinstance(item, dict) and stage in item.get('stages', []):
+                        pass
+                    elif pool:
+                        item = pool.apply_async(func, (item,)).get()
+                    else:
+                        item = func(item)
+                    # stages return None for discarded entities
+                    if item:
+                        queue_out.put(item)
+                except Exception as e:
+                    errors.append(e)
+
+            # the last worker of the stage forwards the stop signals to the next one
+            with lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    for _ in range(n_next):
+                        queue_out.put(None)
+
+        # process pools are started before any thread
+        for stage, func, n_workers, mode in list_stages:
+            process_pools.append(ProcessPool(n_workers) if mode == 'process' else None)
+
+        for stage_i, (stage, func, n_workers, mode) in enumerate(list_stages):
+            n_next = list_stages[stage_i + 1][2] if stage_i + 1 < len(list_stages) else 1
+            remaining, lock = [n_workers], Lock()
+            for _ in range(n_workers):
+                workers.append(Thread(target=work, args=(stage_i, stage, func, process_pools[stage_i], remaining, n_next, lock)))
+
+        workers.append(Thread(target=produce))
+        for w in workers:
+            w.start()
+
+        results = []
+        while True:
+            item = queues[-1].get()
+            if item is None:
+                break
+            if return_results:
+                results.append(item)
+
+        for w in workers:
+            w.join()
+        for pool in process_pools:
+            if pool:
+                pool.close()
+                pool.join()
+
+        if errors:
+            raise errors[0]
+
+        return results
+
+    def streamEntityData(self, n_core:int=4, save2disk : bool = True, queue_size:int = 0) -> List[dict]:
+        """
+        Single-fetch pipeline: crawls the WhatLinksHere pages of each entity type, and feeds the item ids of each page
+        through a bounded queue to n_core workers retrieving the data of each item with getEntityData.
+        Listing the pages, parsing them and fetching entity data thus overlap, instead of waiting for the whole listing to be done.
+        Also fills self.list_entities and saves the item ids in the **wikidatalinks** folder.
+
+        :param n_core: Number of workers fetching entity data, defaults to 4
+        :type n_core: int, optional
+        :param save2disk: Whether to save entity data on disk, defaults to True
+        :type save2disk: bool, optional
+        :param queue_size: Maximum number of item ids waiting to be fetched. If 0, set to 10 times n_core, defaults to 0
+        :type queue_size: int, optional
+        :return: Return list of dictionnaries containing entities data
+        :rtype: List[dict]
+        """
+
+        list_stages = [
+            ('entityData', lambda item: self.getEntityData(item[0], entityType=item[1], save2disk=save2disk), n_core, 'thread')
+        ]
+
+        self.list_entities_data = self.__streamStages(self.__iterEntityIds(), list_stages, queue_size=queue_size if queue_size else 10 * n_core)
+        return self.list_entities_data
+
+    def streamListEntities(self, save2disk : bool = True, return_results : bool = False, queue_size:int = 0) -> List[dict]:
+        """
+        Streaming alternative to processListEntities: instead of waiting for every entity to be done with a stage before starting
+        the next one, each entity flows through fetch -> content -> labels -> properties -> findSentences -> other sentences independently.
+        Each stage has its own n_core workers: threads for the I/O-bound stages, processes for findSentences, which is CPU-bound.
+        Queues between stages are bounded and, unless return_results is True, processed entities are not kept in memory, so memory stays
+        constant regardless of the number of entities. Entities are then only available on disk, through loadEntitiesData.
+
+        :param save2disk: Whether to save entity data on disk, defaults to True
+        :type save2disk: bool, optional
+        :param return_results: Whether to keep and return the processed entities, defaults to False
+        :type return_results: bool, optional
+        :param queue_size: Maximum number of entities waiting between two stages. If 0, set to 2 times n_core, defaults to 0
+        :type queue_size: int, optional
+        :return: Processed entities with their data, if return_results is True
+        :rtype: List[dict]
+        """
+
+        n_core = self.n_core
+        source_doc = self.parameters['source_doc']
+        score_cutoff = self.parameters['score_cutoff']
+        match_strategy = self.parameters.get('match_strategy', 'fuzzy')
+        getOther = self.parameters['getOther']
+        maxsizesent = self.parameters['maxsizesent']
+        maxsize = 0
+
+        list_stages = [
+            ('entityData', lambda item: self.getEntityData(item[0], entityType=item[1], save2disk=save2disk), n_core, 'thread'),
+            ('content', partial(self.getEntityWikipediaContent, save2disk=save2disk), n_core, 'thread'),
+            ('labels', partial(self.getEntityLabels, save2disk=save2disk), n_core, 'thread'),
+            ('properties', partial(self.getProperty4Entity, save2disk=save2disk), n_core, 'thread'),
+            ('sentences', partial(self.findSentences, source_doc=source_doc, score_cutoff=score_cutoff, match_strategy=match_strategy, save2disk=save2disk), n_core, 'process')
+        ]
+        if getOther:
+            list_stages.append(
+                ('other', partial(self.getOtherSentences, maxsizesent=maxsizesent, maxsize=maxsize, save2disk=save2disk), n_core, 'thread')
+            )
+
+        results = self.__streamStages(self.__iterEntityIds(), list_stages, queue_size=queue_size if queue_size else 2 * n_core, return_results=return_results)
+
+        if return_results:
+            self.list_entities_data = results
+            return results
+
+    def __getstate__(self) -> dict:
+        # DARES is sent to worker processes by streamListEntities: the spaCy
+        # pipeline and the entities data are not needed there
+        state = self.__dict__.copy()
+        for k in ('nlp', 'tp', 'segmenter', 'list_entities', 'list_entities_data'):
+            state.pop(k, None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.nlp, self.tp, self.segmenter = None, None, None
+        self.list_entities, self.list_entities_data = [], []
+
     def getEntityLabels(self, entityData: dict, default_lg: str = 'en', save2disk : bool = True) -> dict:
         """
         Returns list of labels and aliases of given entity in given language. If selected language is not available, will select default language
@@ -347,45 +787,27 @@ class DARES:
         :rtype: dict
         """
 
-        def getAliases(labels: List[str]):
-
-            aliases = data['aliases'][self.lg]
-            func_labels_append = labels.append
-            for i in range(len(aliases)):
-                func_labels_append(aliases[i]['value'])
-            return labels
-
         entityID = entityData['id']
         # print(entityID)
 
         try:
-            data = entityData['data']['entities'][entityID]
+            data = entityData['data']
             # first gets its main label
             if self.lg in data['labels']:
-                labels = [data['labels'][self.lg]['value']]
+                labels = [data['labels'][self.lg]]
 
             else:
                 # by default, selects text in English if 
                 # selected language is not available
-                labels = [data['labels'][default_lg]['value']]
+                labels = [data['labels'][default_lg]]
 
             # adds aliases if they exist in the given language
-            # and if there are any alias
-            if len(data['aliases']) != 0:
-                try:
-                    if self.lg in data['aliases']:
-                        labels = getAliases(labels)
-                    # else:
-                    #     labels = getAliases(labels, default_lg)
-                # if neither selected or default language are avaible
-                except KeyError:
-                    entityData['labels'] = labels
-                    return entityData    
+            labels.extend(data['aliases'])
 
             entityData['labels'] = labels
 
             if save2disk:
-                saveEntitiesData(savepath=self.folderpath, entityData=entityData)
+                self.__saveStage(entityData, stage='labels', keys=['labels'])
 
                 # with open(f"{savepath}/{entityData['id']}.json", 'w', encoding='utf-8') as f:
                 #     json.dump(entityData, f, indent=4)
@@ -395,7 +817,7 @@ class DARES:
         # if neither selected or default language are avaible
         except KeyError:
             if save2disk:
-                os.system(f"rm {self.project_path}/entity_data/{entityData['type']}/{entityData['id']}.json")    
+                self.__saveStage(entityData, stage='labels', dropped=True)
 
     def multi_getEntityLabels(self, n_core:int =4, save2disk : bool = True) -> List[dict]:
         """
@@ -412,7 +834,7 @@ class DARES:
         """
 
         with Pool(n_core) as p:
-            partial_func = partial(self.getEntityLabels, save2disk=save2disk)
+            partial_func = partial(self.__runStage, stage='labels', func=self.getEntityLabels, save2disk=save2disk)
             list_entities_data = p.map(partial_func, self.list_entities_data)
             self.list_entities_data = [x for x in list_entities_data if x]
 
@@ -436,10 +858,11 @@ class DARES:
         """
 
         entityID = entityData['id']
-        data = entityData['data']['entities'][entityID]['sitelinks']
+        url = entityData['data']['sitelink']
         
         try:
-            url = data[f'{self.lg}wiki']['url']
+            if not url:
+                raise KeyError(f'{self.lg}wiki')
             req = requests.get(url)
             wikipedia_page = BeautifulSoup(req.content, 'lxml')
             entityData['wikipedia'] = {'url': url, 'doc': wikipedia_page}
@@ -450,7 +873,7 @@ class DARES:
 
             if toSent:
                 all_sents = []
-                for doc in self.nlp.pipe(p_tags):
+                for doc in self.segmenter.pipe(p_tags):
                     for sent in doc.sents:
                         all_sents.append(str(sent))
                     # sents = list(str(doc.sents))
@@ -467,7 +890,7 @@ class DARES:
             del entityData['wikipedia']['doc']
 
             if save2disk:
-                saveEntitiesData(savepath=self.folderpath, entityData=entityData)
+                self.__saveStage(entityData, stage='content', keys=['wikipedia'])
 
                 # with open(f"{savepath}/{entityData['id']}.json", 'w', encoding='utf-8') as f:
                 #     json.dump(entityData, f, indent=4)
@@ -476,7 +899,7 @@ class DARES:
 
         except:
             if save2disk:
-                os.system(f"rm {self.project_path}/entity_data/{entityData['type']}/{entityData['id']}.json")    
+                self.__saveStage(entityData, stage='content', dropped=True)
 
     def multi_getEntityWikipediaContent(self, n_core:int =4 , save2disk : bool = True) -> List[dict]:
         """
@@ -493,7 +916,7 @@ class DARES:
         """
 
         with Pool(n_core) as p:
-            partial_func = partial(self.getEntityWikipediaContent, save2disk=save2disk)
+            partial_func = partial(self.__runStage, stage='content', func=self.getEntityWikipediaContent, save2disk=save2disk)
             list_entities_data = p.map(partial_func, self.list_entities_data)
             self.list_entities_data = [x for x in list_entities_data if x]
 
@@ -547,7 +970,7 @@ class DARES:
         """
 
         entityID = entityData['id']
-        data = entityData['data']['entities'][entityID]['claims']
+        data = entityData['data']['claims']
 
         ent_prop = [x for x in self.entities if x['type'] == entityData['type']][0]
         # print(entityID, entityData['type'], ent_prop)
@@ -561,7 +984,7 @@ class DARES:
 
                 for i in range(len(data[propertyID])):
                     try:
-                        valueData = data[propertyID][i]['mainsnak']['datavalue']
+                        valueData = data[propertyID][i]
 
                         if valueData['type'] == 'wikibase-entityid':
                             value_entityId = valueData['value']['id']
@@ -616,7 +1039,7 @@ class DARES:
                 # entityData['properties'][propertyID] = list_propvalues
 
         if save2disk:
-            saveEntitiesData(savepath=self.folderpath, entityData=entityData)
+            self.__saveStage(entityData, stage='properties', keys=['properties'])
 
             # with open(f"{savepath}/{entityData['id']}.json", 'w', encoding='utf-8') as f:
             #     json.dump(entityData, f, indent=4)
@@ -640,74 +1063,57 @@ class DARES:
         """
         
         with Pool(n_core) as p:
-            partial_func = partial(self.getProperty4Entity, save2disk=save2disk)
+            partial_func = partial(self.__runStage, stage='properties', func=self.getProperty4Entity, save2disk=save2disk)
             list_entities_data = p.map(partial_func, self.list_entities_data)
             self.list_entities_data = list_entities_data
 
         return list_entities_data
 
 
-    def __measureSim(self, sentences: List[str], values: List[str], score_cutoff : float, filter: bool = True) -> pd.DataFrame:
+    def __measureSim(self, sentences: List[str], values: List[str], score_cutoff : float, match_strategy: str = 'fuzzy') -> np.ndarray:
         """
         NOT TO USE DIRECTLY
-        Uses rapidfuzz to measure similarity between sentences and set of values. Returns DataFrame with only values different than 0
+        Uses rapidfuzz to measure similarity between sentences and set of values, using all available threads. Scores under score_cutoff are set to 0.
+        With the "exact" strategy, only values appearing verbatim in a sentence are kept. With the "staged" strategy, exact matches are found first, then
+        the scorer is only run on sentences sharing a rare token with a value (see matcher.stagedSimMatrix)
 
         :param sentences: List of sentence to check
         :type sentences: List[str]
         :param values: Values to find in sentences
         :type values: List[str]
-        :param scorer: Scorer function to use for fuzzy matching between sentences and labels
-        :type scorer: Callable
         :param score_cutoff: Minimum similarity threshold to reach
         :type score_cutoff: float
-        :param filter: Option to remove empty cells, defaults to True
-        :type filter: bool, optional
-        :return: Dataframe of sentence - labels similarity scores
-        :rtype: pd.DataFrame
+        :param match_strategy: Either "fuzzy", "exact" or "staged", defaults to 'fuzzy'
+        :type match_strategy: str, optional
+        :return: Matrix of N sentences by M values similarity scores
+        :rtype: np.ndarray
         """
 
-        sim_matrix = process.cdist(sentences, values, scorer=self.scorer, score_cutoff = score_cutoff)
-        
-        # outputs a matrix of N sentences by M properties
-        df = pd.DataFrame(sim_matrix)
-
-        # only keeps row where there at least one value not NaN
-        if filter:
-            df = df[df.iloc[:, :] > 0]
-            df.dropna(inplace=True, how='all')
-
-        return df
+        if match_strategy == 'fuzzy':
+            return process.cdist(sentences, values, scorer=self.scorer, score_cutoff = score_cutoff, workers=-1)
+        elif match_strategy in ('exact', 'staged'):
+            return stagedSimMatrix(sentences, values, self.scorer, score_cutoff, fuzzy = match_strategy == 'staged')
+        else:
+            raise Exception(f'Unknown match strategy {match_strategy}. Please use either fuzzy, exact or staged')
 
     def __findSourceinSent(self, labels: List[str], sentences: List[str]) -> List[str]:
         """
         NOT TO USE DIRECTLY
-        Regex to find which entity label appears in each sentence
+        Finds which entity label appears in each sentence. All labels are searched at once with an Aho-Corasick automaton, and the leftmost-longest occurrence is kept
 
         :param labels: Entity labels or aliases to search in sentences. Must be exact match
         :type labels: List[str]
         :param sentences: Sentences in which to search for entity mentions
         :type sentences: List[str]
-        :return: List of sentences where there was a match
+        :return: Label found in each sentence, or NO-MATCH
         :rtype: List[str]
         """
 
-        search_labels = [re.escape(x) for x in labels]
-        search_labels = "|".join(search_labels)
-        re_labels = re.compile(f'({search_labels})')
-        # print(re_labels)
-        list_match = []
-        func_list_match = list_match.append
-        for sent in sentences:
-            search_re = re_labels.search(sent)
-            if search_re:
-                func_list_match(search_re.group(0))
-            else:
-                # adds a NO-MATCH "sentence" if there's no match
-                func_list_match('NO-MATCH')
-        return list_match
+        # adds a NO-MATCH "sentence" if there's no match
+        return LabelAutomaton(labels).matchSentences(sentences, default='NO-MATCH')
 
 
-    def findSentences(self, entityData: dict, source_doc: str = 'wikipedia',  score_cutoff: int = 90, save2disk : bool = True) -> dict:
+    def findSentences(self, entityData: dict, source_doc: str = 'wikipedia',  score_cutoff: int = 90, match_strategy: str = 'fuzzy', save2disk : bool = True) -> dict:
         """
         Finds most similar sentences in source document to the Source and Target values of each properties selected for this entity
 
@@ -719,6 +1125,8 @@ class DARES:
         :type scorer: function
         :param score_cutoff: Minimum similarity threshold to reach
         :type score_cutoff: int
+        :param match_strategy: How values are matched to sentences, either "fuzzy" (scorer on every pair), "exact" or "staged" (exact matches, then scorer on candidate sentences only), defaults to 'fuzzy'
+        :type match_strategy: str, optional
         :param savepath: Path to save file, defaults to None
         :type savepath: str, optional
         :return: Updated entity data dictionary with sentences matching properties
@@ -729,58 +1137,45 @@ class DARES:
         # finds entity labels appearing in each sentence
         list_match = self.__findSourceinSent(entityData['labels'], all_sents)
 
+        # scores the values of all properties in a single call, each property
+        # then reads its own slice of columns
+        all_values = [x['value'] for prop_data in entityData['properties'] for x in prop_data['values']]
+        sim_matrix = self.__measureSim(all_sents, all_values, score_cutoff=score_cutoff, match_strategy=match_strategy)
+
+        start = 0
         for prop_data in entityData['properties']:
-            # finds sentences where properties are mentioned 
-            df_target = self.__measureSim(all_sents, [x['value'] for x in prop_data['values']], score_cutoff=score_cutoff)
-
-            selected_sents = []
-            func_append = selected_sents.append
-
-            # iterates over the matrix to retrieve sentences, source
-            # and targets
-            for c in df_target.columns:
-                target = prop_data['values'][c]
-                target_label = target['value']
-                target_type = target['type']
-
-                for i in df_target.index:
-                    sent = all_sents[i]
-                    sim = df_target.loc[i][c]
-                    source_value = list_match[i]
-
-                    if sim > 0:
-                        func_append(
-                            {
-                                "prop": self.relation_names[prop_data['propertyID']]['label'],
-                                "sent": sent,
-                                'source': source_value,
-                                "source_type": self.relation_names[prop_data['propertyID']]['source'],
-                                "target": target_label,
-                                "target_type": self.relation_names[prop_data['propertyID']]['target']
-                                # "sim": sim
-                            }
-                            # {
-                            #     "prop": prop_data['propertyID'],
-                            #     "sent": sent,
-                            #     'source': source_value,
-                            #     "source_type": entityData['type'],
-                            #     "target": target_label,
-                            #     "target_type": target_type
-                            #     # "sim": sim
-                            # }
-                            )
+            end = start + len(prop_data['values'])
+            relation = self.relation_names[prop_data['propertyID']]
+
+            # nonzero over the transposed slice gives the matches value by value,
+            # then sentence by sentence
+            list_c, list_i = np.nonzero(sim_matrix[:, start:end].T)
+            start = end
+
+            selected_sents = [
+                {
+                    "prop": relation['label'],
+                    "sent": all_sents[i],
+                    'source': list_match[i],
+                    "source_type": relation['source'],
+                    "target": prop_data['values'][c]['value'],
+                    "target_type": relation['target']
+                    # "sim": sim
+                }
+                for c, i in zip(list_c.tolist(), list_i.tolist())
+            ]
 
             prop_data['sents'] = selected_sents
 
         if save2disk:
-            saveEntitiesData(savepath=self.folderpath, entityData=entityData)
+            self.__saveStage(entityData, stage='sentences', keys=['properties'])
 
             # with open(f"{savepath}/{entityData['id']}.json", 'w', encoding='utf-8') as f:
             #     json.dump(entityData, f, indent=4)
                 
         return entityData
 
-    def multi_findSentences(self, source_doc: str = 'wikipedia', n_core:int=4,  score_cutoff: int = 90, save2disk : bool = True) -> List[dict]:
+    def multi_findSentences(self, source_doc: str = 'wikipedia', n_core:int=4,  score_cutoff: int = 90, match_strategy: str = 'fuzzy', save2disk : bool = True) -> List[dict]:
         """
         Applies findSentences in parallel processing
 
@@ -794,6 +1189,8 @@ class DARES:
         :type scorer: function
         :param score_cutoff: Minimum similarity threshold to reach
         :type score_cutoff: float
+        :param match_strategy: Either "fuzzy", "exact" or "staged", defaults to 'fuzzy'
+        :type match_strategy: str, optional
         :param savepath: Path to save file, defaults to None
         :type savepath: str, optional
         :return: Return list of dictionnaries containing entities with updated data
@@ -801,7 +1198,7 @@ class DARES:
         """
 
         with Pool(n_core) as p:
-            partial_func = partial(self.findSentences, source_doc = source_doc, score_cutoff=score_cutoff, save2disk=save2disk)
+            partial_func = partial(self.__runStage, stage='sentences', func=self.findSentences, source_doc = source_doc, score_cutoff=score_cutoff, match_strategy=match_strategy, save2disk=save2disk)
 
             list_entities_data = p.map(partial_func, self.list_entities_data)
             self.list_entities_data = list_entities_data
@@ -852,7 +1249,7 @@ class DARES:
 
 
         if save2disk:
-            saveEntitiesData(savepath=self.folderpath, entityData=entityData)
+            self.__saveStage(entityData, stage='other', keys=['properties'])
 
             # with open(f"{savepath}/{entityData['id']}.json", 'w', encoding='utf-8') as f:
             #     json.dump(entityData, f, indent=4)
@@ -875,7 +1272,7 @@ class DARES:
         """
 
         with Pool(n_core) as p:
-            partial_func = partial(self.getOtherSentences, maxsizesent=maxsizesent, maxsize = maxsize, save2disk=save2disk)
+            partial_func = partial(self.__runStage, stage='other', func=self.getOtherSentences, maxsizesent=maxsizesent, maxsize = maxsize, save2disk=save2disk)
             list_entities_data = p.map(partial_func, self.list_entities_data)
             self.list_entities_data = list_entities_data
 
@@ -908,19 +1305,26 @@ class DARES:
         n_core = self.n_core
         source_doc = self.parameters['source_doc']
         score_cutoff = self.parameters['score_cutoff']
+        match_strategy = self.parameters.get('match_strategy', 'fuzzy')
         getOther = self.parameters['getOther']
         maxsizesent = self.parameters['maxsizesent']
         maxsize = 0 
 
+        if self.parameters.get('streaming', False):
+            return self.streamListEntities(save2disk=save2disk, return_results=return_results)
+
         maxstep = 5
         if getOther:
             maxstep = 6
 
-        # TODO : check if self.list_entities exists otherwise raise Exception
-
         print(f'Step 1/{maxstep}')
         print('Collecting Entity data...')
-        list_entities_data = self.multi_getEntityData(n_core=n_core, save2disk=save2disk)
+        if self.list_entities:
+            list_entities_data = self.multi_getEntityData(n_core=n_core, save2disk=save2disk)
+        else:
+            # collect_Wikidata_links was not called: lists the items and
+            # fetches their data in a single streaming stage
+            list_entities_data = self.streamEntityData(n_core=n_core, save2disk=save2disk)
         print('Entity data collected')
         
         print(f'Step 2/{maxstep}')
@@ -941,7 +1345,7 @@ class DARES:
 
         print(f'Step 5/{maxstep}')
         print('Collecting sentences...')
-        list_entities_data = self.multi_findSentences(source_doc=source_doc, n_core=n_core, score_cutoff=score_cutoff, save2disk=save2disk)
+        list_entities_data = self.multi_findSentences(source_doc=source_doc, n_core=n_core, score_cutoff=score_cutoff, match_strategy=match_strategy, save2disk=save2disk)
         print('Sentences collected')
 
         if getOther:
@@ -954,18 +1358,35 @@ class DARES:
             return list_entities_data
     
     def extract_sdp(self, keep_filter_prop:List[str]=[]) :
+        """
+        Finds the Shortest Dependency Path between the Source and Target entities of the sentences collected by processListEntities, and saves the corpus.
+        With "processing_mode" set to "process" in the parameters, the corpus is processed by a pool of processes and only the ids of the saved documents are returned
+
+        :param keep_filter_prop: Labels of the properties to keep, defaults to all properties
+        :type keep_filter_prop: List[str], optional
+        :return: The processed corpus, or the ids of its documents
+        :rtype: List[dict]
+        """
         
         n_core = self.n_core
         removeNoMatch = self.parameters['removeNoMatch']
+        mode = self.parameters.get('processing_mode', 'thread')
+
+        if not getattr(self, 'list_entities_data', None):
+            # entities processed by streamListEntities are only kept on disk;
+            # only those which went through findSentences are used
+            list_entities_data = loadEntitiesData(self.folderpath)
+            self.list_entities_data = [x for x in list_entities_data if 'sentences' in x.get('stages', ['sentences'])]
+
         if keep_filter_prop:
             keep_filter_prop = keep_filter_prop
         else: 
             # keep_filter_prop = list(self.relation_names.keys())
             keep_filter_prop = [x['label'] for x in self.relation_names.values()]
         
-        corpus = self.tp.prepare_corpus(list_entities_data=self.list_entities_data, removeNoMatch=removeNoMatch, keep_filter_prop=keep_filter_prop, n_core=n_core)
+        corpus = self.tp.prepare_corpus(list_entities_data=self.list_entities_data, removeNoMatch=removeNoMatch, keep_filter_prop=keep_filter_prop, n_core=n_core, mode=mode)
         
-        corpus = self.tp.processCorpus(corpus=corpus, savepath=self.folderpath)
+        corpus = self.tp.processCorpus(corpus=corpus, n_core=n_core, savepath=self.folderpath, mode=mode)
         
 
         # print("Length corpus:", len(corpus)) 
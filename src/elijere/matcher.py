@@ -0,0 +1,290 @@
+import sys
+
+sys.path.append('..')
+
+import re
+import unicodedata
+from typing import List, Tuple, Callable, Set
+from collections import deque, defaultdict
+import numpy as np
+from rapidfuzz import process
+
+
+class LabelAutomaton:
+    """
+    Aho-Corasick automaton over a set of labels. All labels are searched in a single linear scan of the text, whatever their number, and matches are resolved leftmost-longest: the match starting first wins, and the longest label wins among those starting at the same position. Labels are matched exactly, as the regular expression they replace.
+    """
+
+    def __init__(self, labels: List[str]) -> None:
+        """
+        Builds the trie of the labels and its failure links
+
+        :param labels: Labels to search. Empty and duplicated labels are ignored
+        :type labels: List[str]
+        """
+
+        # one entry per state: transitions, failure link, depth in the trie and
+        # lengths of the labels ending at this state, longest first
+        self.goto = [{}]
+        self.fail = [0]
+        self.depth = [0]
+        self.out = [[]]
+
+        for label in labels:
+            if not label:
+                continue
+            node = 0
+            for char in label:
+                child = self.goto[node].get(char)
+                if child is None:
+                    child = len(self.goto)
+                    self.goto[node][char] = child
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.depth.append(self.depth[node] + 1)
+                    self.out.append([])
+                node = child
+            self.out[node] = [len(label)]
+
+        # breadth-first, so that the failure link of a state is always computed
+        # before those of its children
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                fail = self.fail[node]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                fail = self.goto[fail].get(char, 0)
+                self.fail[child] = fail if fail != child else 0
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+                queue.append(child)
+
+    def __iterEnds(self, text: str):
+        """
+        NOT TO USE DIRECTLY
+        Scans the text and yields, for each position where at least one label ends, the end offset and the state reached
+
+        :param text: Text to scan
+        :type text: str
+        """
+
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for pos, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                yield pos + 1, node
+
+    def findFirst(self, text: str) -> Tuple[int, int]:
+        """
+        Returns the leftmost-longest label occurrence in the text
+
+        :param text: Text to search
+        :type text: str
+        :return: Start and end offsets of the match, or None if no label occurs in the text
+        :rtype: Tuple[int, int]
+        """
+
+        best = None
+        for end, node in self.__iterEnds(text):
+            # the longest label ending here is also the one starting first
+            start = end - self.out[node][0]
+            if best is None or start < best[0] or (start == best[0] and end > best[1]):
+                best = (start, end)
+            # no label ending later can start at or before the best match
+            # once the current state does not reach back to it
+            elif end - self.depth[node] > best[0]:
+                break
+
+        return best
+
+    def findAll(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Returns all non overlapping leftmost-longest label occurrences in the text
+
+        :param text: Text to search
+        :type text: str
+        :return: List of start and end offsets of the matches, in order of appearance
+        :rtype: List[Tuple[int, int]]
+        """
+
+        candidates = [(end - length, end) for end, node in self.__iterEnds(text) for length in self.out[node]]
+        candidates.sort(key=lambda x: (x[0], -x[1]))
+
+        matches = []
+        last_end = 0
+        for start, end in candidates:
+            if start >= last_end:
+                matches.append((start, end))
+                last_end = end
+
+        return matches
+
+    def findLabels(self, text: str) -> Set[str]:
+        """
+        Returns every label occurring in the text, overlapping occurrences included
+
+        :param text: Text to search
+        :type text: str
+        :return: Set of labels found in the text
+        :rtype: Set[str]
+        """
+
+        return {text[end - length:end] for end, node in self.__iterEnds(text) for length in self.out[node]}
+
+    def matchSentences(self, sentences: List[str], default: str = 'NO-MATCH') -> List[str]:
+        """
+        Returns the leftmost-longest label found in each sentence
+
+        :param sentences: Sentences in which to search for labels
+        :type sentences: List[str]
+        :param default: Value returned for sentences without any label, defaults to 'NO-MATCH'
+        :type default: str, optional
+        :return: Label found in each sentence, or default value
+        :rtype: List[str]
+        """
+
+        list_match = []
+        func_list_match = list_match.append
+        for sent in sentences:
+            match = self.findFirst(sent)
+            func_list_match(sent[match[0]:match[1]] if match else default)
+        return list_match
+
+
+class TokenIndex:
+    """
+    Inverted index from normalized tokens to the sentences containing them. Tokens are lowercased and stripped of their accents, so that the index only narrows down the sentences worth scoring and never decides a match on its own.
+    """
+
+    re_token = re.compile(r'\w+')
+
+    def __init__(self, sentences: List[str]) -> None:
+        """
+        :param sentences: Sentences to index
+        :type sentences: List[str]
+        """
+
+        self.n_sents = len(sentences)
+        self.index = defaultdict(set)
+        for i, sent in enumerate(sentences):
+            for token in self.tokenize(sent):
+                self.index[token].add(i)
+
+    @classmethod
+    def tokenize(cls, text: str) -> Set[str]:
+        """
+        Returns the set of normalized tokens of a text
+
+        :param text: Text to tokenize
+        :type text: str
+        :return: Normalized tokens
+        :rtype: Set[str]
+        """
+
+        text = unicodedata.normalize('NFKD', text.casefold())
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+        return set(cls.re_token.findall(text))
+
+    def candidates(self, text: str, max_df: float = 0.5) -> List[int]:
+        """
+        Returns the sentences sharing at least one rare token with the text. Tokens appearing in more than max_df of the sentences are ignored, unless the text only has such tokens, in which case its rarest token is used
+
+        :param text: Text whose tokens are looked up
+        :type text: str
+        :param max_df: Maximum share of sentences a token can appear in to be used, defaults to 0.5
+        :type max_df: float, optional
+        :return: Ids of the candidate sentences, sorted
+        :rtype: List[int]
+        """
+
+        tokens = [x for x in self.tokenize(text) if x in self.index]
+        if not tokens:
+            return []
+
+        rare = [x for x in tokens if len(self.index[x]) <= max_df * self.n_sents]
+        if not rare:
+            rare = [min(tokens, key=lambda x: len(self.index[x]))]
+
+        return sorted(set().union(*[self.index[x] for x in rare]))
+
+
+def stagedSimMatrix(sentences: List[str], values: List[str], scorer: Callable, score_cutoff: float, fuzzy: bool = True, max_df: float = 0.5) -> np.ndarray:
+    """
+    Computes the same sentence - value similarity matrix as process.cdist with a partial scorer (e.g. fuzz.partial_ratio), in stages:
+    values occurring verbatim in a sentence are found with a LabelAutomaton and score 100, then, if fuzzy, the remaining pairs are only
+    scored for the sentences sharing a rare token with the value, as given by a TokenIndex. Fuzzy matches without any token in common
+    with the value are missed, which can be measured with matchRecall.
+
+    :param sentences: List of sentence to check
+    :type sentences: List[str]
+    :param values: Values to find in sentences
+    :type values: List[str]
+    :param scorer: Scorer function to use for fuzzy matching between sentences and values
+    :type scorer: Callable
+    :param score_cutoff: Minimum similarity threshold to reach
+    :type score_cutoff: float
+    :param fuzzy: Scores candidate sentences with scorer after exact matching, defaults to True
+    :type fuzzy: bool, optional
+    :param max_df: Maximum share of sentences a token can appear in to select candidates, defaults to 0.5
+    :type max_df: float, optional
+    :return: Matrix of N sentences by M values similarity scores, 0 under score_cutoff
+    :rtype: np.ndarray
+    """
+
+    sim_matrix = np.zeros((len(sentences), len(values)), dtype=np.float32)
+
+    # a value can be given several times, e.g. by two entities sharing an alias
+    dict_cols = defaultdict(list)
+    for j, value in enumerate(values):
+        dict_cols[value].append(j)
+
+    automaton = LabelAutomaton(list(dict_cols.keys()))
+    for i, sent in enumerate(sentences):
+        for value in automaton.findLabels(sent):
+            sim_matrix[i, dict_cols[value]] = 100
+
+    if not fuzzy:
+        return sim_matrix
+
+    index = TokenIndex(sentences)
+    for value, cols in dict_cols.items():
+        for i in index.candidates(value, max_df=max_df):
+            if sim_matrix[i, cols[0]]:
+                continue
+            score = scorer(sentences[i], value, score_cutoff=score_cutoff)
+            if score:
+                sim_matrix[i, cols] = score
+
+    return sim_matrix
+
+
+def matchRecall(sentences: List[str], values: List[str], scorer: Callable, score_cutoff: float, max_df: float = 0.5) -> float:
+    """
+    Checks stagedSimMatrix against the brute force process.cdist result, to choose max_df or a matching strategy on a sample of entities
+
+    :param sentences: List of sentence to check
+    :type sentences: List[str]
+    :param values: Values to find in sentences
+    :type values: List[str]
+    :param scorer: Scorer function to use for fuzzy matching between sentences and values
+    :type scorer: Callable
+    :param score_cutoff: Minimum similarity threshold to reach
+    :type score_cutoff: float
+    :param max_df: Maximum share of sentences a token can appear in to select candidates, defaults to 0.5
+    :type max_df: float, optional
+    :return: Share of the brute force (sentence, value) matches also found by the staged matcher, 1 if there are none
+    :rtype: float
+    """
+
+    brute = process.cdist(sentences, values, scorer=scorer, score_cutoff=score_cutoff, workers=-1) > 0
+    staged = stagedSimMatrix(sentences, values, scorer, score_cutoff, max_df=max_df) > 0
+
+    n_brute = brute.sum()
+    if n_brute == 0:
+        return 1.
+
+    return float((brute & staged).sum() / n_brute)
@@ -2,21 +2,19 @@
 import sys 
 sys.path.append('..')
 
-from typing import List, Callable
+from typing import List, Callable, TYPE_CHECKING
 # from multiprocessing.dummy import Pool
 
-import pandas as pd
 from networkx.classes.graph import Graph
 from networkx.classes.reportviews import NodeView
 
-from sklearn.feature_extraction.text import TfidfTransformer
 import networkx as nx
-from collections import Counter
+from collections import Counter, defaultdict
+from time import perf_counter
 from networkx.algorithms.isomorphism import DiGraphMatcher
-import spacy
 # import fuzzyMatch 
 
-from .utils import nodeEq, edgeEq, getRelationNames, getNodeText, vizGraph, doc2graph, node_subst_cost, node_del_cost, node_ins_cost, edge_subst_cost, edge_del_cost, edge_ins_cost
+from .utils import atomicJSONDump, getPeakRSS, getSizeHistogram, iterDocBins, nodeEq, edgeEq, getRelationNames, getNodeText, vizGraph, doc2graph, node_subst_cost, node_del_cost, node_ins_cost, edge_subst_cost, edge_del_cost, edge_ins_cost
 # getGraphPaths
 
 # from nltk import ngrams
@@ -26,21 +24,168 @@ from functools import partial
 from itertools import groupby
 import os
 import json
-from scipy import stats
 
 import copy
 from glob import glob 
 
 from itertools import combinations, groupby
 
-from sklearn.metrics import precision_score, recall_score, f1_score, classification_report
 
-import Levenshtein as lvhst
 
 from functools import reduce
 
 import numpy as np
 
+# training, evaluation and spaCy dependencies are imported by the methods
+# using them, so that importing the model only loads what inference needs
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class ExtractionStats:
+    """
+    Collects statistics about fact extraction, when enabled with ELIJERE.enableStats: the time spent in each stage, the number of candidates
+    per sentence, the number of DiGraphMatcher tests, strict and relaxed, and the hits of the anchors in the Syntactic Index.
+    Stages are nested: predict includes matchPattern and semanticClassification, and candidates includes its own DiGraphMatcher tests.
+    Each observation is also sent to the callbacks, as callback(name, value, attributes), e.g. to update Prometheus or OpenTelemetry instruments
+    """
+
+    def __init__(self, callbacks: List[Callable] = []) -> None:
+        """
+        :param callbacks: Functions called with the name, the value and the attributes of each observation, defaults to []
+        :type callbacks: List[Callable], optional
+        """
+        self.callbacks = list(callbacks)
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Resets the statistics, but keeps the callbacks
+        """
+        self.stage_seconds = defaultdict(float)
+        self.stage_calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        # number of candidates -> number of sentences
+        self.candidates = Counter()
+
+    def addCallback(self, callback: Callable) -> None:
+        """
+        Adds a function called with the name, the value and the attributes of each observation
+
+        :param callback: Function to call
+        :type callback: Callable
+        """
+        self.callbacks.append(callback)
+
+    def emit(self, name: str, value: float, attributes: dict) -> None:
+        """
+        NOT TO USE DIRECTLY
+        Sends an observation to the callbacks
+        """
+        for callback in self.callbacks:
+            callback(name, value, attributes)
+
+    def observeStage(self, stage: str, seconds: float) -> None:
+        """
+        Records the duration of a stage
+
+        :param stage: Name of the stage
+        :type stage: str
+        :param seconds: Duration of the stage
+        :type seconds: float
+        """
+        self.stage_seconds[stage] += seconds
+        self.stage_calls[stage] += 1
+        self.emit('elijere_stage_seconds', seconds, {'stage': stage})
+
+    def timed(self, stage: str, func: Callable) -> Callable:
+        """
+        Wraps func so that each of its calls is recorded as the given stage
+
+        :param stage: Name of the stage
+        :type stage: str
+        :param func: Function to time
+        :type func: Callable
+        :return: Wrapped function
+        :rtype: Callable
+        """
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.observeStage(stage, perf_counter() - start)
+        return wrapper
+
+    def count(self, name: str, **attributes) -> None:
+        """
+        Increments a counter, e.g. count('matcher_calls', mode='strict', matched=True)
+
+        :param name: Name of the counter
+        :type name: str
+        """
+        self.counters[(name, tuple(sorted(attributes.items())))] += 1
+        self.emit(f'elijere_{name}_total', 1, attributes)
+
+    def observeCandidates(self, n_candidates: int) -> None:
+        """
+        Records the number of candidates found in a sentence
+
+        :param n_candidates: Number of candidates
+        :type n_candidates: int
+        """
+        self.candidates[n_candidates] += 1
+        self.emit('elijere_candidates_per_sentence', n_candidates, {})
+
+    def getCount(self, name: str, **attributes) -> int:
+        """
+        Sums a counter over the values of the attributes which are not given
+
+        :param name: Name of the counter
+        :type name: str
+        :return: Value of the counter
+        :rtype: int
+        """
+        return sum(v for (k, attrs), v in self.counters.items() if k == name and set(attributes.items()).issubset(attrs))
+
+    def summary(self) -> dict:
+        """
+        Returns the statistics collected so far
+
+        :return: Dictionary of the statistics
+        :rtype: dict
+        """
+        n_sentences = sum(self.candidates.values())
+        n_candidates = sum(k * v for k, v in self.candidates.items())
+
+        return {
+            "sentences": n_sentences,
+            "stages": {
+                stage: {
+                    "calls": self.stage_calls[stage],
+                    "seconds": seconds,
+                    "mean": seconds / self.stage_calls[stage]
+                }
+                for stage, seconds in self.stage_seconds.items()
+            },
+            "candidates": {
+                "total": n_candidates,
+                "per_sentence": n_candidates / n_sentences if n_sentences else 0,
+                "histogram": dict(sorted(self.candidates.items()))
+            },
+            "matcher": {
+                mode: {
+                    "calls": self.getCount('matcher_calls', mode=mode),
+                    "matches": self.getCount('matcher_calls', mode=mode, matched=True)
+                }
+                for mode in ('strict', 'relaxed')
+            },
+            "index": {
+                "hits": self.getCount('index_lookups', hit=True),
+                "misses": self.getCount('index_lookups', hit=False)
+            }
+        }
+
 
 class SyntacticIndex:
 
@@ -60,6 +205,8 @@ class SyntacticIndex:
         else:
             self.syntacticIndex = {}
             self.syntacticIndexParams = {}
+        # filled by trainSyntacticIndex
+        self.trainingReport = {}
 
 
     def __analyseGraph(self, dict_graph: dict, graphkey:str='graph', anchor_textvalue:str='') -> dict:
@@ -187,14 +334,23 @@ class SyntacticIndex:
         syntactic_index = {}
 
         # gets graph anchor
+        start = perf_counter()
         graph_analysis = self.getGraphAnalysis(list_graphs, anchor_textvalue, graphkey, removeNoAnchor=True)
+        phases = {'anchorAnalysis': perf_counter() - start, 'grouping': 0., 'isomorphismDedup': 0., 'save': 0.}
+        # size, number of patterns, isomorphism tests and duration of each anchor group
+        anchors = []
 
         # groups graph by their anchor
         for anchor, anchor_group in groupby(graph_analysis, lambda x: x['anchortext']):
-                
+
+            start = perf_counter()
             anchor_group = list(anchor_group)
             anchor_group.sort(key=lambda x: x['sdpgraph'].size())
+            group_size = len(anchor_group)
+            phases['grouping'] += perf_counter() - start
 
+            start = perf_counter()
+            isomorphism_tests = 0
             list_candidates = []
             candidate_append = list_candidates.append
 
@@ -205,6 +361,8 @@ class SyntacticIndex:
                 else:
                     candidate = anchor_group.pop(0)
                     candidate_graph = candidate['sdpgraph']
+                    # the candidate is tested against every remaining graph of the group
+                    isomorphism_tests += len(anchor_group)
 
                     # keeps every graph identical to the candidate graph
                     identicals = filter(lambda x: nx.is_isomorphic(candidate_graph, x['sdpgraph'], node_match=nodeEq, edge_match=edgeEq), anchor_group)
@@ -288,9 +446,28 @@ class SyntacticIndex:
                     c['i'] = i + 1
 
                 syntactic_index[anchor] = list_candidates
+
+            seconds = perf_counter() - start
+            phases['isomorphismDedup'] += seconds
+            anchors.append({"anchor": anchor, "graphs": group_size, "patterns": len(list_candidates), "isomorphism_tests": isomorphism_tests, "seconds": seconds})
                 
         if savepath:
+            start = perf_counter()
             self.saveSyntacticIndex(savepath, syntactic_index, anchor_textvalue, graphkey, propkey)
+            phases['save'] = perf_counter() - start
+
+        self.trainingReport = {
+            "graphs": len(list_graphs),
+            "anchored_graphs": len(graph_analysis),
+            "anchors": len(anchors),
+            "patterns": sum(len(x) for x in syntactic_index.values()),
+            "isomorphism_tests": sum(x['isomorphism_tests'] for x in anchors),
+            "phases": phases,
+            "peak_rss_mb": getPeakRSS(),
+            "anchor_group_sizes": getSizeHistogram([x['graphs'] for x in anchors]),
+            "slowest_anchors": sorted(anchors, key=lambda x: x['seconds'], reverse=True)[:20],
+            "patterns_per_anchor": {k: len(v) for k, v in syntactic_index.items()}
+        }
 
         self.syntacticIndex = syntactic_index
         self.syntacticIndexParams = {
@@ -416,12 +593,17 @@ class SemanticIndex():
         :param syntacticIndexPath: Path to project storing the syntacticIndex, defaults to ''
         :type syntacticIndexPath: str, optional
         """
+
+        import pandas as pd
+
         # if not specified, starts with empty index
         if semanticIndexPath:
             self.semanticIndex, self.semanticIndexParams = self.loadSemanticIndex(savepath=semanticIndexPath)
         else:
             self.semanticIndex = pd.DataFrame()
             self.semanticIndexParams = {}
+        # filled by trainSemanticIndex
+        self.trainingReport = {}
 
 
     def __getTermFrequency(self, graph: Graph, textvalue: str = 'text', pos_filter: List[str] = []) -> dict:
@@ -475,7 +657,7 @@ class SemanticIndex():
         # counts frequency of each token representation
         return dict(Counter(tokens))    
         
-    def getTermVectors(self, graph: Graph) -> pd.DataFrame:
+    def getTermVectors(self, graph: Graph) -> 'pd.DataFrame':
         """
         Returns the sum of the vectors of each term in the graph
 
@@ -522,7 +704,12 @@ class SemanticIndex():
         :param savepath: Path to save semantic index, defaults to None
         :type savepath: str, optional
         """
+
+        import pandas as pd
+        from sklearn.feature_extraction.text import TfidfTransformer
+
         tfidf = TfidfTransformer()
+        start = perf_counter()
 
         # needed to select correct graphs
         selected_graphs = []
@@ -547,7 +734,9 @@ class SemanticIndex():
         # groups each doc by its class, then sums up the value of the tokens
         # the matrix is transposed so as to have a token x concept shape
         df_tf = df_tf.groupby('CONCEPT-INDEX').sum().T
+        phases = {'termFrequencies': perf_counter() - start, 'tfidf': 0., 'save': 0.}
 
+        start = perf_counter()
         vec_freq = tfidf.fit_transform(df_tf)
         semantic_index = pd.DataFrame(vec_freq.todense(), columns=df_tf.columns, index=df_tf.index)
         # needed to rename classes to explicit name
@@ -562,9 +751,20 @@ class SemanticIndex():
             semantic_index.drop(semantic_index[semantic_index.index.str.endswith(('PROPN'))].index, axis=0, inplace=True)
 
         semantic_index[semantic_index < min_weight] = 0
+        phases['tfidf'] = perf_counter() - start
 
         if savepath:
+            start = perf_counter()
             self.saveSemanticIndex(savepath, semantic_index, textvalue, pos_filter, dict_rel, removePROPN) 
+            phases['save'] = perf_counter() - start
+
+        self.trainingReport = {
+            "graphs": len(list_graphs),
+            "terms": semantic_index.shape[0],
+            "concepts": semantic_index.shape[1],
+            "phases": phases,
+            "peak_rss_mb": getPeakRSS()
+        }
 
 
         self.semanticIndex = semantic_index
@@ -576,7 +776,7 @@ class SemanticIndex():
             "removePROPN": removePROPN
         }
 
-    def saveSemanticIndex(self, savepath: str, semantic_index: pd.DataFrame, textvalue: str, pos_filter: List[str], dict_rel:dict, removePROPN:bool) -> None:
+    def saveSemanticIndex(self, savepath: str, semantic_index: 'pd.DataFrame', textvalue: str, pos_filter: List[str], dict_rel:dict, removePROPN:bool) -> None:
         """
         Save semantic index on disk as a "semanticIndex" folder contianing the matrix as a CSV
 
@@ -620,6 +820,8 @@ class SemanticIndex():
         :rtype: tuple
         """
 
+        import pandas as pd
+
         semanticIndex = pd.read_csv(f"{savepath}/model/semanticIndex/index/semanticIndex.csv", index_col=0)
         with open (f"{savepath}/model/semanticIndex/params/semanticIndexParams.json", encoding='utf-8') as f:
 
@@ -650,8 +852,34 @@ class ELIJERE:
         else:
             self.mlClassifier = False
 
+        # ExtractionStats, only set with enableStats
+        self.stats = None
+
+    def enableStats(self, callbacks: List[Callable] = []) -> ExtractionStats:
+        """
+        Starts collecting statistics about fact extraction. When they are not enabled, extraction is not instrumented
+
+        :param callbacks: Functions called with the name, the value and the attributes of each observation, defaults to []
+        :type callbacks: List[Callable], optional
+        :return: Statistics updated by the following extractions
+        :rtype: ExtractionStats
+        """
+        self.stats = ExtractionStats(callbacks)
+        return self.stats
+
+    def disableStats(self) -> ExtractionStats:
+        """
+        Stops collecting statistics about fact extraction
+
+        :return: Statistics collected so far
+        :rtype: ExtractionStats
+        """
+        stats, self.stats = self.stats, None
+        return stats
+
     def fit(self, data, anchor_textvalue:List[str]=['text'], support:int=0, removePROPN:bool=True, savepath:str=''):
         
+        start = perf_counter()
         print('Building Syntactic Index...')
         syntactic_index_params = {
             # data to use for building the index
@@ -686,15 +914,33 @@ class ELIJERE:
         self.classifier.trainSemanticIndex(**semantic_index_params)
         print('Building Lexical Index done !')
 
-    def load_model(self, path):
-        
+        # timings, anchor groups and index sizes, to follow skew-driven slowdowns across retrains
+        self.trainingReport = {
+            "train_size": len(data['X_train']),
+            "anchor_textvalue": anchor_textvalue,
+            "support": support,
+            "removePROPN": removePROPN,
+            "seconds": perf_counter() - start,
+            "peak_rss_mb": getPeakRSS(),
+            "syntacticIndex": self.extractor.trainingReport,
+            "semanticIndex": self.classifier.trainingReport
+        }
+        if savepath:
+            atomicJSONDump(f"{savepath}/model/training_report.json", self.trainingReport, indent=4)
+            print(f'Training report saved in {savepath}/model/training_report.json')
+
+    def load_model(self, path, load_nlp=True):
+        import spacy
+
         with open(f"{path}/model/elijere_config.json", 'r', encoding='utf-8') as f:
              
             self.elijere_config = json.load(f)
 
         self.extractor = SyntacticIndex(path)
         self.classifier = SemanticIndex(path)
-        self.nlp = spacy.load(self.elijere_config['spacy_model'])
+        # the spaCy model is only needed to extract facts from texts
+        if load_nlp:
+            self.nlp = spacy.load(self.elijere_config['spacy_model'])
 
     def semanticClassification(self, candidate_graph: Graph, possible_labels: List[str] = [], thresh: float=.0, defaultPred:str='Other') -> dict:
         """
@@ -717,6 +963,8 @@ class ELIJERE:
         :rtype: dict
         """
 
+        from scipy import stats
+
         # finds vector for each node in the candidate graphs
         terms = self.classifier.getTermVectors(candidate_graph)
 
@@ -996,8 +1244,11 @@ class ELIJERE:
             
         # search in this subgraph if any possible pattern matches
         matcher = DiGraphMatcher(searchGraph, candidate['graph'], node_match=nodeMatch, edge_match=edgeMatch)
+        matched = matcher.is_isomorphic()
+        if self.stats is not None:
+            self.stats.count('matcher_calls', stage='predict', mode='strict', matched=matched)
 
-        if matcher.is_isomorphic():
+        if matched:
             possibles_labels = candidate["props"]
             ner_rules = candidate['ner_rules']
             # extracts the corresponding subgraph
@@ -1035,8 +1286,11 @@ class ELIJERE:
         else:
             # Test to match graphs only by their POS, and ignoring their edges
             matcher = DiGraphMatcher(searchGraph, candidate['graph'], node_match=lambda x,y: x['pos'] == y['pos'], edge_match=lambda x, y: True)
+            matched = matcher.is_isomorphic()
+            if self.stats is not None:
+                self.stats.count('matcher_calls', stage='predict', mode='relaxed', matched=matched)
 
-            if matcher.is_isomorphic():
+            if matched:
                 possibles_labels = candidate["props"]
                 ner_rules = candidate['ner_rules']
                 # extracts the corresponding subgraph
@@ -1087,11 +1341,21 @@ class ELIJERE:
         rule = 'noAnchorMatch'
         anchor, anchortext = None, None
 
+        # with statistics, pattern matching and semantic classification are timed
+        matchPattern = self.__timed('matchPattern', self.matchPattern)
+        if not self.mlClassifier:
+            semanticClassification = self.__timed('semanticClassification', self.semanticClassification)
+        else:
+            semanticClassification = self.__timed('semanticClassification', self.MLsemanticClassication)
+
         graph_size = graph.size()
         anchor, anchortext = self.extractor.getGraphAnchor(graph=graph, anchor_textvalue=self.extractor.syntacticIndexParams['anchor_textvalue'])
+        hit = anchortext in self.extractor.syntacticIndex.keys()
+        if self.stats is not None:
+            self.stats.count('index_lookups', stage='predict', hit=hit)
         
         # gets possible patterns correspoding to this anchor
-        if anchortext in self.extractor.syntacticIndex.keys():
+        if hit:
             rule = 'noPatternMatch'
 
             # gets syntactic patterns from Syntactic Index
@@ -1099,7 +1363,7 @@ class ELIJERE:
             possible_patterns = filter(lambda x: x['size'] == graph_size, possible_patterns)
 
             # finds if patterns match subgraph in candidate graph
-            candidates = map(lambda x: self.matchPattern(graph, x, nodeEq, edgeEq), possible_patterns)
+            candidates = map(lambda x: matchPattern(graph, x, nodeEq, edgeEq), possible_patterns)
             candidates= filter(lambda x: x, candidates)
 
             predictions = []
@@ -1111,11 +1375,7 @@ class ELIJERE:
                 possible_labels = [x['name'] for x in candidate['labels']]
 
                 # semantic predictions depends on the classifier 
-                if not self.mlClassifier:
-
-                    semantic_class = self.semanticClassification(c_graph, possible_labels=possible_labels, thresh=thresh)
-                else:
-                    semantic_class = self.MLsemanticClassication(c_graph, possible_labels=possible_labels, thresh=thresh)
+                semantic_class = semanticClassification(c_graph, possible_labels=possible_labels, thresh=thresh)
                 
                 pred = semantic_class['prediction']
                 score = semantic_class['score']
@@ -1167,8 +1427,11 @@ class ELIJERE:
             """     
             # search in this subgraph if any possible pattern matches
             matcher = DiGraphMatcher(searchGraph, patternDict['graph'], node_match=nodeMatch, edge_match=edgeMatch)
+            matched = matcher.subgraph_is_isomorphic()
+            if self.stats is not None:
+                self.stats.count('matcher_calls', stage='candidates', mode='strict', matched=matched)
 
-            if matcher.subgraph_is_isomorphic():
+            if matched:
 
                 possibles_labels = patternDict["props"]
                 
@@ -1184,8 +1447,11 @@ class ELIJERE:
             else:
                 # more flexible matching, which ignores dependency matching between graphs
                 matcher = DiGraphMatcher(searchGraph, patternDict['graph'], node_match=lambda x,y: x['pos'] == y['pos'], edge_match=lambda x, y: True)
+                matched = matcher.subgraph_is_isomorphic()
+                if self.stats is not None:
+                    self.stats.count('matcher_calls', stage='candidates', mode='relaxed', matched=matched)
 
-                if matcher.subgraph_is_isomorphic():
+                if matched:
 
                     possibles_labels = patternDict["props"]
                     
@@ -1293,8 +1559,11 @@ class ELIJERE:
                 return all_candidates
 
             node_text = getNodeText(graph, node, textvalue=self.extractor.syntacticIndexParams['anchor_textvalue'])
+            hit = node_text in self.extractor.syntacticIndex.keys()
+            if self.stats is not None:
+                self.stats.count('index_lookups', stage='candidates', hit=hit)
 
-            if node_text in self.extractor.syntacticIndex.keys():
+            if hit:
                 return process(node_text)
 
             else:
@@ -1318,6 +1587,13 @@ class ELIJERE:
 
         return all_candidates
 
+    def __timed(self, stage: str, func: Callable) -> Callable:
+        """
+        NOT TO USE DIRECTLY
+        Returns func, wrapped so that its calls are recorded as the given stage when statistics are enabled
+        """
+        return func if self.stats is None else self.stats.timed(stage, func)
+
     def extractFacts(self, doc, thresh=0) -> List[dict]:
         """
         Extract relations and entities from spaCy Doc 
@@ -1330,29 +1606,57 @@ class ELIJERE:
         :rtype: List[dict]
         """
 
+        start = perf_counter()
+
         if isinstance(doc, str):
-            doc = self.nlp(doc)
+            doc = self.__timed('parse', self.nlp)(doc)
 
         # converts doct to graph
-        dict_graph = doc2graph(doc)
+        dict_graph = self.__timed('doc2graph', doc2graph)(doc)
         # extracts subgraphs from doc dependency graph
 
-        candidates = self.extractCandidatesFromGraph(dict_graph['graph'])
-        candidates = list(candidates)
+        candidates = self.__timed('candidates', lambda x: list(self.extractCandidatesFromGraph(x)))(dict_graph['graph'])
+        if self.stats is not None:
+            self.stats.observeCandidates(len(candidates))
+
+        predict = self.__timed('predict', self.predict)
+        NERclassification = self.__timed('NERclassification', self.NERclassification)
 
         all_preds = []
         for c in candidates:
             # categorize each candidate graph
             c_graph = c['candidate']['graph']
-            prediction = self.predict(c_graph, thresh=thresh)
+            prediction = predict(c_graph, thresh=thresh)
 
             # finds entities boundaries and types, if graph not Other
             if prediction['pred'] != 'Other':
-                ent_pred = self.NERclassification(dict_graph['graph'], prediction['pred'], prediction['candidate'])
+                ent_pred = NERclassification(dict_graph['graph'], prediction['pred'], prediction['candidate'])
                 all_preds.append({"fact": prediction, "ner": ent_pred})
-        
+
+        if self.stats is not None:
+            self.stats.observeStage('extractFacts', perf_counter() - start)
         return all_preds
 
+    def extractFactsFromDocBin(self, loadpath: str, thresh=0):
+        """
+        Extract relations and entities from Docs already parsed and saved as DocBin, without parsing them again.
+        Docs are streamed from the file(s), so that only the current one is kept in memory
+
+        :param loadpath: Path to a .spacy file or to a folder of .spacy files, as written by writeDocBins
+        :type loadpath: str
+        :param thresh: Semantic threshold, defaults to 0
+        :type thresh: int, optional
+        :return: Generator of tuples made of each Doc and the relations and entities extracted from it
+        :rtype: Generator
+        """
+
+        from spacy.vocab import Vocab
+
+        nlp = getattr(self, 'nlp', None)
+        vocab = nlp.vocab if nlp else Vocab()
+
+        for doc in iterDocBins(loadpath, vocab):
+            yield doc, self.extractFacts(doc, thresh=thresh)
 
     # def extractFacts(self, doc, thresh=0, fuzzyMatch=False):
 
@@ -1374,9 +1678,11 @@ class ELIJERE:
         
     #     return all_preds
 
-    def evaluate(self, y_true:List[str], y_pred:List[str], ignoreOther:bool = True) -> dict:
+    @staticmethod
+    def evaluate(y_true:List[str], y_pred:List[str], ignoreOther:bool = True) -> dict:
         """
-        Helper function to evaluate model in terms of Precision, Recall and F1
+        Helper function to evaluate model in terms of Precision, Recall and F1.
+        Does not depend on the model, so it can be called on the class, without loading a model
 
         :param y_true: True labels
         :type y_true: List[str]
@@ -1387,6 +1693,9 @@ class ELIJERE:
         :return: Dictionary with P,R,F1 scores and report
         :rtype: dict
         """
+
+        from sklearn.metrics import precision_score, recall_score, f1_score, classification_report
+
         # print(len(y_true), len(y_pred))
         if ignoreOther:
             i_other = [i for i, x in enumerate(y_true) if x == 'Other']
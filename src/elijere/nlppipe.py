@@ -15,6 +15,8 @@ from factextraction.utils.utils import doc2graph
 from itertools import groupby
 import pkg_resources
 
+from .utils import writeDocBins, iterDocBins
+
 class NLPPipe:
 
     def __init__(self, model = None, heideltime_config = None, factextractor_config = None) -> None:
@@ -317,8 +319,19 @@ class NLPPipe:
         list of dictionnary, where the textual content of the
         document must be contained in a "content" key. Every
         other key will be add as metadata of the doc.
+        Docs already parsed (e.g. loaded with load_from_disk) are
+        not parsed again.
         """
 
+        # the corpus can be a generator, e.g. load_from_disk(stream=True), it is read only once
+        corpus = list(corpus)
+        if all(isinstance(doc, Doc) for doc in corpus):
+            if list_metadata:
+                corpus = self.add_metadata2corpus(corpus, list_metadata)
+            for doc in corpus:
+                self.factExtraction(doc, thresh=thresh, fuzzyMatch=fuzzyMatch)
+            return corpus
+
         corpus = self.prepare_corpus(corpus)
         if list_metadata:
             corpus = self.add_metadata2corpus(corpus, list_metadata)
@@ -356,27 +369,53 @@ class NLPPipe:
 
         return doc
 
-    def save2disk(self, data: List[Doc], savepath) -> None:
+    def process_docbin(self, loadpath, savepath, thresh=0, fuzzyMatch=False, shard_size=1000) -> int:
+        """
+        Process a corpus of docs already parsed and saved in the .spacy
+        format (a file or a folder of shards), without parsing them again.
+        Docs are streamed from loadpath and saved as shards in savepath,
+        so that only the current shard is kept in memory.
+        """
+
+        set_heideltime_extension()
+
+        def process(docs):
+            for doc in docs:
+                self.factExtraction(doc, thresh=thresh, fuzzyMatch=fuzzyMatch)
+                yield doc
+
+        return writeDocBins(process(iterDocBins(loadpath, self.nlp.vocab)), savepath, shard_size=shard_size)
+
+    def save2disk(self, data: List[Doc], savepath, shard_size=0) -> None:
         """
-        Saves collection of docs on the disk.
+        Saves collection of docs on the disk. If shard_size is given,
+        docs are saved as a folder of .spacy shards of shard_size docs,
+        and data can be any iterable of docs, e.g. a generator.
         """
-        if not isinstance(data, list):
+        if isinstance(data, Doc):
             docs = [data]
         else:
             docs = data
 
-        docbin = DocBin(docs=docs, store_user_data=True)
+        if shard_size:
+            writeDocBins(docs, savepath, shard_size=shard_size, store_user_data=True)
+            return
+
+        docbin = DocBin(docs=list(docs), store_user_data=True)
 
         docbin.to_disk(savepath)
 
         
-    def load_from_disk(self, loadpath) -> Doc:
+    def load_from_disk(self, loadpath, stream=False) -> Doc:
         """
-        Loads document from the disk in the .spacy format
+        Loads document from the disk in the .spacy format, from a
+        single file or a folder of shards. If stream is True, returns
+        a generator reading one file at a time instead of a list.
         """
 
-        docbin = DocBin().from_disk(loadpath)
         set_heideltime_extension()
-        docs = list(docbin.get_docs(self.nlp.vocab))
-        return docs
+        docs = iterDocBins(loadpath, self.nlp.vocab)
+        if stream:
+            return docs
+        return list(docs)
 
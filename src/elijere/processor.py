@@ -6,20 +6,21 @@ sys.path.append('..')
 import re
 from typing import List 
 from multiprocessing.dummy import Pool
+from threading import BoundedSemaphore
+from multiprocessing import Pool as ProcessPool
 
 from functools import partial
 
+import spacy
 from spaczz.matcher import FuzzyMatcher
 from spacy.util import filter_spans
 from spacy.language import Language
 from spacy.tokens import Doc
 
 import json
-import networkx as nx
-import pandas as pd
 from itertools import groupby
 
-from .utils import saveCorpus, saveDocument, doc2graph
+from .utils import saveCorpus, saveDocument, doc2graph, saveParse, loadParse, getSDPsFromHeads
 
 # print('TP')
 
@@ -34,8 +35,16 @@ class TextProcessor:
     re_non_alpha = re.compile(r'["«»\[\]]')
     re_phonetic = re.compile(r'[/\[][^/\]]*[/\]]( ?Écouter)?')
 
-    def __init__(self, nlp: Language) -> None:
+    def __init__(self, nlp: Language, spacy_model: str = '') -> None:
         self.nlp = nlp
+        # name of the spaCy model, to load it in worker processes
+        self.spacy_model = spacy_model
+
+    def __getstate__(self) -> dict:
+        # the spaCy pipeline is not sent to worker processes, which load their own
+        state = self.__dict__.copy()
+        state['nlp'] = None
+        return state
 
     def cleanText(self, text: str) -> str:
         """
@@ -100,7 +109,7 @@ class TextProcessor:
 
         return groupedSentProp
     
-    def multi_groupbyPropBySent(self, list_entities_data: List[dict], n_core:int=4, savepath:str='') -> List[dict]:
+    def multi_groupbyPropBySent(self, list_entities_data: List[dict], n_core:int=4, savepath:str='', mode:str = 'thread', chunksize:int = 16) -> List[dict]:
         """
         Applies groupbyPropSent in parallel processing
 
@@ -111,17 +120,25 @@ class TextProcessor:
         :param savepath: _description_, defaults to ''
         :param savepath: Path to save file, defaults to None
         :type savepath: str, optional
+        :param mode: Either "thread" or "process", to use a pool of threads or of processes, defaults to 'thread'
+        :type mode: str, optional
+        :param chunksize: Number of entities sent at once to each process, defaults to 16
+        :type chunksize: int, optional
         :return: Return list of dictionnaries containing entities with updated data
         :rtype: List[dict]
         """
 
-        with Pool(n_core) as p:
-            partial_func = partial(self.groupbyPropBySent, savepath=savepath)
-            results = p.map(partial_func, list_entities_data)
+        partial_func = partial(self.groupbyPropBySent, savepath=savepath)
+        if mode == 'process':
+            with ProcessPool(n_core) as p:
+                results = p.map(partial_func, list_entities_data, chunksize=chunksize)
+        else:
+            with Pool(n_core) as p:
+                results = p.map(partial_func, list_entities_data)
         return results
    
 
-    def prepare_corpus(self, list_entities_data: List[dict],removeNoMatch:bool=True, keep_filter_prop:List[str]=[], n_core:int=4) -> List[dict]:
+    def prepare_corpus(self, list_entities_data: List[dict],removeNoMatch:bool=True, keep_filter_prop:List[str]=[], n_core:int=4, mode:str = 'thread') -> List[dict]:
         """
         Prepare corpus obtained with WikidataParser for processing
 
@@ -133,11 +150,13 @@ class TextProcessor:
         :type keep_filter_prop:List[str], optional
         :param n_core: Number of core to use for parrallel processing, defaults to 4
         :type n_core: int, optional
+        :param mode: Either "thread" or "process", to use a pool of threads or of processes, defaults to 'thread'
+        :type mode: str, optional
         :return: List of dictionnaries containing the entity ID, the sentences and the properties found in them
         :rtype: List[dict]
         """
 
-        groupedSent = self.multi_groupbyPropBySent(list_entities_data=list_entities_data, n_core=n_core)
+        groupedSent = self.multi_groupbyPropBySent(list_entities_data=list_entities_data, n_core=n_core, mode=mode)
         func_clean = self.cleanText
         for ent_cont in groupedSent:
             for x in ent_cont['content']:
@@ -158,7 +177,8 @@ class TextProcessor:
             ent_cont['content'] = list(filter(lambda x: x['props'], ent_cont['content']))
         return groupedSent
         
-    def sample_corpus(self, thresh:int, df_data:pd.DataFrame):
+    def sample_corpus(self, thresh:int, df_data:'pd.DataFrame'):
+        import pandas as pd
 
         tmp = []
 
@@ -176,73 +196,146 @@ class TextProcessor:
 
 
 
-    def __getSourceTargetRoots(self, doc: Doc, terms: List[str], ratio: int = 90) -> List[int]:
+    def __getTermMatcher(self, term: str, patterns: dict, matchers: dict) -> FuzzyMatcher:
+        """
+        NOT TO USE DIRECTLY
+        Returns the FuzzyMatcher of a term, built the first time the term is not found verbatim in a sentence of the document, under the term as label.
+        A FuzzyMatcher searches all of its patterns on every call, so each term gets its own matcher, and a sentence is only searched for its own terms
+
+        :param term: Source or Target term to search
+        :type term: str
+        :param patterns: Tokenized pattern of each term of the document
+        :type patterns: dict
+        :param matchers: FuzzyMatchers of the document built so far, by term, updated in place
+        :type matchers: dict
+        :return: FuzzyMatcher of the term
+        :rtype: FuzzyMatcher
+        """
+
+        if term not in matchers:
+            matchers[term] = FuzzyMatcher(self.nlp.vocab)
+            matchers[term].add(term, [patterns[term]])
+
+        return matchers[term]
+
+    def __getSourceTargetRoots(self, doc: Doc, terms: List[str], matchers: dict, patterns: dict, ratio: int = 90) -> dict:
         """
-        Finds the root node corresponding to the source and target entities of given property.
-        The terms are found in spaCy Doc with Fuzzy Matching to find most similar tokens. 
-        If Source of Target entities are multi-tokens entities, only take the root token.
-        Return a list of position of those tokens in the Doc.
+        Finds the spans corresponding to the source and target entities of the properties of a sentence.
+        Terms occurring verbatim (ignoring case) in the Doc are matched on their tokens directly. The other terms are found
+        in spaCy Doc with Fuzzy Matching to find most similar tokens.
+        If Source of Target entities are multi-tokens entities, the root token is to be taken from the spans.
 
         :param doc: spaCy Doc to process
         :type doc: Doc
         :param terms: List of terms corresponding to the Source and Target entities to search for
         :type terms: List[str]
+        :param matchers: FuzzyMatchers of the document built so far, by term, updated in place by __getTermMatcher
+        :type matchers: dict
+        :param patterns: Tokenized pattern of each term of the document
+        :type patterns: dict
         :param ratio: Minimum similarity score for fuzzy matching, defaults to 90
         :type ratio: int, optional
-        :return: List of the position of the tokens matching the Source and Target entities
-        :rtype: List[int]
+        :return: Dictionary of the spans matching each term
+        :rtype: dict
         """
 
-        # the FuzzyMatcher is used to find subpattern in 
-        # documents that will correspond to property values
+        lower_tokens = [x.lower_ for x in doc]
+        dict_candidates = {}
+        fuzzy_terms = []
 
-        matcher = FuzzyMatcher(self.nlp.vocab)
-        patterns = [self.nlp.make_doc(text) for text in terms]
-        matcher.add("SourceTargetsTerms", patterns)
+        for term in set(terms):
+            pattern = [x.lower_ for x in patterns[term]]
+            n = len(pattern)
+            list_candidates = [doc[i : i + n] for i in range(len(doc) - n + 1) if n and lower_tokens[i] == pattern[0] and lower_tokens[i : i + n] == pattern]
+            if list_candidates:
+                dict_candidates[term] = filter_spans(list_candidates)
+            else:
+                fuzzy_terms.append(term)
 
-        matches = matcher(doc)
-        # need to use filter_spans to avoid overlapping spans
-        # list_candidates = [doc[start : end] for match_id, start, end, match_ratio in matches if match_ratio >= ratio]
-        list_candidates = [doc[start : end] for label, start, end, match_ratio, pattern in matches if match_ratio >= ratio]
+        for term in fuzzy_terms:
+            # the FuzzyMatcher is used to find subpattern in 
+            # documents that will correspond to property values
+            matches = self.__getTermMatcher(term, patterns, matchers)(doc)
+            list_candidates = [doc[start : end] for label, start, end, match_ratio, pattern in matches if match_ratio >= ratio]
+            # need to use filter_spans to avoid overlapping spans
+            dict_candidates[term] = filter_spans(list_candidates)
 
+        return dict_candidates
 
-        # print(list_candidates)
-        list_candidates = filter_spans(list_candidates)
-        # the first element of the list is the root node of the Source, the second of the Target
-        # list_candidates = [x.root.i for x in list_candidates]
-        return list_candidates
 
+    def parseCorpus(self, corpus: List[dict], batch_size: int = 256, n_process: int = 1, savepath: str = '', docs = None):
+        """
+        Parses the sentences of all the documents of a corpus with spaCy in a single stream, so that batches are not limited to
+        the sentences of one document, and yields each document with its Docs as soon as it is parsed.
+        If savepath is given, the Docs of each document are saved, and documents already parsed are loaded instead of being parsed again.
+        Docs already parsed upstream can be given instead (e.g. with iterDocBins), in which case nothing is parsed
 
-    def __getSDP(self, graph: nx.Graph, list_candidate_nodes: List[int]):
+        :param corpus: List of dictionnaries containing the documents to parse
+        :type corpus: List[dict]
+        :param batch_size: Number of sentences parsed at once by spaCy, defaults to 256
+        :type batch_size: int, optional
+        :param n_process: Number of processes used by spaCy, defaults to 1
+        :type n_process: int, optional
+        :param savepath: Path to save folder, defaults to ''
+        :type savepath: str, optional
+        :param docs: Iterable of the Docs of all the sentences of the corpus, document after document, in the order of the corpus, defaults to None
+        :type docs: Iterable[Doc], optional
+        :return: Generator of tuples made of a document and the list of its parsed sentences
+        :rtype: Generator
         """
-        Finds SDP path between Source and Target nodes
-
-        :param graph: Graph to process
-        :type graph: nx.Graph
-        :param list_candidate_nodes: List of nodes which correspond to the Source and Target entity nodes
-        :type list_candidate_nodes: List[int]
-        :return: The list of nodes corresponding to the SDP path between Source and Target
-        :rtype: _type_
+
+        if docs is not None:
+            yield from self.__routeDocs(corpus, docs, savepath=savepath)
+            return
+
+        list_parse = []
+        for dict_ent in corpus:
+            texts = [x['sent'] for x in dict_ent['content']]
+            docs = loadParse(savepath, dict_ent['id'], self.nlp.vocab, texts) if savepath and texts else None
+            if docs is not None or not texts:
+                yield dict_ent, docs or []
+            else:
+                list_parse.append(dict_ent)
+
+        # each sentence comes with the position of its document, and spaCy keeps
+        # the order of the sentences, so that the Docs of a document follow each other
+        sents = ((dict_sent['sent'], ent_i) for ent_i, dict_ent in enumerate(list_parse) for dict_sent in dict_ent['content'])
+        docs = self.nlp.pipe(sents, as_tuples=True, batch_size=batch_size, n_process=n_process)
+        for ent_i, group in groupby(docs, key=lambda x: x[1]):
+            dict_ent = list_parse[ent_i]
+            list_docs = [doc for doc, _ in group]
+            if savepath:
+                saveParse(savepath, dict_ent['id'], list_docs)
+            yield dict_ent, list_docs
+
+    def __routeDocs(self, corpus: List[dict], docs, savepath: str = ''):
         """
-        try:   
-            # first try to get sdp between two nodes  
-            sdp = nx.shortest_path(graph, list_candidate_nodes[0], list_candidate_nodes[1])
-        except:
-            try:
-                # if sdp not found, finds lowest common ancestor, then
-                # computes shortest path from lca and both nodes
-                lca = nx.lowest_common_ancestor(graph, list_candidate_nodes[0], list_candidate_nodes[1])
-                sdp1 = nx.shortest_path(graph, lca, list_candidate_nodes[0]) 
-                sdp2 = nx.shortest_path(graph, lca, list_candidate_nodes[1])
-
-                sdp = list(set(sdp1 + sdp2))
-            except:
-                # no sdp found, because of syntactic error or
-                # error in the dependency parsing 
-                sdp = 'SYNTACTIC-ERROR'
-        return sdp
-
-    def processDocument(self, dict_ent: dict, savepath:str='') -> dict:
+        NOT TO USE DIRECTLY
+        Gives back to each document of the corpus its Docs, taken from a stream of already parsed sentences
+
+        :param corpus: List of dictionnaries containing the documents
+        :type corpus: List[dict]
+        :param docs: Iterable of the Docs of all the sentences of the corpus, in the order of the corpus
+        :type docs: Iterable[Doc]
+        :param savepath: Path to save folder, defaults to ''
+        :type savepath: str, optional
+        :return: Generator of tuples made of a document and the list of its parsed sentences
+        :rtype: Generator
+        """
+
+        docs = iter(docs)
+        for dict_ent in corpus:
+            list_docs = []
+            for dict_sent in dict_ent['content']:
+                doc = next(docs, None)
+                if doc is None or doc.text != dict_sent['sent']:
+                    raise Exception(f"The given Docs do not match the sentences of document {dict_ent['id']}")
+                list_docs.append(doc)
+            if savepath and list_docs:
+                saveParse(savepath, dict_ent['id'], list_docs)
+            yield dict_ent, list_docs
+
+    def processDocument(self, dict_ent: dict, savepath:str='', docs: List[Doc] = None) -> dict:
         """
         Pipeline to transform corpus of text into directed dependency graphs. 
         Finds the subgraph corresponding to the SDP between Source and Target entities
@@ -251,16 +344,35 @@ class TextProcessor:
         :type dict_doc: dict
         :param savepath: Path to save folder, defaults to savepath
         :type savepath: str, optional
+        :param docs: Sentences of the document already parsed, e.g. by parseCorpus, defaults to None
+        :type docs: List[Doc], optional
         :return: Updated dict_doc with graph
         :rtype: dict
         """
         # processes a sentence with spaCy to get the POS tags and dependency parsing
-        docs = self.nlp.pipe((x['sent'] for x in dict_ent['content']))
+        if docs is None:
+            docs = next(self.parseCorpus([dict_ent], savepath=savepath))[1]
+
+        # the Source and Target terms are tokenized once for the whole document, and their FuzzyMatchers
+        # are only built for the terms that are not found verbatim in a sentence
+        terms = {x for dict_sent in dict_ent['content'] for dict_prop in dict_sent['props'] if dict_prop['prop'] != 'Other' for x in (dict_prop['source'], dict_prop['target'])}
+        patterns = {term: self.nlp.make_doc(term) for term in terms}
+        matchers = {}
 
         for dict_sent, doc in zip(dict_ent['content'], docs):
 
             dict_graph = doc2graph(doc)
             dict_sent.update(dict_graph)
+
+            # finds nodes corresponding to the Source and Target entities
+            # of every statement of the sentence at once
+            terms_sent = [x for dict_prop in dict_sent['props'] if dict_prop['prop'] != 'Other' for x in (dict_prop['source'], dict_prop['target'])]
+            dict_candidates = self.__getSourceTargetRoots(doc, terms_sent, matchers, patterns) if terms_sent else {}
+
+            # tries to find the Shortest Dependency Path between the Source and Target root nodes
+            # of every statement of the sentence at once
+            pairs = list({(x.root.i, y.root.i) for dict_prop in dict_sent['props'] if dict_prop['prop'] != 'Other' for x in dict_candidates[dict_prop['source']] for y in dict_candidates[dict_prop['target']]})
+            dict_sdp = dict(zip(pairs, getSDPsFromHeads([x.head.i for x in doc], pairs)))
             
             # process each statement associated with the sentence
             for dict_prop in dict_sent['props']:
@@ -269,9 +381,8 @@ class TextProcessor:
                 # # only gets SDPS for labelled texts
                 if dict_prop['prop'] != 'Other':
                     
-                    # finds nodes corresponding to the Source and Target entities
-                    list_candidate_nodes_src = self.__getSourceTargetRoots(doc, [dict_prop['source']])
-                    list_candidate_nodes_trgt = self.__getSourceTargetRoots(doc, [dict_prop['target']])
+                    list_candidate_nodes_src = dict_candidates[dict_prop['source']]
+                    list_candidate_nodes_trgt = dict_candidates[dict_prop['target']]
 
                     for candidate_nodes_src in list_candidate_nodes_src:
 
@@ -281,8 +392,7 @@ class TextProcessor:
 
                             trgt_root_nodes = candidate_nodes_trgt.root.i 
 
-                            # tries to find the Shortest Dependency Path between the Source and Target root nodes
-                            sdp = self.__getSDP(dict_graph['graph'], list_candidate_nodes=[src_root_nodes, trgt_root_nodes])
+                            sdp = dict_sdp[(src_root_nodes, trgt_root_nodes)]
 
                             # error in the parsing, returns a string telling SYNTAXIC ERROR 
                             if isinstance(sdp, str):
@@ -318,23 +428,74 @@ class TextProcessor:
 
         return dict_ent
 
-    def processCorpus(self, corpus: List[dict], n_core: int=6, savepath:str = '') -> List[dict]:
+    def processCorpus(self, corpus: List[dict], n_core: int=6, savepath:str = '', mode:str = 'thread', chunksize:int = 4, batch_size:int = 256, n_process:int = 1, docs = None, max_pending:int = 32) -> List[dict]:
         """
-        Helper function to process whole corpus
+        Helper function to process whole corpus.
+        With the "thread" mode, the sentences of the whole corpus are parsed in a single stream with parseCorpus, then processed by the threads.
+        With the "process" mode, each worker process loads the spaCy model once, then processes the documents it is given and saves them itself:
+        the processed documents are not sent back, and only their ids are returned. The corpus can then be loaded with loadCorpus.
 
         :param corpus: List of dictionnaries containing the documents to process
         :type corpus: List[dict]
         :param n_core: Number of core to use for parallel processing, defaults to 6
         :type n_core: int, optional
-        :param savepath: Path to save processed corpus, defaults to None
+        :param savepath: Path to save processed corpus, defaults to None. Required with the "process" mode
         :type savepath: str, optional
-        :return: List of dictionnaries containing the processed corpus
+        :param mode: Either "thread" or "process", to use a pool of threads or of processes, defaults to 'thread'
+        :type mode: str, optional
+        :param chunksize: Number of documents sent at once to each process, defaults to 4
+        :type chunksize: int, optional
+        :param batch_size: Number of sentences parsed at once by spaCy with the "thread" mode, defaults to 256
+        :type batch_size: int, optional
+        :param n_process: Number of processes used by spaCy to parse the corpus with the "thread" mode, defaults to 1
+        :type n_process: int, optional
+        :param docs: Docs of the sentences of the corpus already parsed, in the order of the corpus (e.g. iterDocBins(path, nlp.vocab)), defaults to None.
+            With the "process" mode, they are first saved in the parse folder of savepath, from which the workers load them
+        :type docs: Iterable[Doc], optional
+        :param max_pending: Maximum number of parsed documents waiting to be processed with the "thread" mode, so that parsing does not run ahead of the threads, defaults to 32
+        :type max_pending: int, optional
+        :return: List of dictionnaries containing the processed corpus, or list of the ids of the processed documents with the "process" mode
         :rtype: List[dict]
         """
 
+        if mode == 'process':
+            if not savepath:
+                raise Exception('Please give a savepath to process the corpus with the process mode')
+            if not self.spacy_model:
+                raise Exception('Please give the name of the spaCy model to the TextProcessor to process the corpus with the process mode')
+
+            if docs is not None:
+                for _ in self.parseCorpus(corpus, savepath=savepath, docs=docs):
+                    pass
+
+            with ProcessPool(n_core, initializer=initCorpusWorker, initargs=(self.spacy_model,)) as p:
+                partial_func = partial(processCorpusDocument, savepath=savepath)
+                return list(p.imap_unordered(partial_func, corpus, chunksize=chunksize))
+
+        parsed = self.parseCorpus(corpus, batch_size=batch_size, n_process=n_process, savepath=savepath, docs=docs)
+        # the pool reads its input as fast as it can: a document is only parsed once a slot is free,
+        # and its slot is freed when it is processed, so that at most max_pending parsed documents are kept in memory
+        pending = BoundedSemaphore(max_pending)
+
+        def feed():
+            while True:
+                pending.acquire()
+                item = next(parsed, None)
+                if item is None:
+                    pending.release()
+                    return
+                yield item
+
+        def process(item: tuple) -> None:
+            try:
+                self.processDocument(item[0], savepath=savepath, docs=item[1])
+            finally:
+                pending.release()
+
         with Pool(n_core) as p:
-            partial_func = partial(self.processDocument, savepath=savepath)
-            corpus = p.map(partial_func, corpus)
+            # documents are updated in place, in the order they are parsed
+            for _ in p.imap_unordered(process, feed()):
+                pass
 
         return corpus
 
@@ -392,3 +553,32 @@ class TextProcessor:
     #                     )
         return dict_ent
 
+
+# TextProcessor of each worker process of processCorpus, set by initCorpusWorker
+worker_tp = None
+
+def initCorpusWorker(spacy_model: str) -> None:
+    """
+    NOT TO USE DIRECTLY
+    Initializer of the worker processes of processCorpus: loads the spaCy model once per process
+
+    :param spacy_model: Name of the spaCy model to load
+    :type spacy_model: str
+    """
+    global worker_tp
+    worker_tp = TextProcessor(nlp=spacy.load(spacy_model), spacy_model=spacy_model)
+
+def processCorpusDocument(dict_ent: dict, savepath: str) -> str:
+    """
+    NOT TO USE DIRECTLY
+    Processes and saves a document in a worker process of processCorpus
+
+    :param dict_ent: Dictionary containing the sentences to process, alongside the source and target entities to find
+    :type dict_ent: dict
+    :param savepath: Path to save folder
+    :type savepath: str
+    :return: Id of the processed document
+    :rtype: str
+    """
+    worker_tp.processDocument(dict_ent, savepath=savepath)
+    return dict_ent['id']
@@ -0,0 +1,940 @@
+import sys
+
+sys.path.append('..')
+
+import os
+import json
+import mmap
+import threading
+from collections import OrderedDict
+from typing import List
+from itertools import combinations, groupby
+
+import numpy as np
+
+
+class DependencyGraph:
+    """
+    Directed graph holding only what extraction needs from the networkx DiGraph. Nodes and neighbours are kept in insertion order,
+    as in networkx, so that patterns are searched in the same order and give the same matches.
+    """
+
+    def __init__(self) -> None:
+        # node -> attributes, node -> {successor: edge attributes}, node -> {predecessor: edge attributes}
+        self.nodes = {}
+        self.succ = {}
+        self.pred = {}
+
+    def addNode(self, node: int, attrs: dict = None) -> None:
+        """
+        Adds node to the graph, or updates its attributes if it already exists
+
+        :param node: Node to add
+        :type node: int
+        :param attrs: Attributes of the node, defaults to None
+        :type attrs: dict, optional
+        """
+
+        if node not in self.nodes:
+            self.nodes[node] = {}
+            self.succ[node] = {}
+            self.pred[node] = {}
+        if attrs:
+            self.nodes[node].update(attrs)
+
+    def addEdge(self, source: int, target: int, attrs: dict) -> None:
+        """
+        Adds edge between source and target, adding the nodes if needed
+
+        :param source: Source node
+        :type source: int
+        :param target: Target node
+        :type target: int
+        :param attrs: Attributes of the edge
+        :type attrs: dict
+        """
+
+        self.addNode(source)
+        self.addNode(target)
+        self.succ[source][target] = attrs
+        self.pred[target][source] = attrs
+
+    def size(self) -> int:
+        """
+        :return: Number of edges of the graph
+        :rtype: int
+        """
+
+        return sum(len(x) for x in self.succ.values())
+
+    def degree(self, node: int) -> int:
+        """
+        :return: Number of in and out edges of node
+        :rtype: int
+        """
+
+        return len(self.succ[node]) + len(self.pred[node])
+
+    def subgraph(self, nodes: List[int]) -> 'DependencyGraph':
+        """
+        Returns the subgraph induced by nodes. Nodes are ordered as in the networkx subgraph view: in the order of the set of nodes
+        when they are less than half of the graph, otherwise in the order of the graph. Neighbours keep the order of the graph.
+
+        :param nodes: Nodes of the subgraph
+        :type nodes: List[int]
+        :return: Induced subgraph, sharing the node attributes of the graph
+        :rtype: DependencyGraph
+        """
+
+        nodes = set(x for x in nodes if x in self.nodes)
+        if 2 * len(nodes) < len(self.nodes):
+            order = list(nodes)
+        else:
+            order = [x for x in self.nodes if x in nodes]
+
+        subgraph = DependencyGraph()
+        for node in order:
+            subgraph.nodes[node] = self.nodes[node]
+            subgraph.succ[node] = {k: v for k, v in self.succ[node].items() if k in nodes}
+            subgraph.pred[node] = {k: v for k, v in self.pred[node].items() if k in nodes}
+        return subgraph
+
+    @classmethod
+    def fromNodeLink(cls, data: dict) -> 'DependencyGraph':
+        """
+        Builds graph from its node-link representation, as given by networkx node_link_data
+
+        :param data: Node-link representation of the graph
+        :type data: dict
+        :return: Graph
+        :rtype: DependencyGraph
+        """
+
+        graph = cls()
+        for node in data['nodes']:
+            graph.addNode(node['id'], {k: v for k, v in node.items() if k != 'id'})
+        for edge in data['edges']:
+            graph.addEdge(edge['source'], edge['target'], {k: v for k, v in edge.items() if k not in ('source', 'target')})
+        return graph
+
+
+def docToGraph(doc) -> DependencyGraph:
+    """
+    Creates directed graph from Doc, as utils.doc2graph: Token objects are nodes and dependency labels are added to edges
+
+    :param doc: spaCy document to transform into graph
+    :type doc: Doc
+    :return: Dependency graph of the document
+    :rtype: DependencyGraph
+    """
+
+    graph = DependencyGraph()
+    for token in doc:
+        if token.i != token.head.i:
+            graph.addEdge(token.head.i, token.i, {'dep': token.dep_})
+
+    # as with networkx, tokens without any edge are not part of the graph
+    for token in doc:
+        if token.i in graph.nodes:
+            graph.nodes[token.i].update({
+                'text': token.text,
+                'lemma': token.lemma_,
+                'pos': token.pos_,
+                'dep': token.dep_,
+                'char_idx': token.idx
+            })
+
+    return graph
+
+
+def getNodeText(attrs: dict, textvalue, cleanPropn: bool = True) -> str:
+    """
+    Returns node as str, as utils.getNodeText, from the attributes of the node
+
+    :param attrs: Attributes of the node
+    :type attrs: dict
+    :param textvalue: Textual value or values to represent the node
+    :type textvalue: str or List[str]
+    :param cleanPropn: Whether to remove the text or lemma of PROPN nodes, defaults to True
+    :type cleanPropn: bool, optional
+    :return: Textual value of the node
+    :rtype: str
+    """
+
+    if isinstance(textvalue, list):
+        if cleanPropn and attrs['pos'] == 'PROPN':
+            return '_'.join([attrs[x] for x in textvalue if x not in ('text', 'lemma')])
+        return '_'.join([attrs[x] for x in textvalue])
+
+    if cleanPropn and textvalue in ('text', 'lemma'):
+        raise Exception("Cannot clean PROPN tag and keep text or lemma. Either set cleanPropn to False, or use pos or dep as textvalue")
+    return attrs[textvalue]
+
+
+class PatternMatcher:
+    """
+    VF2 search of a pattern G2 in a graph G1. This is the algorithm of the networkx DiGraphMatcher restricted to graphs without self loops
+    nor parallel edges, as dependency graphs: candidate pairs are tried in the same order, so that the first mapping found is the same.
+    In strict mode, nodes must share their POS tag and dependency role and edges their dependency role, otherwise only POS tags are compared.
+    """
+
+    def __init__(self, G1: DependencyGraph, G2: DependencyGraph, strict: bool = True) -> None:
+        """
+        :param G1: Graph to search
+        :type G1: DependencyGraph
+        :param G2: Pattern to find
+        :type G2: DependencyGraph
+        :param strict: Whether to compare dependency roles, defaults to True
+        :type strict: bool, optional
+        """
+
+        self.G1 = G1
+        self.G2 = G2
+        self.strict = strict
+        self.G1_nodes = set(G1.nodes)
+        self.G2_nodes = set(G2.nodes)
+        self.G2_node_order = {n: i for i, n in enumerate(G2.nodes)}
+
+    def isIsomorphic(self) -> dict:
+        """
+        :return: Mapping from the nodes of G1 to those of G2 if both graphs are isomorphic, otherwise None
+        :rtype: dict
+        """
+
+        if len(self.G1.nodes) != len(self.G2.nodes):
+            return None
+        if sorted(self.G1.degree(n) for n in self.G1.nodes) != sorted(self.G2.degree(n) for n in self.G2.nodes):
+            return None
+        return self.__search('graph')
+
+    def subgraphIsIsomorphic(self) -> dict:
+        """
+        :return: Mapping from the nodes of an induced subgraph of G1 to those of G2 if there is one isomorphic to G2, otherwise None
+        :rtype: dict
+        """
+
+        return self.__search('subgraph')
+
+    def __search(self, test: str) -> dict:
+        """
+        NOT TO USE DIRECTLY
+        Resets the state and searches the first mapping
+        """
+
+        self.test = test
+        self.core_1, self.core_2 = {}, {}
+        self.in_1, self.in_2, self.out_1, self.out_2 = {}, {}, {}, {}
+        return self.__match()
+
+    def __match(self) -> dict:
+        """
+        NOT TO USE DIRECTLY
+        Extends the current mapping depth first
+        """
+
+        if len(self.core_1) == len(self.G2.nodes):
+            return dict(self.core_1)
+
+        for G1_node, G2_node in self.__candidatePairs():
+            if self.__semanticFeasibility(G1_node, G2_node) and self.__syntacticFeasibility(G1_node, G2_node):
+                depth = self.__push(G1_node, G2_node)
+                mapping = self.__match()
+                if mapping is not None:
+                    return mapping
+                self.__restore(G1_node, G2_node, depth)
+
+        return None
+
+    def __candidatePairs(self) -> List[tuple]:
+        """
+        NOT TO USE DIRECTLY
+        Candidate pairs of nodes to add to the mapping: out-terminal sets first, then in-terminal sets, then any unmapped node
+        """
+
+        core_1, core_2 = self.core_1, self.core_2
+        min_key = self.G2_node_order.__getitem__
+
+        T1_out = [node for node in self.out_1 if node not in core_1]
+        T2_out = [node for node in self.out_2 if node not in core_2]
+        if T1_out and T2_out:
+            node_2 = min(T2_out, key=min_key)
+            return [(node_1, node_2) for node_1 in T1_out]
+
+        T1_in = [node for node in self.in_1 if node not in core_1]
+        T2_in = [node for node in self.in_2 if node not in core_2]
+        if T1_in and T2_in:
+            node_2 = min(T2_in, key=min_key)
+            return [(node_1, node_2) for node_1 in T1_in]
+
+        node_2 = min(self.G2_nodes - set(core_2), key=min_key)
+        return [(node_1, node_2) for node_1 in self.G1_nodes if node_1 not in core_1]
+
+    def __semanticFeasibility(self, G1_node: int, G2_node: int) -> bool:
+        """
+        NOT TO USE DIRECTLY
+        Compares the attributes of the nodes, then in strict mode those of the edges with the nodes already mapped
+        """
+
+        attrs_1, attrs_2 = self.G1.nodes[G1_node], self.G2.nodes[G2_node]
+        if attrs_1['pos'] != attrs_2['pos']:
+            return False
+        if not self.strict:
+            return True
+        if attrs_1['dep'] != attrs_2['dep']:
+            return False
+
+        core_1 = self.core_1
+        for G1_adj, G2_adj in ((self.G1.succ, self.G2.succ), (self.G1.pred, self.G2.pred)):
+            G2_nbrs = G2_adj[G2_node]
+            for neighbor, attrs in G1_adj[G1_node].items():
+                if neighbor in core_1:
+                    G2_nbr = core_1[neighbor]
+                    if G2_nbr in G2_nbrs and attrs != G2_nbrs[G2_nbr]:
+                        return False
+        return True
+
+    def __syntacticFeasibility(self, G1_node: int, G2_node: int) -> bool:
+        """
+        NOT TO USE DIRECTLY
+        Checks the edges with the nodes already mapped, then the look-ahead counts of the terminal sets
+        """
+
+        core_1, core_2 = self.core_1, self.core_2
+        pred_1, succ_1 = self.G1.pred[G1_node], self.G1.succ[G1_node]
+        pred_2, succ_2 = self.G2.pred[G2_node], self.G2.succ[G2_node]
+
+        for node in pred_1:
+            if node in core_1 and core_1[node] not in pred_2:
+                return False
+        for node in pred_2:
+            if node in core_2 and core_2[node] not in pred_1:
+                return False
+        for node in succ_1:
+            if node in core_1 and core_1[node] not in succ_2:
+                return False
+        for node in succ_2:
+            if node in core_2 and core_2[node] not in succ_1:
+                return False
+
+        # the graph must have at least (subgraph) or exactly (graph) as many neighbours
+        # as the pattern in each terminal set
+        if self.test == 'graph':
+            compare = int.__eq__
+        else:
+            compare = int.__ge__
+
+        for vector_1, vector_2 in ((self.in_1, self.in_2), (self.out_1, self.out_2)):
+            for nbrs_1, nbrs_2 in ((pred_1, pred_2), (succ_1, succ_2)):
+                num1 = sum(1 for node in nbrs_1 if node in vector_1 and node not in core_1)
+                num2 = sum(1 for node in nbrs_2 if node in vector_2 and node not in core_2)
+                if not compare(num1, num2):
+                    return False
+
+        for nbrs_1, nbrs_2 in ((pred_1, pred_2), (succ_1, succ_2)):
+            num1 = sum(1 for node in nbrs_1 if node not in self.in_1 and node not in self.out_1)
+            num2 = sum(1 for node in nbrs_2 if node not in self.in_2 and node not in self.out_2)
+            if not compare(num1, num2):
+                return False
+
+        return True
+
+    def __push(self, G1_node: int, G2_node: int) -> int:
+        """
+        NOT TO USE DIRECTLY
+        Adds the pair to the mapping and updates the terminal sets, tagging new entries with the depth of the mapping
+        """
+
+        self.core_1[G1_node] = G2_node
+        self.core_2[G2_node] = G1_node
+        depth = len(self.core_1)
+
+        for vector in (self.in_1, self.out_1):
+            if G1_node not in vector:
+                vector[G1_node] = depth
+        for vector in (self.in_2, self.out_2):
+            if G2_node not in vector:
+                vector[G2_node] = depth
+
+        # terminal sets are filled from sets, as networkx does, so that they are iterated in the same order
+        for vector, core, adj in ((self.in_1, self.core_1, self.G1.pred), (self.in_2, self.core_2, self.G2.pred),
+                                  (self.out_1, self.core_1, self.G1.succ), (self.out_2, self.core_2, self.G2.succ)):
+            new_nodes = set()
+            for node in core:
+                new_nodes.update([x for x in adj[node] if x not in core])
+            for node in new_nodes:
+                if node not in vector:
+                    vector[node] = depth
+
+        return depth
+
+    def __restore(self, G1_node: int, G2_node: int, depth: int) -> None:
+        """
+        NOT TO USE DIRECTLY
+        Removes the pair from the mapping and the terminal set entries added with it
+        """
+
+        del self.core_1[G1_node]
+        del self.core_2[G2_node]
+        for vector in (self.in_1, self.in_2, self.out_1, self.out_2):
+            for node in list(vector.keys()):
+                if vector[node] == depth:
+                    del vector[node]
+
+
+def compileModel(path: str) -> None:
+    """
+    Compiles the model of a project for ELIJERERuntime, in a "runtime" folder of the model folder. It contains the Syntactic Index as JSON,
+    and the semantic score of each of its patterns as a NumPy array: the score of a pattern only depends on the pattern and its labels,
+    so the Lexical Index is not needed anymore to extract facts. This step needs the full training stack, unlike the runtime.
+
+    :param path: Path to project storing the model folder
+    :type path: str
+    """
+
+    import networkx as nx
+    from .model import ELIJERE, SyntacticIndex, SemanticIndex
+    from .utils import atomicJSONDump
+
+    with open(f"{path}/model/elijere_config.json", 'r', encoding='utf-8') as f:
+        elijere_config = json.load(f)
+
+    model = ELIJERE(extractor=SyntacticIndex(path), classifier=SemanticIndex(path))
+
+    scores = []
+    index = {}
+    for anchor, patterns in model.extractor.syntacticIndex.items():
+        index[anchor] = []
+        for pattern in patterns:
+            possible_labels = [x['name'] for x in pattern['props']]
+            try:
+                # no threshold, it is applied at extraction time
+                semantic_class = model.semanticClassification(pattern['graph'], possible_labels=possible_labels, thresh=-np.inf)
+                prediction = semantic_class['prediction']
+                score = semantic_class['score']
+            except (ValueError, KeyError):
+                # none of the terms of the pattern, or not all of its labels, are in the Lexical Index
+                prediction = None
+                score = np.nan
+
+            index[anchor].append({
+                'graph': nx.node_link_data(pattern['graph'], edges='edges'),
+                'size': pattern['size'],
+                'props': pattern['props'],
+                'source_types': pattern['source_types'],
+                'source_nodes': pattern['source_nodes'],
+                'target_types': pattern['target_types'],
+                'target_nodes': pattern['target_nodes'],
+                'ner_rules': pattern['ner_rules'],
+                'prediction': prediction,
+                'score_id': len(scores)
+            })
+            scores.append(score)
+
+    savepath = f"{path}/model/runtime"
+    os.makedirs(savepath, exist_ok=True)
+
+    compiled = {
+        'params': {
+            'spacy_model': elijere_config['spacy_model'],
+            'anchor_textvalue': model.extractor.syntacticIndexParams['anchor_textvalue']
+        },
+        'index': index
+    }
+    atomicJSONDump(f"{savepath}/patterns.json", compiled)
+    np.save(f"{savepath}/scores.npy", np.array(scores, dtype=np.float64))
+    freezeModel(path)
+
+
+def freezeModel(path: str) -> None:
+    """
+    Freezes the compiled model of a project into read-only files, in a "frozen" folder of the runtime folder, that worker processes
+    map in memory instead of loading them, so that they share the same copy of the Syntactic Index. The patterns are stored one after
+    the other as JSON in patterns.bin, grouped by anchor, with their offsets in offsets.npy and the range of patterns of each anchor
+    in anchors.json. Called by compileModel, it only needs to be called directly for models compiled before it existed.
+
+    :param path: Path to project storing the model folder
+    :type path: str
+    """
+
+    with open(f"{path}/model/runtime/patterns.json", 'r', encoding='utf-8') as f:
+        compiled = json.load(f)
+
+    savepath = f"{path}/model/runtime/frozen"
+    os.makedirs(savepath, exist_ok=True)
+
+    anchors = {}
+    offsets = [0]
+    with open(f"{savepath}/patterns.bin.tmp", 'wb') as f:
+        for anchor, patterns in compiled['index'].items():
+            anchors[anchor] = [len(offsets) - 1, len(offsets) - 1 + len(patterns)]
+            for pattern in patterns:
+                data = json.dumps(pattern).encode('utf-8')
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+
+    with open(f"{savepath}/offsets.npy.tmp", 'wb') as f:
+        np.save(f, np.array(offsets, dtype=np.int64))
+    with open(f"{savepath}/anchors.json.tmp", 'w', encoding='utf-8') as f:
+        json.dump({'params': compiled['params'], 'anchors': anchors}, f)
+
+    # anchors.json is replaced last, as it is the entry point of the frozen model
+    for name in ('patterns.bin', 'offsets.npy', 'anchors.json'):
+        os.replace(f"{savepath}/{name}.tmp", f"{savepath}/{name}")
+
+
+class FrozenIndex:
+    """
+    Syntactic Index of a model frozen with freezeModel. Its files are mapped in memory, read-only, so that the pages of processes
+    loading the same model, or forked after loading it, are shared by the OS instead of being copied. Only the names of the anchors
+    are loaded: the patterns of an anchor are decoded from the mapped files when it is looked up. The most recently used anchors are
+    kept decoded in a cache of the process, bounded by the size of their patterns in the frozen files, so that the private memory of
+    each process stays bounded whatever the anchors it is queried for. Decoded patterns take several times their frozen size.
+    """
+
+    def __init__(self, path: str, cache_bytes: int = 16 * 1024 * 1024) -> None:
+        """
+        :param path: Path to project storing the model folder
+        :type path: str
+        :param cache_bytes: Maximum frozen size in bytes of the patterns kept decoded, 0 to decode them at each lookup, defaults to 16 MB
+        :type cache_bytes: int, optional
+        """
+        folder = f"{path}/model/runtime/frozen"
+        with open(f"{folder}/anchors.json", 'r', encoding='utf-8') as f:
+            frozen = json.load(f)
+
+        self.params = frozen['params']
+        self.anchors = frozen['anchors']
+        self.offsets = np.load(f"{folder}/offsets.npy", mmap_mode='r')
+        self.scores = np.load(f"{path}/model/runtime/scores.npy", mmap_mode='r')
+
+        with open(f"{folder}/patterns.bin", 'rb') as f:
+            # an empty index cannot be mapped
+            self.patterns = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b''
+
+        self.cache = OrderedDict()
+        self.cache_bytes = cache_bytes
+        self.cached_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def getFrozenSize(self, anchor: str) -> int:
+        """
+        NOT TO USE DIRECTLY
+        Returns the size in bytes of the patterns of an anchor in the frozen files
+        """
+        start, end = self.anchors[anchor]
+        return int(self.offsets[end] - self.offsets[start])
+
+    def decodePatterns(self, anchor: str) -> List[dict]:
+        """
+        NOT TO USE DIRECTLY
+        Decodes the patterns of an anchor from the mapped files, as ELIJERERuntime.load_model does
+
+        :param anchor: Textual value of the anchor
+        :type anchor: str
+        :return: Patterns of the anchor
+        :rtype: List[dict]
+        """
+        start, end = self.anchors[anchor]
+        patterns = []
+        for i in range(start, end):
+            pattern = json.loads(self.patterns[self.offsets[i]:self.offsets[i + 1]])
+            pattern['graph_data'] = pattern['graph']
+            pattern['graph'] = DependencyGraph.fromNodeLink(pattern['graph'])
+            pattern['score'] = self.scores[pattern.pop('score_id')]
+            patterns.append(pattern)
+        return patterns
+
+    def __contains__(self, anchor: str) -> bool:
+        return anchor in self.anchors
+
+    def __getitem__(self, anchor: str) -> List[dict]:
+        if anchor not in self.anchors:
+            raise KeyError(anchor)
+
+        with self.lock:
+            patterns = self.cache.get(anchor)
+            if patterns is not None:
+                self.cache.move_to_end(anchor)
+                self.hits += 1
+                return patterns
+            self.misses += 1
+
+        patterns = self.decodePatterns(anchor)
+        size = self.getFrozenSize(anchor)
+        if size <= self.cache_bytes:
+            with self.lock:
+                if anchor not in self.cache:
+                    self.cache[anchor] = patterns
+                    self.cached_bytes += size
+                    # evicts the least recently used anchors
+                    while self.cached_bytes > self.cache_bytes:
+                        evicted, _ = self.cache.popitem(last=False)
+                        self.cached_bytes -= self.getFrozenSize(evicted)
+        return patterns
+
+    def cacheInfo(self) -> dict:
+        """
+        Returns the state of the cache of decoded patterns
+
+        :return: Number of cached anchors, frozen size of their patterns and maximum size in bytes, and number of hits and misses
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                'anchors': len(self.cache),
+                'bytes': self.cached_bytes,
+                'max_bytes': self.cache_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def __iter__(self):
+        return iter(self.anchors)
+
+    def __len__(self) -> int:
+        return len(self.anchors)
+
+    def keys(self):
+        return self.anchors.keys()
+
+    def items(self):
+        return ((anchor, self[anchor]) for anchor in self.anchors)
+
+
+class ELIJERERuntime:
+    """
+    Inference-only ELIJERE, which depends on spaCy and NumPy only. It loads a model compiled with compileModel and extracts the same
+    facts as ELIJERE.extractFacts, except that the pattern graphs of the predictions are given in their node-link representation.
+    """
+
+    def __init__(self) -> None:
+        self.index = {}
+        self.params = {}
+        self.nlp = None
+
+    def load_model(self, path: str, load_nlp: bool = True, frozen: bool = False, cache_bytes: int = 16 * 1024 * 1024) -> None:
+        """
+        Loads model compiled with compileModel
+
+        :param path: Path to project storing the model folder
+        :type path: str
+        :param load_nlp: Whether to load the spaCy model, which is only needed to extract facts from texts, defaults to True
+        :type load_nlp: bool, optional
+        :param frozen: Whether to map the model frozen with freezeModel in memory instead of loading it, so that it is shared by the processes
+                       serving it, defaults to False
+        :type frozen: bool, optional
+        :param cache_bytes: When frozen is True, maximum frozen size in bytes of the patterns kept decoded by FrozenIndex, defaults to 16 MB
+        :type cache_bytes: int, optional
+        """
+
+        if frozen:
+            self.index = FrozenIndex(path, cache_bytes=cache_bytes)
+            self.params = self.index.params
+        else:
+            with open(f"{path}/model/runtime/patterns.json", 'r', encoding='utf-8') as f:
+                compiled = json.load(f)
+            scores = np.load(f"{path}/model/runtime/scores.npy")
+
+            self.params = compiled['params']
+            self.index = {}
+            for anchor, patterns in compiled['index'].items():
+                for pattern in patterns:
+                    pattern['graph_data'] = pattern['graph']
+                    pattern['graph'] = DependencyGraph.fromNodeLink(pattern['graph'])
+                    pattern['score'] = scores[pattern.pop('score_id')]
+                self.index[anchor] = patterns
+
+        if load_nlp:
+            import spacy
+            self.nlp = spacy.load(self.params['spacy_model'])
+
+    def getGraphAnchor(self, graph: DependencyGraph) -> tuple:
+        """
+        Returns the anchor / predicate of a graph, as SyntacticIndex.getGraphAnchor
+
+        :param graph: Graph to analyse
+        :type graph: DependencyGraph
+        :return: Tuple containing the anchor node and its textual value
+        :rtype: tuple
+        """
+
+        list_degree = [(node, len(graph.pred[node])) for node in graph.nodes]
+        list_degree.sort(key=lambda x: x[1])
+
+        if list_degree:
+            anchor_node = list_degree[0][0]
+            if graph.nodes[anchor_node]['pos'] == 'PROPN':
+                # same test as in SyntacticIndex.getGraphAnchor
+                depnode = [node for node, attrs in graph.nodes.items() if attrs['dep'] in ('ROOT')]
+                anchor_node = depnode[0] if depnode else 'NO_ANCHOR'
+        else:
+            anchor_node = 'NO_ANCHOR'
+
+        if anchor_node != 'NO_ANCHOR':
+            anchortext = getNodeText(graph.nodes[anchor_node], self.params['anchor_textvalue'])
+            anchortext = f"{anchortext[0].lower()}{anchortext[1:]}"
+        else:
+            anchortext = anchor_node
+        return anchor_node, anchortext
+
+    def matchPattern(self, searchGraph: DependencyGraph, pattern: dict) -> dict:
+        """
+        Searches if searchGraph matches pattern, with dependency roles or else with POS tags only, as ELIJERE.matchPattern
+
+        :param searchGraph: Candidate graph
+        :type searchGraph: DependencyGraph
+        :param pattern: Pattern of the Syntactic Index
+        :type pattern: dict
+        :return: Dictionary of matching nodes if there is a match, otherwise None
+        :rtype: dict
+        """
+
+        mapping = PatternMatcher(searchGraph, pattern['graph'], strict=True).isIsomorphic()
+        if mapping is None:
+            mapping = PatternMatcher(searchGraph, pattern['graph'], strict=False).isIsomorphic()
+            if mapping is None:
+                return None
+
+        source_nodes, target_nodes = [], []
+        for k, v in mapping.items():
+            if v in pattern['source_nodes']:
+                source_nodes.append(k)
+            elif v in pattern['target_nodes']:
+                target_nodes.append(k)
+
+        return {
+            "nodes": list(searchGraph.nodes),
+            "labels": pattern['props'],
+            "graph": pattern['graph_data'],
+            'source_types': list(pattern['source_types']),
+            'source_nodes': source_nodes,
+            'target_types': list(pattern['target_types']),
+            'target_nodes': target_nodes,
+            'ner_rules': pattern['ner_rules']
+        }
+
+    def predict(self, graph: DependencyGraph, thresh: float = 0) -> dict:
+        """
+        Classify candidate graph using the compiled Syntactic Index and semantic scores, as ELIJERE.predict
+
+        :param graph: Graph to analyse
+        :type graph: DependencyGraph
+        :param thresh: Threshold for semantic prediction, defaults to 0
+        :type thresh: float, optional
+        :return: Dictionnary containing the prediction, the rule leading to it and its score
+        :rtype: dict
+        """
+
+        pred = 'Other'
+        score = 0
+        rule = 'noAnchorMatch'
+
+        graph_size = graph.size()
+        anchor, anchortext = self.getGraphAnchor(graph)
+
+        if anchortext in self.index:
+            rule = 'noPatternMatch'
+
+            predictions = []
+            for pattern in self.index[anchortext]:
+                if pattern['size'] != graph_size:
+                    continue
+                candidate = self.matchPattern(graph, pattern)
+                if not candidate:
+                    continue
+
+                # the semantic score only depends on the pattern, it is computed by compileModel
+                if pattern['prediction'] is None:
+                    raise Exception(f"Pattern {pattern['graph_data']} of anchor {anchortext} cannot be classified with the Lexical Index")
+
+                if pattern['score'] > thresh:
+                    semantic_class = (pattern['prediction'], pattern['score'], 'semantic')
+                else:
+                    semantic_class = ('Other', pattern['score'], 'tooWeak')
+
+                predictions.append({
+                    "pred": semantic_class[0],
+                    "score": semantic_class[1],
+                    "rule": semantic_class[2],
+                    "anchor": anchor,
+                    "anchortext": anchortext,
+                    "candidate": candidate
+                })
+
+            if predictions:
+                # returns the predictions with the highest confident score
+                predictions.sort(key=lambda x: x['score'], reverse=True)
+                return predictions[0]
+
+        return {
+            "pred": pred,
+            "score": score,
+            "rule": rule,
+            "anchor": anchor,
+            "anchortext": anchortext,
+        }
+
+    def extractCandidatesFromGraph(self, graph: DependencyGraph) -> List[dict]:
+        """
+        Finds every node that can be considered as anchor / predicate and the subgraphs matching its patterns, as ELIJERE.extractCandidatesFromGraph
+
+        :param graph: Sentence graph to search for candidates
+        :type graph: DependencyGraph
+        :return: List of all found candidates in graph
+        :rtype: List[dict]
+        """
+
+        def getCandidates(pattern: dict) -> dict:
+            mapping = PatternMatcher(graph, pattern['graph'], strict=True).subgraphIsIsomorphic()
+            if mapping is None:
+                mapping = PatternMatcher(graph, pattern['graph'], strict=False).subgraphIsIsomorphic()
+                if mapping is None:
+                    return None
+
+            return {
+                "candidates_nodes": list(mapping.keys()),
+                "possibles_labels": pattern['props']
+            }
+
+        def filterCandidates(candidates: List[dict]) -> List[dict]:
+            # keeps only non-overlaping paths
+            set_paths = []
+            for c in candidates:
+                c['candidates_nodes'].sort()
+                if c['candidates_nodes'] not in set_paths:
+                    set_paths.append(c['candidates_nodes'])
+
+            set_paths.sort(key=lambda x: len(x))
+            not_allowed_paths = []
+            if len(set_paths) > 1:
+                for x, y in combinations(set_paths, 2):
+                    if set(x).issubset(set(y)):
+                        not_allowed_paths.append(x)
+
+            filter_candidates = []
+            for x in candidates:
+                if x['candidates_nodes'] not in not_allowed_paths and x not in filter_candidates:
+                    filter_candidates.append(x)
+
+            # gathers labels for the same path
+            filter_candidates.sort(key=lambda x: x['candidates_nodes'])
+            final_candidates = []
+            for key, group in groupby(filter_candidates, key=lambda x: x['candidates_nodes']):
+                labels = []
+                for g in group:
+                    labels.extend(g['possibles_labels'])
+                final_candidates.append({"nodes": key, "labels": labels})
+
+            return final_candidates
+
+        all_candidates = []
+        for node, attrs in graph.nodes.items():
+            node_text = getNodeText(attrs, self.params['anchor_textvalue'])
+            if node_text not in self.index:
+                continue
+
+            candidates = [x for x in map(getCandidates, self.index[node_text]) if x]
+            for c in filterCandidates(candidates):
+                c['graph'] = graph.subgraph(c['nodes'])
+                all_candidates.append({
+                    "anchorNode": node,
+                    "anchorText": node_text,
+                    "candidate": c
+                })
+
+        return all_candidates
+
+    def NERclassification(self, sent_graph: DependencyGraph, pred: str, candidate: dict) -> List[dict]:
+        """
+        Categorize and finds boundaries of Source and Target entities, as ELIJERE.NERclassification
+
+        :param sent_graph: Sentence dependency graph
+        :type sent_graph: DependencyGraph
+        :param pred: Label predicted during Relation Classification step
+        :type pred: str
+        :param candidate: Extracted relation
+        :type candidate: dict
+        :return: List of dictionaries, containing the types and boundaries of Source and Target entities
+        :rtype: List[dict]
+        """
+
+        def checkEdge(edgeValue: str) -> bool:
+            return not (edgeValue.startswith('acl') or edgeValue in ('appos', 'conj', 'det'))
+
+        def checkNode(node: dict) -> bool:
+            return node['pos'] not in ('PUNCT', 'PRON', 'ADP', 'CCONJ', 'ADV', 'AUX', 'DET')
+
+        def filterNodes(nodeList: List[int]) -> List[int]:
+            # keeps the nodes continuous with the first one
+            ent_nodes = []
+            for a, b in zip(nodeList[:-1], nodeList[1:]):
+                if abs(a - b) == 1:
+                    ent_nodes.append(a)
+                else:
+                    break
+            if ent_nodes and abs(ent_nodes[-1] - nodeList[-1]) == 1:
+                ent_nodes.append(nodeList[-1])
+            return ent_nodes
+
+        def extendEntity(node: int) -> List[int]:
+            node_neighbours = [i for i, attrs in sent_graph.succ[node].items() if checkEdge(attrs['dep'])]
+            node_neighbours = [i for i in node_neighbours if checkNode(sent_graph.nodes[i])]
+            tmp_nodes = [node] + node_neighbours
+            tmp_nodes.sort()
+
+            node_index = tmp_nodes.index(node)
+            ent_nodes = filterNodes(tmp_nodes[node_index:])
+            ent_nodes += filterNodes(tmp_nodes[:node_index][::-1])
+
+            if not ent_nodes:
+                ent_nodes = [node]
+            return ent_nodes
+
+        def getEntity(root_node: int, types: List[str], type_key: str) -> dict:
+            ent_nodes = extendEntity(root_node)
+            char_start = sent_graph.nodes[ent_nodes[0]]['char_idx']
+            char_end = sent_graph.nodes[ent_nodes[-1]]['char_idx'] + len(sent_graph.nodes[ent_nodes[-1]]['text'])
+
+            return {
+                "pred": types[0] if len(types) == 1 else candidate['ner_rules'][pred][type_key],
+                "root_node": root_node,
+                "start": ent_nodes[0],
+                "end": ent_nodes[-1] + 1,
+                "char_start": char_start,
+                "char_end": char_end
+            }
+
+        return [
+            getEntity(candidate['source_nodes'][0], candidate['source_types'], 'source_type'),
+            getEntity(candidate['target_nodes'][0], candidate['target_types'], 'target_type')
+        ]
+
+    def extractFacts(self, doc, thresh=0) -> List[dict]:
+        """
+        Extract relations and entities from spaCy Doc
+
+        :param doc: sentence to extract relations and entities from
+        :type doc: Doc
+        :param thresh: Semantic threshold, defaults to 0
+        :type thresh: int, optional
+        :return: List of relations and entities extracted from Doc
+        :rtype: List[dict]
+        """
+
+        if isinstance(doc, str):
+            doc = self.nlp(doc)
+
+        graph = docToGraph(doc)
+
+        all_preds = []
+        for c in self.extractCandidatesFromGraph(graph):
+            prediction = self.predict(c['candidate']['graph'], thresh=thresh)
+
+            # finds entities boundaries and types, if graph not Other
+            if prediction['pred'] != 'Other':
+                ent_pred = self.NERclassification(graph, prediction['pred'], prediction['candidate'])
+                all_preds.append({"fact": prediction, "ner": ent_pred})
+
+        return all_preds
@@ -0,0 +1,582 @@
+import sys
+sys.path.append('..')
+
+import os
+import gc
+import json
+import time
+import signal
+import socket
+import asyncio
+import argparse
+import traceback
+from bisect import bisect_left
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, BrokenExecutor
+from typing import List
+
+import numpy as np
+
+from .utils import encodeGraph
+
+# extractor of each worker process of the server, set by initServerWorker
+worker_model = None
+
+HTTP_REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error',
+    503: 'Service Unavailable'
+}
+
+
+def encodeFact(obj):
+    """
+    Encodes the objects of the extracted facts that json cannot serialize: networkx graphs and NumPy scalars
+
+    :param obj: Object json cannot serialize
+    :type obj: Any
+    :return: Serializable representation of obj
+    :rtype: Any
+    """
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return encodeGraph(obj)
+
+
+def loadExtractor(path: str, runtime: bool = False, frozen: bool = False, cache_bytes: int = 16 * 1024 * 1024):
+    """
+    Loads the model of a project, either as ELIJERE, or as ELIJERERuntime if it has been compiled with compileModel
+
+    :param path: Path to project storing the model folder
+    :type path: str
+    :param runtime: Whether to load the compiled runtime, defaults to False
+    :type runtime: bool, optional
+    :param frozen: Whether to map the runtime frozen with freezeModel in memory instead of loading it, defaults to False
+    :type frozen: bool, optional
+    :param cache_bytes: Maximum frozen size in bytes of the patterns kept decoded when frozen is True, defaults to 16 MB
+    :type cache_bytes: int, optional
+    :return: Loaded model
+    :rtype: ELIJERE or ELIJERERuntime
+    """
+    if runtime:
+        from .runtime import ELIJERERuntime
+        model = ELIJERERuntime()
+        model.load_model(path, frozen=frozen, cache_bytes=cache_bytes)
+    else:
+        from .model import ELIJERE
+        model = ELIJERE()
+        model.load_model(path)
+
+    return model
+
+
+def initServerWorker(path: str, runtime: bool = False, frozen: bool = False, cache_bytes: int = 16 * 1024 * 1024) -> None:
+    """
+    NOT TO USE DIRECTLY
+    Initializer of the worker processes of the server: loads the model once per process
+
+    :param path: Path to project storing the model folder
+    :type path: str
+    :param runtime: Whether to load the compiled runtime, defaults to False
+    :type runtime: bool, optional
+    :param frozen: Whether to map the runtime frozen with freezeModel in memory instead of loading it, defaults to False
+    :type frozen: bool, optional
+    :param cache_bytes: Maximum frozen size in bytes of the patterns kept decoded when frozen is True, defaults to 16 MB
+    :type cache_bytes: int, optional
+    """
+    global worker_model
+    worker_model = loadExtractor(path, runtime, frozen, cache_bytes)
+
+
+def extractBatch(texts: List[str], threshs: List[float]) -> List[str]:
+    """
+    NOT TO USE DIRECTLY
+    Parses a batch of texts with nlp.pipe and extracts their facts in a worker of the server
+
+    :param texts: Texts of the batch
+    :type texts: List[str]
+    :param threshs: Semantic threshold of each text
+    :type threshs: List[float]
+    :return: Facts extracted from each text, encoded as JSON
+    :rtype: List[str]
+    """
+    docs = worker_model.nlp.pipe(texts)
+    return [json.dumps(worker_model.extractFacts(doc, thresh=thresh), default=encodeFact) for doc, thresh in zip(docs, threshs)]
+
+
+class Histogram:
+    """
+    Cumulative histogram rendered in the Prometheus text format
+    """
+
+    def __init__(self, name: str, description: str, buckets: List[float]) -> None:
+        """
+        :param name: Name of the metric
+        :type name: str
+        :param description: Description of the metric
+        :type description: str
+        :param buckets: Upper bounds of the buckets, in increasing order
+        :type buckets: List[float]
+        """
+        self.name = name
+        self.description = description
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, labels: str = '') -> str:
+        """
+        :param labels: Labels added to every sample, e.g. 'pid="42"', defaults to ''
+        :type labels: str, optional
+        """
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        cumulative = 0
+        prefix = f'{labels},' if labels else ''
+        for le, n in zip(self.buckets + ['+Inf'], self.counts):
+            cumulative += n
+            lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+        suffix = f'{{{labels}}}' if labels else ''
+        lines.append(f'{self.name}_sum{suffix} {self.sum}')
+        lines.append(f'{self.name}_count{suffix} {self.count}')
+        return '\n'.join(lines)
+
+
+class ExtractionServer:
+    """
+    HTTP service extracting facts from texts with a model loaded once per worker.
+    Concurrent requests are gathered into micro-batches, bounded by size and by waiting time, which are parsed with nlp.pipe
+    and processed by the workers. Texts waiting for a batch are kept in a bounded queue: when it is full, requests are rejected
+    with a 503 status, so that clients back off instead of piling up latency.
+
+    Endpoints:
+        * POST /extract, with {"text": str} or {"texts": List[str]} and an optional "thresh": returns the same JSON as extractFacts,
+          or a list of them for "texts". Requests with more texts than max_queue are rejected with a 413 status, as they can never be queued
+        * GET /health: status and queue size, with a 503 status when the workers are broken, e.g. after one of them was killed
+        * GET /metrics: latency and batch size histograms, in the Prometheus text format
+    Metrics are those of the process of the server, labelled with its pid: with serveForked, each worker has its own, and a scrape
+    gets the metrics of the worker accepting the connection.
+    """
+
+    def __init__(self, executor, n_workers: int = 1, max_batch_size: int = 32, max_wait: float = .005, max_queue: int = 1024, thresh: float = 0) -> None:
+        """
+        :param executor: Executor running extractBatch, whose workers have loaded the model
+        :type executor: Executor
+        :param n_workers: Number of workers of executor, i.e. maximum number of batches processed at once, defaults to 1
+        :type n_workers: int, optional
+        :param max_batch_size: Maximum number of texts in a batch, defaults to 32
+        :type max_batch_size: int, optional
+        :param max_wait: Maximum time in seconds a text waits for other texts to fill its batch, defaults to .005
+        :type max_wait: float, optional
+        :param max_queue: Maximum number of texts waiting for a batch, defaults to 1024
+        :type max_queue: int, optional
+        :param thresh: Default semantic threshold, defaults to 0
+        :type thresh: float, optional
+        """
+        self.executor = executor
+        self.n_workers = n_workers
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.thresh = thresh
+
+        self.latency = Histogram('elijere_request_latency_seconds', 'Latency of the extraction requests', [.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10])
+        self.batch_size = Histogram('elijere_batch_size', 'Number of texts of the batches', [1, 2, 4, 8, 16, 32, 64, 128, 256])
+        self.requests = defaultdict(int)
+        self.started = time.time()
+        # reason why the executor cannot run batches anymore
+        self.broken = None
+
+    async def extract(self, texts: List[str], thresh: float) -> List[str]:
+        """
+        Queues texts for extraction and waits for their facts
+
+        :param texts: Texts to process
+        :type texts: List[str]
+        :param thresh: Semantic threshold
+        :type thresh: float
+        :raises asyncio.QueueFull: If the queue cannot take all the texts
+        :return: Facts extracted from each text, encoded as JSON
+        :rtype: List[str]
+        """
+        if self.max_queue - self.queue.qsize() < len(texts):
+            raise asyncio.QueueFull()
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self.queue.put_nowait((text, thresh, future))
+            futures.append(future)
+
+        return await asyncio.gather(*futures)
+
+    async def batchLoop(self) -> None:
+        """
+        NOT TO USE DIRECTLY
+        Gathers queued texts into batches and sends them to the workers, with at most one batch per worker at once
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # texts wait in the queue while every worker is busy
+            await self.slots.acquire()
+            loop.create_task(self.runBatch(batch))
+
+    async def runBatch(self, batch: List[tuple]) -> None:
+        """
+        NOT TO USE DIRECTLY
+        Processes a batch in a worker and gives its results to the waiting requests
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            texts = [x[0] for x in batch]
+            threshs = [x[1] for x in batch]
+            results = await loop.run_in_executor(self.executor, extractBatch, texts, threshs)
+            for (_, _, future), res in zip(batch, results):
+                if not future.done():
+                    future.set_result(res)
+        except Exception as e:
+            if isinstance(e, BrokenExecutor):
+                self.broken = str(e) or type(e).__name__
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.slots.release()
+            self.batch_size.observe(len(batch))
+
+    async def route(self, method: str, target: str, body: bytes) -> tuple:
+        """
+        NOT TO USE DIRECTLY
+        Answers a request
+
+        :return: Status, content type and body of the response
+        :rtype: tuple
+        """
+        path = target.split('?')[0]
+
+        if path == '/health':
+            if method != 'GET':
+                return 405, 'application/json', json.dumps({"error": "method not allowed"})
+            broken = self.getBroken()
+            health = {"status": "broken" if broken else "ok", "pid": os.getpid(), "queue": self.queue.qsize(), "uptime": time.time() - self.started}
+            if broken:
+                health["error"] = broken
+            # only known when the frozen model is used in this process, i.e. with --prefork or --workers 0
+            if worker_model is not None and hasattr(worker_model.index, 'cacheInfo'):
+                health["index_cache"] = worker_model.index.cacheInfo()
+            return 503 if broken else 200, 'application/json', json.dumps(health)
+
+        if path == '/metrics':
+            if method != 'GET':
+                return 405, 'application/json', json.dumps({"error": "method not allowed"})
+            return 200, 'text/plain; version=0.0.4', self.metrics()
+
+        if path == '/extract':
+            if method != 'POST':
+                return 405, 'application/json', json.dumps({"error": "method not allowed"})
+
+            try:
+                data = json.loads(body)
+                thresh = float(data.get('thresh', self.thresh))
+                texts = [data['text']] if 'text' in data else data['texts']
+                if not isinstance(texts, list) or not all(isinstance(x, str) for x in texts):
+                    raise ValueError('texts must be a list of strings')
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                return 400, 'application/json', json.dumps({"error": f"invalid request: {e}"})
+
+            if len(texts) > self.max_queue:
+                # not an overload, retrying would fail the same way
+                return 413, 'application/json', json.dumps({"error": f"too many texts, at most {self.max_queue} per request"})
+            if self.getBroken():
+                return 503, 'application/json', json.dumps({"error": f"workers are broken: {self.broken}"})
+
+            start = time.perf_counter()
+            try:
+                results = await self.extract(texts, thresh)
+            except asyncio.QueueFull:
+                return 503, 'application/json', json.dumps({"error": "server overloaded, retry later"})
+            except Exception as e:
+                return 500, 'application/json', json.dumps({"error": str(e)})
+            self.latency.observe(time.perf_counter() - start)
+
+            # results are already encoded by the workers
+            payload = results[0] if 'text' in data else f"[{','.join(results)}]"
+            return 200, 'application/json', payload
+
+        return 404, 'application/json', json.dumps({"error": "not found"})
+
+    def getBroken(self) -> str:
+        """
+        NOT TO USE DIRECTLY
+        Returns why the executor cannot run batches anymore, or None if it can
+        """
+        if self.broken is None and getattr(self.executor, '_broken', False):
+            # set by ProcessPoolExecutor as soon as a worker dies, before any batch fails
+            self.broken = str(self.executor._broken)
+        return self.broken
+
+    def metrics(self) -> str:
+        """
+        NOT TO USE DIRECTLY
+        Renders the metrics in the Prometheus text format
+        """
+        labels = f'pid="{os.getpid()}"'
+        lines = [self.latency.render(labels), self.batch_size.render(labels)]
+        lines.append('# HELP elijere_requests_total Number of answered requests by status')
+        lines.append('# TYPE elijere_requests_total counter')
+        for status, n in sorted(self.requests.items()):
+            lines.append(f'elijere_requests_total{{{labels},status="{status}"}} {n}')
+        lines.append('# HELP elijere_queue_size Number of texts waiting for a batch')
+        lines.append('# TYPE elijere_queue_size gauge')
+        lines.append(f'elijere_queue_size{{{labels}}} {self.queue.qsize()}')
+        return '\n'.join(lines) + '\n'
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        NOT TO USE DIRECTLY
+        Answers the HTTP/1.1 requests of a connection, which is kept alive unless the client closes it
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                    body = await reader.readexactly(int(headers.get('content-length', 0)))
+                    status, content_type, payload = await self.route(method, target, body)
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                except ValueError:
+                    status, content_type, payload = 400, 'application/json', json.dumps({"error": "malformed request"})
+                    keep_alive = False
+
+                self.requests[status] += 1
+                payload = payload.encode('utf-8')
+                head = [
+                    f'HTTP/1.1 {status} {HTTP_REASONS[status]}',
+                    f'Content-Type: {content_type}',
+                    f'Content-Length: {len(payload)}',
+                    f'Connection: {"keep-alive" if keep_alive else "close"}',
+                ]
+                if status == 503:
+                    head.append('Retry-After: 1')
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8000, sock=None) -> None:
+        """
+        Serves until cancelled
+
+        :param host: Host to listen on, defaults to '127.0.0.1'
+        :type host: str, optional
+        :param port: Port to listen on, defaults to 8000
+        :type port: int, optional
+        :param sock: Listening socket to use instead of host and port, defaults to None
+        :type sock: socket.socket, optional
+        """
+        self.queue = asyncio.Queue(self.max_queue)
+        self.slots = asyncio.Semaphore(self.n_workers)
+        batcher = asyncio.get_running_loop().create_task(self.batchLoop())
+
+        if sock is not None:
+            server = await asyncio.start_server(self.handle, sock=sock)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+
+
+def serveForked(server_params: dict, n_workers: int, host: str = '127.0.0.1', port: int = 8000, max_failures: int = 5, min_uptime: float = 10) -> int:
+    """
+    Serves with n_workers processes forked from the current one once the model is loaded in worker_model, so that they share its memory
+    instead of loading their own copy. The parent process listens on host and port, and each worker accepts connections on the same socket
+    and extracts facts in its own ExtractionServer. Workers that die are forked again, until the parent receives SIGINT or SIGTERM.
+    Workers that fail within min_uptime seconds are forked again after an increasing delay, and the service stops after max_failures
+    such failures in a row, as every new worker would fail the same way.
+
+    Memory stays flat as workers are added when the model is the runtime frozen with freezeModel, as its index is mapped from read-only
+    files. Otherwise, the pages of the model are shared until they are written to, which reference counting does for the objects a worker reads.
+
+    /health and /metrics are answered by the worker accepting the connection: they give the state and the metrics of this worker only,
+    with its pid.
+
+    :param server_params: Parameters of ExtractionServer, without executor and n_workers
+    :type server_params: dict
+    :param n_workers: Number of worker processes
+    :type n_workers: int
+    :param host: Host to listen on, defaults to '127.0.0.1'
+    :type host: str, optional
+    :param port: Port to listen on, defaults to 8000
+    :type port: int, optional
+    :param max_failures: Number of workers failing in a row after which the service stops, defaults to 5
+    :type max_failures: int, optional
+    :param min_uptime: Time in seconds under which a worker exiting with an error is counted as a failure, defaults to 10
+    :type min_uptime: float, optional
+    :return: Exit status of the service, 1 if it stopped because of failing workers, else 0
+    :rtype: int
+    """
+    sock = socket.create_server((host, port), backlog=1024)
+
+    # objects allocated so far are never traversed by the garbage collector, which would write to their pages in each worker
+    gc.collect()
+    gc.freeze()
+
+    def fork() -> int:
+        pid = os.fork()
+        if pid:
+            started[pid] = time.time()
+            return pid
+
+        # worker process
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        status = 0
+        try:
+            server = ExtractionServer(ThreadPoolExecutor(1), n_workers=1, **server_params)
+            asyncio.run(server.serve(sock=sock))
+        except KeyboardInterrupt:
+            pass
+        except BaseException:
+            print(f'Worker {os.getpid()} failed:', file=sys.stderr)
+            traceback.print_exc()
+            status = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(status)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    started = {}
+    workers = set()
+    for _ in range(n_workers):
+        workers.add(fork())
+    print(f'Serving on http://{host}:{port} with {n_workers} forked workers')
+
+    failures = 0
+    while workers:
+        pid, status = os.wait()
+        workers.discard(pid)
+        uptime = time.time() - started.pop(pid, 0)
+        if stopping:
+            continue
+
+        status = os.waitstatus_to_exitcode(status)
+        failures = failures + 1 if status != 0 and uptime < min_uptime else 0
+        print(f'Worker {pid} exited with status {status} after {uptime:.1f}s')
+        if failures >= max_failures:
+            print(f'{failures} workers failed in a row, stopping the service', file=sys.stderr)
+            stop(None, None)
+            continue
+
+        if failures:
+            # backs off, so that a worker failing at startup is not forked again in a loop
+            time.sleep(min(30, .5 * 2 ** (failures - 1)))
+        if not stopping:
+            print('Forking a new worker')
+            workers.add(fork())
+
+    sock.close()
+    return 1 if failures >= max_failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP service extracting facts with ELIJERE')
+    parser.add_argument('--model', required=True, help='Path to project storing the model folder')
+    parser.add_argument('--runtime', action='store_true', help='Load the model compiled with compileModel')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes, 0 to extract in a thread of the server process')
+    parser.add_argument('--prefork', type=int, default=0,
+                        help='Number of server processes forked after loading the model, sharing its memory, instead of --workers')
+    parser.add_argument('--index-cache-mb', type=float, default=16,
+                        help='With --prefork, maximum frozen size of the patterns each worker keeps decoded, 0 to decode them at each lookup')
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5, help='Maximum time a text waits for other texts to fill its batch')
+    parser.add_argument('--max-queue', type=int, default=1024, help='Maximum number of texts waiting for a batch, before answering 503')
+    parser.add_argument('--thresh', type=float, default=0, help='Default semantic threshold')
+    args = parser.parse_args()
+
+    server_params = {'max_batch_size': args.max_batch_size, 'max_wait': args.max_wait_ms / 1000, 'max_queue': args.max_queue, 'thresh': args.thresh}
+
+    if args.prefork > 0:
+        # the frozen runtime is mapped in memory, so that it is shared by the forked workers
+        frozen = args.runtime and os.path.exists(f"{args.model}/model/runtime/frozen/anchors.json")
+        if args.runtime and not frozen:
+            print('No frozen runtime found, run freezeModel to share the index between the workers')
+        initServerWorker(args.model, args.runtime, frozen, int(args.index_cache_mb * 1024 * 1024))
+        sys.exit(serveForked(server_params, args.prefork, args.host, args.port))
+
+    if args.workers > 0:
+        executor = ProcessPoolExecutor(args.workers, initializer=initServerWorker, initargs=(args.model, args.runtime))
+        # starts the workers and loads the models before serving
+        for future in [executor.submit(extractBatch, [], []) for _ in range(args.workers)]:
+            future.result()
+    else:
+        initServerWorker(args.model, args.runtime)
+        executor = ThreadPoolExecutor(1)
+
+    server = ExtractionServer(executor, n_workers=max(args.workers, 1), **server_params)
+    print(f'Serving on http://{args.host}:{args.port}')
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+if __name__ == '__main__':
+    main()
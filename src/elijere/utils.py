@@ -5,44 +5,132 @@ sys.path.append('..')
 import json
 from glob import glob
 import networkx as nx
-from typing import List 
-import pandas as pd 
+from typing import List, TYPE_CHECKING
 from collections import defaultdict
 from networkx.classes.graph import Graph
-import matplotlib.pyplot as plt 
 from itertools import combinations
 from functools import partial
 import os 
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
-import matplotlib.pyplot as plt 
 from networkx.classes.reportviews import NodeView, EdgeView
-from spacy.tokens import Doc
-import copy
 from functools import reduce
+from multiprocessing import get_context, get_all_start_methods
 import numpy as np 
+
+# plotting, evaluation, training and spaCy dependencies are imported by the functions
+# using them, so that importing elijere only loads what inference needs
+if TYPE_CHECKING:
+    import pandas as pd
+    from spacy.tokens import Doc
+    from spacy.vocab import Vocab
 # from nervaluate import Evaluator
 
 
-def saveWhatLinksHere(entity_type:str, savepath:str, list_urls:List[str]) -> None:
+def atomicJSONDump(filepath:str, data, indent:int=None, separators:tuple=None, default=None, fsync:bool=True) -> None:
+    """
+    Writes data as JSON to a temporary file, then renames it to filepath, so that
+    the file on disk is either the previous version or the new one, never a partial write
+
+    :param filepath: Path of the JSON file to write
+    :type filepath: str
+    :param data: Data to save
+    :type data: Any
+    :param indent: Indentation of the JSON file, defaults to None
+    :type indent: int, optional
+    :param separators: Item and key separators, as in json.dump, defaults to None
+    :type separators: tuple, optional
+    :param default: Function encoding objects json cannot serialize, as in json.dump, defaults to None
+    :type default: Callable, optional
+    :param fsync: Whether to wait for the file to be written on disk before renaming it, defaults to True
+    :type fsync: bool, optional
+    """
+    tmp_filepath = f"{filepath}.tmp"
+    with open(tmp_filepath, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        json.dump(data, f, indent=indent, separators=separators, default=default)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_filepath, filepath)
+
+def getPeakRSS() -> float:
+    """
+    Returns the peak resident set size of the current process so far, in MiB, or None where the resource module is not available (Windows)
+
+    :return: Peak RSS in MiB
+    :rtype: float
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    if sys.platform == 'darwin':
+        return maxrss / 2**20
+    return maxrss / 2**10
+
+def getSizeHistogram(sizes: List[int]) -> dict:
+    """
+    Counts sizes in power of two buckets, e.g. {"1": 10, "2-3": 4, "4-7": 1}
+
+    :param sizes: Sizes to count
+    :type sizes: List[int]
+    :return: Number of sizes in each non-empty bucket
+    :rtype: dict
+    """
+    buckets = defaultdict(int)
+    for size in sizes:
+        low = 1 << (size.bit_length() - 1) if size > 0 else 0
+        buckets[low] += 1
+
+    return {(str(low) if low < 2 else f"{low}-{2 * low - 1}"): n for low, n in sorted(buckets.items())}
+
+def encodeGraph(obj):
     """
-    Save results of getWhatLinksHere to disk
+    Encodes networkx graphs as node-link data while data is being written with json.dump, so that
+    documents containing graphs do not have to be copied and converted beforehand
+
+    :param obj: Object json cannot serialize
+    :type obj: Any
+    :raises TypeError: If obj is not a graph
+    :return: Node-link data of the graph
+    :rtype: dict
+    """
+    if isinstance(obj, Graph):
+        return nx.node_link_data(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def saveWhatLinksHere(entity_type:str, savepath:str, list_urls:List[str], cursor:str = '', n_items:int = 0, done:bool = False) -> None:
+    """
+    Save results of getWhatLinksHere to disk. The file also acts as the checkpoint of the crawler:
+    cursor is the 'from=' token of the next page to fetch and n_items the number of item ids already
+    written to the items file
 
     :param savepath: Path to save folder
     :type savepath: str
     :param list_urls: List of URLs to save
     :type list_urls: List[str]
+    :param cursor: 'from=' token of the next WhatLinksHere page to fetch, defaults to ''
+    :type cursor: str, optional
+    :param n_items: Number of item ids extracted so far, defaults to 0
+    :type n_items: int, optional
+    :param done: Whether the last WhatLinksHere page has been reached, defaults to False
+    :type done: bool, optional
     """
 
     os.makedirs(f"{savepath}/whatlinkshere/", exist_ok=True)
-    with open(f"{savepath}/whatlinkshere/{entity_type}-whatlinkshere.json", 'w', encoding='utf-8') as f:
-        json.dump(
-            {
-                "type": entity_type,
-                "urls": list_urls
-            }, f, indent=4
-        )
-  
+    atomicJSONDump(
+        f"{savepath}/whatlinkshere/{entity_type}-whatlinkshere.json",
+        {
+            "type": entity_type,
+            "urls": list_urls,
+            "cursor": cursor,
+            "n_items": n_items,
+            "done": done
+        }, indent=4
+    )
+
     # with open(f"{savepath}/whatlinkshere/{entity_type}-whatlinkshere.txt", 'w', encoding='utf-8') as f:
     #     f.write('\n'.join(list_urls))
     
@@ -82,6 +170,53 @@ def loadWhatLinksHereLinks(entity_type:str, folderpath: str = "") -> List[str]:
         #     file = f.read()
         #     return file.split('\n')
 
+def appendWhatLinksHereItems(entity_type:str, savepath:str, list_items:List[str]) -> None:
+    """
+    Appends item ids extracted from a WhatLinksHere page to the items file of the given type, one id per line
+
+    :param entity_type: Type of entity being crawled, e.g. Q5
+    :type entity_type: str
+    :param savepath: Path to save folder
+    :type savepath: str
+    :param list_items: Item ids to append
+    :type list_items: List[str]
+    """
+    os.makedirs(f"{savepath}/whatlinkshere/", exist_ok=True)
+    with open(f"{savepath}/whatlinkshere/{entity_type}-items.txt", 'a', encoding='utf-8') as f:
+        for item in list_items:
+            f.write(f"{item}\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def loadWhatLinksHereItems(entity_type:str, folderpath:str = "", n_items:int = 0) -> List[str]:
+    """
+    Loads the item ids extracted so far for the given type. Only the first n_items ids are kept, as
+    they are the ones recorded by the last checkpoint: the file is truncated accordingly
+
+    :param entity_type: Type of entity being crawled, e.g. Q5
+    :type entity_type: str
+    :param folderpath: Path to project folder, defaults to ""
+    :type folderpath: str, optional
+    :param n_items: Number of item ids recorded by the last checkpoint, defaults to 0
+    :type n_items: int, optional
+    :return: List of item ids
+    :rtype: List[str]
+    """
+    filepath = f"{folderpath}/whatlinkshere/{entity_type}-items.txt"
+    if not folderpath or not os.path.exists(filepath):
+        return []
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        list_items = f.read().splitlines()
+
+    if len(list_items) != n_items:
+        list_items = list_items[:n_items]
+        with open(f"{filepath}.tmp", 'w', encoding='utf-8') as f:
+            f.write(''.join(f"{item}\n" for item in list_items))
+        os.replace(f"{filepath}.tmp", filepath)
+
+    return list_items
+
 def saveWikidataLinks(savepath:str, data:dict) -> None:
     """
     Saves results from getWikidataLinks
@@ -139,11 +274,78 @@ def saveEntitiesData(savepath: str, entityData:dict) -> None:
     with open(f"{savepath}/entity_data/{entityData['type']}/{entityData['id']}.json", 'w', encoding='utf-8') as f:
         json.dump(entityData, f, indent=4)
 
+def appendEntityJournal(savepath: str, entityData:dict, stage:str, keys:List[str] = [], dropped:bool = False) -> None:
+    """
+    Appends the result of a DARES stage to the journal of an entity, stored as a .jsonl file in the entity_data folder.
+    Each line records the stage name and the keys of entityData it updated (its delta), so that the whole entity is only
+    written once, by its first stage. If keys is empty, the whole entity is written.
+
+    :param savepath: Path to project where to save data
+    :type savepath: str
+    :param entityData: Dictionnary containing data about the entity
+    :type entityData: dict
+    :param stage: Name of the stage
+    :type stage: str
+    :param keys: Keys of entityData updated by the stage, defaults to []
+    :type keys: List[str], optional
+    :param dropped: Whether the entity was discarded by the stage, defaults to False
+    :type dropped: bool, optional
+    """
+
+    if dropped:
+        line = {"stage": stage, "dropped": True}
+    elif keys:
+        line = {"stage": stage, "delta": {k: entityData[k] for k in keys}}
+    else:
+        line = {"stage": stage, "delta": {k: v for k, v in entityData.items() if k != 'stages'}}
+
+    os.makedirs(f"{savepath}/entity_data/{entityData['type']}", exist_ok=True)
+    with open(f"{savepath}/entity_data/{entityData['type']}/{entityData['id']}.jsonl", 'a', encoding='utf-8') as f:
+        # a single write, so that an interrupted one cannot leave a line without its end, which the next one would be appended to
+        f.write(json.dumps(line, separators=(',', ':')) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+def loadEntityJournal(filepath: str) -> dict:
+    """
+    Rebuilds an entity from its journal by replaying the delta of each stage. The names of the stages
+    already done are stored in the 'stages' key. A line left incomplete by an interrupted write is removed
+    from the journal, so that the next stages can be appended to it.
+
+    :param filepath: Path to the .jsonl journal of the entity
+    :type filepath: str
+    :return: Entity data dictionary, with a 'dropped' key set to True if a stage discarded the entity
+    :rtype: dict
+    """
+
+    entityData = {}
+    stages = []
+
+    with open(filepath, 'rb+') as f:
+        end = 0
+        for raw_line in f:
+            try:
+                line = json.loads(raw_line)
+            except json.JSONDecodeError:
+                f.truncate(end)
+                break
+            end += len(raw_line)
+
+            if line.get('dropped'):
+                entityData['dropped'] = True
+            else:
+                entityData.update(line['delta'])
+            stages.append(line['stage'])
+
+    entityData['stages'] = stages
+    return entityData
+
 def loadEntitiesData(savepath: str) -> List[dict]:
     """
-    Helper function to load entity data files on disk
+    Helper function to load entity data files on disk, either saved as a single .json file or as a .jsonl journal.
+    When an entity has both, its journal is used. Entities discarded during processing are not returned.
 
-    :param savepath: Path to folder containing the files 
+    :param savepath: Path to folder containing the files
     :type savepath: str
     :return: List of entity data dictionaries
     :rtype: List[dict]
@@ -152,26 +354,141 @@ def loadEntitiesData(savepath: str) -> List[dict]:
     list_entities_data = []
 
     for doc in glob(f"{savepath}/entity_data/**/**.json", recursive=True):
+        if os.path.exists(f"{doc}l"):
+            # the journal is loaded below
+            continue
         with open(doc, encoding='utf-8') as f:
             list_entities_data.append(json.load(f))
+
+    for doc in glob(f"{savepath}/entity_data/**/**.jsonl", recursive=True):
+        entityData = loadEntityJournal(doc)
+        if not entityData.get('dropped'):
+            list_entities_data.append(entityData)
+
     return list_entities_data
 
 def saveDocument(savepath:str, data:dict) -> None:
 
     os.makedirs(f"{savepath}/corpus", exist_ok=True)
 
-    save_data = copy.deepcopy(data)
-    for dict_sent in save_data['content']:
+    # graphs are converted while writing, data is left untouched
+    atomicJSONDump(f"{savepath}/corpus/graph_{data['id']}.json", data, separators=(',', ':'), default=encodeGraph, fsync=False)
 
-        dict_sent['graph'] = nx.node_link_data(dict_sent['graph'])
-        for dict_rel in dict_sent['props']:
-            for sdp in dict_rel['sdpgraphs']:
-            # try:
-                if not isinstance(sdp['sdpgraph'], str):
-                    sdp['sdpgraph'] = nx.node_link_data(sdp['sdpgraph'])
+def saveParse(savepath: str, id: str, docs: 'List[Doc]') -> None:
+    """
+    Saves the spaCy Docs of the sentences of a document as a DocBin, so that they do not have to be parsed again
+
+    :param savepath: Path to project where to save data
+    :type savepath: str
+    :param id: Id of the document
+    :type id: str
+    :param docs: Parsed sentences of the document
+    :type docs: List[Doc]
+    """
+
+    from spacy.tokens import DocBin
+
+    os.makedirs(f"{savepath}/parse", exist_ok=True)
+
+    filepath = f"{savepath}/parse/{id}.spacy"
+    with open(f"{filepath}.tmp", 'wb') as f:
+        f.write(DocBin(docs=docs).to_bytes())
+    os.replace(f"{filepath}.tmp", filepath)
+
+def loadParse(savepath: str, id: str, vocab: 'Vocab', texts: List[str] = None) -> 'List[Doc]':
+    """
+    Loads the spaCy Docs of a document saved with saveParse
+
+    :param savepath: Path to project where the data is stored
+    :type savepath: str
+    :param id: Id of the document
+    :type id: str
+    :param vocab: Vocab of the spaCy pipeline
+    :type vocab: Vocab
+    :param texts: Sentences the Docs must match, e.g. if they were cleaned differently since, defaults to None
+    :type texts: List[str], optional
+    :return: Parsed sentences of the document, or None if they were not saved or do not match texts
+    :rtype: List[Doc]
+    """
+
+    from spacy.tokens import DocBin
+
+    filepath = f"{savepath}/parse/{id}.spacy"
+    if not os.path.exists(filepath):
+        return None
+
+    docs = list(DocBin().from_disk(filepath).get_docs(vocab))
+    if texts is not None and [doc.text for doc in docs] != list(texts):
+        return None
+
+    return docs
+
+def writeDocBins(docs, savepath: str, shard_size: int = 1000, store_user_data: bool = True) -> int:
+    """
+    Saves a stream of spaCy Docs as a folder of DocBin shards of shard_size Docs each, so that they can be read back with
+    iterDocBins without loading the whole collection in memory. Only the current shard is kept in memory while writing
+
+    :param docs: Iterable of Docs to save
+    :type docs: Iterable[Doc]
+    :param savepath: Folder where to save the shards
+    :type savepath: str
+    :param shard_size: Number of Docs per shard, defaults to 1000
+    :type shard_size: int, optional
+    :param store_user_data: Whether to save the user data of the Docs (e.g. their metadata), defaults to True
+    :type store_user_data: bool, optional
+    :return: Number of Docs saved
+    :rtype: int
+    """
+
+    from spacy.tokens import DocBin
+
+    os.makedirs(savepath, exist_ok=True)
+
+    def writeShard(docbin, n_shard):
+        filepath = f"{savepath}/shard_{n_shard:05d}.spacy"
+        with open(f"{filepath}.tmp", 'wb') as f:
+            f.write(docbin.to_bytes())
+        os.replace(f"{filepath}.tmp", filepath)
 
-    with open(f"{savepath}/corpus/graph_{save_data['id']}.json", 'w', encoding='utf-8') as f:
-        json.dump(save_data, f, indent=4) 
+    n_docs, n_shard = 0, 0
+    docbin = DocBin(store_user_data=store_user_data)
+    for doc in docs:
+        docbin.add(doc)
+        n_docs += 1
+        if len(docbin) == shard_size:
+            writeShard(docbin, n_shard)
+            docbin = DocBin(store_user_data=store_user_data)
+            n_shard += 1
+
+    if len(docbin):
+        writeShard(docbin, n_shard)
+
+    return n_docs
+
+def iterDocBins(loadpath: str, vocab: 'Vocab'):
+    """
+    Reads spaCy Docs from a .spacy file, or from a folder of .spacy files such as written by writeDocBins, in order.
+    Files are read one at a time, so that only the current one is kept in memory
+
+    :param loadpath: Path to a .spacy file or to a folder of .spacy files
+    :type loadpath: str
+    :param vocab: Vocab of the spaCy pipeline
+    :type vocab: Vocab
+    :return: Generator of Docs
+    :rtype: Generator
+    """
+
+    from spacy.tokens import DocBin
+
+    if os.path.isdir(loadpath):
+        list_files = sorted(glob(f"{loadpath}/*.spacy"))
+    else:
+        list_files = [loadpath]
+
+    for filepath in list_files:
+        docbin = DocBin().from_disk(filepath)
+        yield from docbin.get_docs(vocab)
+        del docbin
 
 def saveCorpus(savepath: str, data:List[dict]) -> None:
     """
@@ -186,7 +503,7 @@ def saveCorpus(savepath: str, data:List[dict]) -> None:
     os.makedirs(f"{savepath}/corpus", exist_ok=True)
     saveFunc = saveDocument
     for d in data:
-         saveFunc(savepath=f"{savepath}/corpus", data=d)
+         saveFunc(savepath=savepath, data=d)
 
 def loadDocument(savepath: str, clean:bool=True) -> dict:
 
@@ -243,15 +560,8 @@ def save_dataset(savepath:str, dataset:dict) -> None:
 
     os.makedirs(f"{savepath}/dataset", exist_ok=True)
 
-    save_data = copy.deepcopy(dataset)
-    for k, v in save_data.items():
-        if k.startswith('X'):
-            for prop in v:
-                # print(prop)
-                prop['sdpgraph'] = nx.node_link_data(prop['sdpgraph'])
-
-    with open(f"{savepath}/dataset/dataset.json", 'w', encoding='utf-8') as f:
-        json.dump(save_data, f, indent=4)
+    # graphs are converted while writing, dataset is left untouched
+    atomicJSONDump(f"{savepath}/dataset/dataset.json", dataset, separators=(',', ':'), default=encodeGraph)
 
 def load_dataset(savepath:str) -> dict:
 
@@ -460,6 +770,9 @@ def divide_train_dev_text(list_graphs:List[dict], train_size:float = .8) -> tupl
     :return: Output of train_test_split
     :rtype: tuple
     """
+
+    from sklearn.model_selection import train_test_split
+
     return train_test_split(list_graphs, [x['prop'] for x in list_graphs], train_size=train_size, random_state=42)
 
 
@@ -472,6 +785,11 @@ def getConfusionMatrix(y_true:List[str], y_pred:List[str], plot:bool=True) -> No
     :param y_pred: List of predictions
     :type y_pred: List[str]
     """
+
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
+
     labels = list(set(y_true))
     conf_m = confusion_matrix(y_true, y_pred, labels=labels, normalize='all')
     if plot:
@@ -492,6 +810,8 @@ def vizGraph(graph: Graph, label:str = '') -> None:
     :type label: str, optional
     """
 
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(15, 15))
 
     pos = nx.spring_layout(graph)
@@ -630,7 +950,7 @@ def getRelationNames(dict_rel:List[dict]) -> dict:
 #     tmp_dict['Other'] = 'Other'
 #     return tmp_dict
 
-def doc2graph(doc: Doc) -> dict:
+def doc2graph(doc: 'Doc') -> dict:
     """
     Creates directed graph from Doc, where Token objects are
     node, and dependency labels are added to edges.
@@ -673,7 +993,89 @@ def doc2graph(doc: Doc) -> dict:
 
     return dict_graph
 
-def showEval(eval_dict:dict, key:str) -> pd.DataFrame:
+def getSDPsFromHeads(heads: List[int], pairs: List[tuple]) -> List[List[int]]:
+    """
+    Finds the Shortest Dependency Path between each pair of nodes of a dependency tree, given as the head of each token (token.head.i),
+    as in the graph built by doc2graph: the path goes up from the first node to their lowest common ancestor, then down to the second node.
+    The depth of each token is computed once for all pairs.
+
+    :param heads: Position of the head of each token, roots being their own head
+    :type heads: List[int]
+    :param pairs: Pairs of token positions
+    :type pairs: List[tuple]
+    :return: For each pair, the list of nodes of the path, or 'SYNTACTIC-ERROR' if a node is not part of the graph or both nodes are not in the same tree
+    :rtype: List[List[int]]
+    """
+
+    n = len(heads)
+
+    # tokens without head nor dependent are not part of the graph built by doc2graph
+    in_graph = [False] * n
+    for i, head in enumerate(heads):
+        if head != i:
+            in_graph[i] = in_graph[head] = True
+
+    depth = [-1] * n
+    for i in range(n):
+        # walks up to the first token of known depth, then sets the depth of the walked tokens
+        chain = []
+        j = i
+        while depth[j] < 0 and heads[j] != j:
+            chain.append(j)
+            j = heads[j]
+        if depth[j] < 0:
+            depth[j] = 0
+        d = depth[j]
+        for k in reversed(chain):
+            d += 1
+            depth[k] = d
+
+    list_sdp = []
+    for source, target in pairs:
+        if not (0 <= source < n and 0 <= target < n and in_graph[source] and in_graph[target]):
+            list_sdp.append('SYNTACTIC-ERROR')
+            continue
+
+        up, down = [source], [target]
+        a, b = source, target
+        while depth[a] > depth[b]:
+            a = heads[a]
+            up.append(a)
+        while depth[b] > depth[a]:
+            b = heads[b]
+            down.append(b)
+        while a != b and heads[a] != a:
+            a, b = heads[a], heads[b]
+            up.append(a)
+            down.append(b)
+
+        # both nodes are in different trees
+        if a != b:
+            list_sdp.append('SYNTACTIC-ERROR')
+        else:
+            list_sdp.append(up + down[-2::-1])
+
+    return list_sdp
+
+def getSDPFromHeads(heads: List[int], source: int, target: int) -> List[int]:
+    """
+    Finds the Shortest Dependency Path between two nodes of a dependency tree, given as the head of each token. See getSDPsFromHeads
+
+    :param heads: Position of the head of each token, roots being their own head
+    :type heads: List[int]
+    :param source: Position of the first node
+    :type source: int
+    :param target: Position of the second node
+    :type target: int
+    :return: List of nodes of the path, or 'SYNTACTIC-ERROR'
+    :rtype: List[int]
+    """
+
+    return getSDPsFromHeads(heads, [(source, target)])[0]
+
+def showEval(eval_dict:dict, key:str) -> 'pd.DataFrame':
+    import pandas as pd
+
     eval_res = [v for k, v in eval_dict[key].items()]
     dev = [x['dev'] for x in eval_res]
     test = [x['test'] for x in eval_res]
@@ -738,68 +1140,368 @@ def getEnt(x, dict_ent=None):
 
     return ner 
 
-def evaluate_models(models:dict, evaldata:dict,  ner_tags, list_thresh:List[float], dict_rel=None, dict_ent=None,):
+# outcome of each NER scenario for each evaluation schema, as scored by nervaluate
+NER_SCHEMAS = ['strict', 'ent_type', 'partial', 'exact']
+NER_METRICS = ['correct', 'incorrect', 'partial', 'missed', 'spurious', 'possible', 'actual', 'precision', 'recall', 'f1']
+NER_OUTCOMES = {
+    'match': {'strict': 'correct', 'ent_type': 'correct', 'partial': 'correct', 'exact': 'correct'},
+    'wrongType': {'strict': 'incorrect', 'ent_type': 'incorrect', 'partial': 'correct', 'exact': 'correct'},
+    'overlap': {'strict': 'incorrect', 'ent_type': 'correct', 'partial': 'partial', 'exact': 'incorrect'},
+    'overlapWrongType': {'strict': 'incorrect', 'ent_type': 'incorrect', 'partial': 'partial', 'exact': 'incorrect'},
+    'spurious': {'strict': 'spurious', 'ent_type': 'spurious', 'partial': 'spurious', 'exact': 'spurious'},
+    'missed': {'strict': 'missed', 'ent_type': 'missed', 'partial': 'missed', 'exact': 'missed'},
+}
+
+class StreamingEvaluator:
+    """
+    Evaluates relation and entity predictions one example at a time, keeping only counts: a confusion matrix of the relations,
+    and the nervaluate outcomes of the entities, overall and by type. Memory does not grow with the number of examples.
+    Gives the same results as ELIJERE.evaluate and nervaluate's Evaluator on the whole lists of predictions
+    """
 
-    def evaluation(X_data, y_data):
+    def __init__(self, ner_tags: List[str], ignoreOther: bool = True):
+        """
+        :param ner_tags: Entity types to evaluate
+        :type ner_tags: List[str]
+        :param ignoreOther: Whether to ignore examples whose true relation is Other, defaults to True
+        :type ignoreOther: bool, optional
+        """
+
+        self.ner_tags = ner_tags
+        self.ignoreOther = ignoreOther
+        # (true, pred) -> number of examples
+        self.confusion = defaultdict(int)
+        self.ner_counts = {schema: defaultdict(int) for schema in NER_SCHEMAS}
+        self.ner_type_counts = {tag: {schema: defaultdict(int) for schema in NER_SCHEMAS} for tag in ner_tags}
+
+    def update(self, true_rel: str, pred_rel: str, true_ner: List[dict] = [], pred_ner: List[dict] = []) -> None:
+        """
+        Adds an example to the counts
+
+        :param true_rel: True relation
+        :type true_rel: str
+        :param pred_rel: Predicted relation
+        :type pred_rel: str
+        :param true_ner: True entities, with their label, start and end, defaults to []
+        :type true_ner: List[dict], optional
+        :param pred_ner: Predicted entities, with their label, start and end, defaults to []
+        :type pred_ner: List[dict], optional
+        """
+
+        if not (self.ignoreOther and true_rel == 'Other'):
+            self.confusion[(true_rel, pred_rel)] += 1
+
+        for outcome, label in self.matchEntities(true_ner, pred_ner):
+            for schema, metric in NER_OUTCOMES[outcome].items():
+                self.ner_counts[schema][metric] += 1
+                self.ner_type_counts[label][schema][metric] += 1
+
+    def matchEntities(self, true_ner: List[dict], pred_ner: List[dict]) -> List[tuple]:
+        """
+        NOT TO USE DIRECTLY
+        Matches the predicted entities of an example with its true entities, following the scenarios of nervaluate
+
+        :param true_ner: True entities
+        :type true_ner: List[dict]
+        :param pred_ner: Predicted entities
+        :type pred_ner: List[dict]
+        :return: Outcome of each entity, and the entity type it is counted for
+        :rtype: List[tuple]
+        """
+
+        true_ents = [(x['label'], x['start'], x['end']) for x in true_ner if x['label'] in self.ner_tags]
+        pred_ents = [(x['label'], x['start'], x['end']) for x in pred_ner if x['label'] in self.ner_tags]
+
+        outcomes = []
+        overlapped = []
+        for pred in pred_ents:
+            pred_label, pred_start, pred_end = pred
+
+            if pred in true_ents:
+                overlapped.append(pred)
+                outcomes.append(('match', pred_label))
+                continue
+
+            outcome = 'spurious'
+            label = pred_label
+            for true in true_ents:
+                true_label, true_start, true_end = true
+
+                if true_start == pred_start and true_end == pred_end:
+                    outcome = 'wrongType'
+                # a true entity can only be overlapped once
+                elif max(true_start, pred_start) <= min(true_end, pred_end) and true not in overlapped:
+                    outcome = 'overlap' if true_label == pred_label else 'overlapWrongType'
+                else:
+                    continue
+
+                overlapped.append(true)
+                label = true_label
+                break
+
+            outcomes.append((outcome, label))
+
+        outcomes.extend(('missed', true[0]) for true in true_ents if true not in overlapped)
+        return outcomes
+
+    def relationResults(self) -> dict:
+        """
+        Computes the macro Precision, Recall and F1 of the relations, as ELIJERE.evaluate
+
+        :return: Dictionary with P,R,F1 scores and report
+        :rtype: dict
+        """
+
+        labels = sorted({x for pair in self.confusion.keys() for x in pair})
+        rows = []
+        for label in labels:
+            tp = self.confusion.get((label, label), 0)
+            n_true = sum(n for (true, _), n in self.confusion.items() if true == label)
+            n_pred = sum(n for (_, pred), n in self.confusion.items() if pred == label)
+
+            p = tp / n_pred if n_pred else 0.
+            r = tp / n_true if n_true else 0.
+            f1 = 2 * tp / (n_true + n_pred) if n_true + n_pred else 0.
+            rows.append((label, p, r, f1, int(n_true)))
+
+        support = int(sum(x[4] for x in rows))
+        correct = sum(self.confusion.get((label, label), 0) for label in labels)
+        macro = [float(np.mean([x[i] for x in rows])) if rows else 0. for i in (1, 2, 3)]
+        weighted = [sum(x[i] * x[4] for x in rows) / support if support else 0. for i in (1, 2, 3)]
+
+        # same layout as sklearn's classification_report
+        width = max([len(x) for x in labels] + [len('weighted avg'), 3])
+        report = ("{:>{width}s} " + " {:>9}" * 4).format("", "precision", "recall", "f1-score", "support", width=width) + "\n\n"
+        row_fmt = "{:>{width}s} " + " {:>9.3f}" * 3 + " {:>9d}\n"
+        for row in rows:
+            report += row_fmt.format(*row, width=width)
+        report += "\n"
+        report += ("{:>{width}s} " + " {:>9}" * 2 + " {:>9.3f}" + " {:>9d}\n").format("accuracy", "", "", correct / support if support else 0., support, width=width)
+        report += row_fmt.format("macro avg", *macro, support, width=width)
+        report += row_fmt.format("weighted avg", *weighted, support, width=width)
+
+        return {
+            'P': macro[0],
+            "R": macro[1],
+            "F1": macro[2],
+            "report": report,
+        }
+
+    def nerResults(self) -> tuple:
+        """
+        Computes the Precision, Recall and F1 of the entities for each schema, overall and by type, as nervaluate's Evaluator
+
+        :return: Results by schema, and results by type and schema
+        :rtype: tuple
+        """
+
+        def results(counts):
+            res = {}
+            # partial matches count for half with the partial and ent_type schemas
+            for schema in ['partial', 'ent_type', 'strict', 'exact']:
+                res[schema] = {metric: counts[schema][metric] for metric in NER_METRICS[:5]}
+                metrics = res[schema]
+                metrics['possible'] = metrics['correct'] + metrics['incorrect'] + metrics['partial'] + metrics['missed']
+                metrics['actual'] = metrics['correct'] + metrics['incorrect'] + metrics['partial'] + metrics['spurious']
+
+                correct = metrics['correct'] + 0.5 * metrics['partial'] if schema in ['partial', 'ent_type'] else metrics['correct']
+                metrics['precision'] = correct / metrics['actual'] if metrics['actual'] > 0 else 0
+                metrics['recall'] = correct / metrics['possible'] if metrics['possible'] > 0 else 0
+                p, r = metrics['precision'], metrics['recall']
+                metrics['f1'] = 2 * (p * r) / (p + r) if (p + r) > 0 else 0
+            return res
+
+        return results(self.ner_counts), {tag: results(counts) for tag, counts in self.ner_type_counts.items()}
+
+
+def getTruth(X_data:List[dict], y_data:List[str], dict_rel:dict=None, dict_ent:dict=None) -> tuple:
+    """
+    Returns the true relations and entities of evaluation examples
+
+    :param X_data: Evaluation examples
+    :type X_data: List[dict]
+    :param y_data: Relation of each example
+    :type y_data: List[str]
+    :param dict_rel: Dictionary to rename the relations, defaults to None
+    :type dict_rel: dict, optional
+    :param dict_ent: Dictionary to rename the entity types, defaults to None
+    :type dict_ent: dict, optional
+    :return: List of true relations and list of true entities of each example
+    :rtype: tuple
+    """
+
+    true_ner = [getEnt(x, dict_ent) for x in X_data]
+    if dict_rel:
+        true_rel = [dict_rel[x] for x in y_data]
+    else:
+        true_rel = [x for x in y_data]
+
+    return true_rel, true_ner
+
+def predictExample(model, x:dict, thresh:float, dict_ent:dict=None) -> tuple:
+    """
+    Predicts the relation of an evaluation example, then its entities if it is not Other
+
+    :param model: Model to evaluate
+    :type model: ELIJERE
+    :param x: Evaluation example, with its sdpgraph and sent_graph
+    :type x: dict
+    :param thresh: Semantic threshold
+    :type thresh: float
+    :param dict_ent: Dictionary to rename the entity types, defaults to None
+    :type dict_ent: dict, optional
+    :return: Relation prediction and list of entity predictions
+    :rtype: tuple
+    """
+
+    rel_pred = model.predict(x['sdpgraph'], thresh=thresh)
+    ner_predictions = []
+
+    if rel_pred['pred'] != 'Other':
+        ner_pred = model.NERclassification(x['sent_graph'], rel_pred['pred'], rel_pred['candidate'])
+        for pred in ner_pred:
+
+            if dict_ent:
+                label = dict_ent[pred['pred']]
+            else:
+                label = pred['pred']
+
+            ner_predictions.append(
+                {
+                    "label": label,
+                    "start": int(pred['start']),
+                    "end": int(pred['end'])
+                }
+            )
+
+    return rel_pred, ner_predictions
+
+def evaluate_models(models:dict, evaldata:dict,  ner_tags, list_thresh:List[float], dict_rel=None, dict_ent=None, sweep:bool=False, stream:bool=False):
+    """
+    Evaluates the relation and entity predictions of each model on the dev and test sets, for each semantic threshold.
+    With sweep, each graph is predicted once without threshold, then every threshold is applied to the recorded scores, which gives
+    the same results: the best candidate of a graph does not depend on the threshold, only whether its score passes it.
+    With stream, each example is also predicted once, then scored for every threshold with a StreamingEvaluator and discarded:
+    memory does not grow with the evaluation sets, but only the dev, devNer, devNerType, test, testNer and testNerType keys are returned.
+
+    :param models: Models to evaluate, by name
+    :type models: dict
+    :param evaldata: Dataset containing the X_dev, y_dev, X_test and y_test keys
+    :type evaldata: dict
+    :param ner_tags: Entity types to evaluate
+    :type ner_tags: List[str]
+    :param list_thresh: Semantic thresholds to evaluate
+    :type list_thresh: List[float]
+    :param dict_rel: Dictionary to rename the relations, defaults to None
+    :type dict_rel: dict, optional
+    :param dict_ent: Dictionary to rename the entity types, defaults to None
+    :type dict_ent: dict, optional
+    :param sweep: Whether to predict once and sweep the thresholds, defaults to False
+    :type sweep: bool, optional
+    :param stream: Whether to score the predictions without keeping them, defaults to False
+    :type stream: bool, optional
+    :return: Evaluation of each model for each threshold
+    :rtype: dict
+    """
+    from nervaluate import Evaluator
+
+    def prediction(X_data, thresh):
 
-        true_ner = [getEnt(x, dict_ent) for x in X_data]
-        # print(y_data)
-        if dict_rel:
-            true_rel = [dict_rel[x] for x in y_data]
-        else:
-            true_rel = [x for x in y_data]
-        # print(true_rel)
-        # print(len(y_data), len(true_rel))
-        # print(thresh)
         rel_predictions = []
         total_ner_predictions = []
 
         for x in X_data:
-            rel_pred = func_classify(x['sdpgraph'], thresh=thresh)
-            # print(rel_pred)
+            rel_pred, ner_predictions = predictExample(model, x, thresh, dict_ent)
             rel_predictions.append(rel_pred)
-            ner_predictions = []
+            total_ner_predictions.append(ner_predictions)
 
-            if rel_pred['pred'] != 'Other':
-                ner_pred = func_ner(x['sent_graph'], rel_pred['pred'], rel_pred['candidate'])
-                for pred in ner_pred:
+        return rel_predictions, total_ner_predictions
 
-                    if dict_ent:
-                        label = dict_ent[pred['pred']]
-                    else:
-                        label = pred['pred']
+    def applyThreshold(raw_predictions, scores, semantic, thresh):
 
-                    ner_predictions.append(
-                        {
-                            "label": label,
-                            "start": int(pred['start']),
-                            "end": int(pred['end'])
-                        }
-                    )
+        rel_predictions, total_ner_predictions = raw_predictions
+        # predictions under the threshold become the default class, without entities
+        passed = semantic & (scores > thresh)
+        too_weak = semantic & ~passed
 
-            total_ner_predictions.append(ner_predictions)
+        rel_predictions = [{**x, "pred": 'Other', "rule": 'tooWeak'} if weak else x for x, weak in zip(rel_predictions, too_weak)]
+        total_ner_predictions = [[] if weak else x for x, weak in zip(total_ner_predictions, too_weak)]
+
+        return rel_predictions, total_ner_predictions
+
+    def evaluation(true_rel, true_ner, rel_predictions, total_ner_predictions):
 
-        # pred_y = [x['pred'] for x in rel_predictions]
         rel_eval = model.evaluate(true_rel, [x['pred'] for x in rel_predictions])
 
         ner_evaluator = Evaluator(true_ner, total_ner_predictions, tags=ner_tags)
         ner_eval, ner_type_eval = ner_evaluator.evaluate()
 
-        return rel_predictions, total_ner_predictions, true_rel, true_ner, rel_eval, ner_eval, ner_type_eval
+        return rel_eval, ner_eval, ner_type_eval
+
+    def streaming(X_data, y_data):
+
+        scorers = {thresh: StreamingEvaluator(ner_tags) for thresh in list_thresh}
+        for x, y in zip(X_data, y_data):
+            true_rel = dict_rel[y] if dict_rel else y
+            true_ner = getEnt(x, dict_ent)
+            rel_pred, ner_predictions = predictExample(model, x, -np.inf, dict_ent)
+
+            for thresh, scorer in scorers.items():
+                if rel_pred['rule'] == 'semantic' and not rel_pred['score'] > thresh:
+                    scorer.update(true_rel, 'Other', true_ner, [])
+                else:
+                    scorer.update(true_rel, rel_pred['pred'], true_ner, ner_predictions)
+
+        return {thresh: (scorer.relationResults(), *scorer.nerResults()) for thresh, scorer in scorers.items()}
 
     
     eval_dict = {}
 
     for modelname, model in models.items():
-        func_classify = model.predict
-        func_ner = model.NERclassification 
+
+        if stream:
+            dev_results = streaming(evaldata['X_dev'], evaldata['y_dev'])
+            test_results = streaming(evaldata['X_test'], evaldata['y_test'])
+
+            eval_dict[modelname] = {
+                thresh: {
+                    "dev": dev_results[thresh][0],
+                    'devNer': dev_results[thresh][1],
+                    'devNerType': dev_results[thresh][2],
+
+                    "test": test_results[thresh][0],
+                    'testNer': test_results[thresh][1],
+                    'testNerType': test_results[thresh][2],
+                }
+                for thresh in list_thresh
+            }
+            continue
+
+        dev_true_rel, dev_true_ner = getTruth(evaldata['X_dev'], evaldata['y_dev'], dict_rel, dict_ent)
+        test_true_rel, test_true_ner = getTruth(evaldata['X_test'], evaldata['y_test'], dict_rel, dict_ent)
+
+        if sweep:
+            # predicts once, keeping every prediction with a semantic score
+            dev_raw = prediction(evaldata['X_dev'], -np.inf)
+            test_raw = prediction(evaldata['X_test'], -np.inf)
+
+            dev_scores = np.array([x['score'] for x in dev_raw[0]], dtype=float)
+            dev_semantic = np.array([x['rule'] == 'semantic' for x in dev_raw[0]], dtype=bool)
+            test_scores = np.array([x['score'] for x in test_raw[0]], dtype=float)
+            test_semantic = np.array([x['rule'] == 'semantic' for x in test_raw[0]], dtype=bool)
 
         thresh_dict = {}
         for thresh in list_thresh:
 
-            dev_rel_predictions, dev_total_ner_predictions, dev_true_rel, dev_true_ner, dev_rel_eval, dev_ner_eval, dev_ner_type_eval = evaluation(evaldata['X_dev'], evaldata['y_dev'])
+            if sweep:
+                dev_rel_predictions, dev_total_ner_predictions = applyThreshold(dev_raw, dev_scores, dev_semantic, thresh)
+                test_rel_predictions, test_total_ner_predictions = applyThreshold(test_raw, test_scores, test_semantic, thresh)
+            else:
+                dev_rel_predictions, dev_total_ner_predictions = prediction(evaldata['X_dev'], thresh)
+                test_rel_predictions, test_total_ner_predictions = prediction(evaldata['X_test'], thresh)
 
-            test_rel_predictions, test_total_ner_predictions, test_true_rel, test_true_ner, test_rel_eval, test_ner_eval, test_ner_type_eval = evaluation(evaldata['X_test'], evaldata['y_test'])
+            dev_rel_eval, dev_ner_eval, dev_ner_type_eval = evaluation(dev_true_rel, dev_true_ner, dev_rel_predictions, dev_total_ner_predictions)
+            test_rel_eval, test_ner_eval, test_ner_type_eval = evaluation(test_true_rel, test_true_ner, test_rel_predictions, test_total_ner_predictions)
 
             thresh_dict[thresh] = {
                 "devPred": dev_rel_predictions,
@@ -822,7 +1524,190 @@ def evaluate_models(models:dict, evaldata:dict,  ner_tags, list_thresh:List[floa
     return eval_dict
     # return {"dev": df_test, "test": df_test}
 
+# models and evaluation data of each worker process of parallel_evaluate_models, set by initEvaluationWorker
+worker_models = None
+worker_evaldata = None
+
+def initEvaluationWorker(models: dict, evaldata: dict) -> None:
+    """
+    NOT TO USE DIRECTLY
+    Initializer of the worker processes of parallel_evaluate_models: loads each model once per process.
+    The pool is started with the fork start method where it is available, so that the models and the evaluation data
+    are inherited from the parent process instead of being pickled for each worker
+
+    :param models: Models to evaluate, or paths to the projects storing them, by name
+    :type models: dict
+    :param evaldata: Dataset containing the X_dev and X_test keys
+    :type evaldata: dict
+    """
+    global worker_models, worker_evaldata
+    from .model import ELIJERE
+
+    worker_models = {}
+    for modelname, model in models.items():
+        if isinstance(model, str):
+            path = model
+            model = ELIJERE()
+            model.load_model(path, load_nlp=False)
+        worker_models[modelname] = model
+    worker_evaldata = evaldata
+
+def evaluateShard(task: tuple, dict_ent: dict = None) -> tuple:
+    """
+    NOT TO USE DIRECTLY
+    Predicts a shard of a split without threshold in a worker process of parallel_evaluate_models
+
+    :param task: Name of the model, split, start and end of the shard
+    :type task: tuple
+    :param dict_ent: Dictionary to rename the entity types, defaults to None
+    :type dict_ent: dict, optional
+    :return: Task and predictions of the shard as columns
+    :rtype: tuple
+    """
+    modelname, split, start, end = task
+    model = worker_models[modelname]
+
+    shard = {"pred": [], "score": [], "rule": [], "anchortext": [], "ner": []}
+    for x in worker_evaldata[f'X_{split}'][start:end]:
+        rel_pred, ner_predictions = predictExample(model, x, -np.inf, dict_ent)
+        shard['pred'].append(rel_pred['pred'])
+        shard['score'].append(float(rel_pred['score']))
+        shard['rule'].append(rel_pred['rule'])
+        shard['anchortext'].append(rel_pred['anchortext'] or '')
+        shard['ner'].append(ner_predictions)
+
+    return task, shard
+
+def parallel_evaluate_models(models:dict, evaldata:dict, ner_tags, list_thresh:List[float], dict_rel=None, dict_ent=None,
+                             n_core:int=6, shard_size:int=1000, savepath:str='') -> dict:
+    """
+    Evaluates models as evaluate_models with sweep, in a pool of processes: the dev and test sets are split into shards,
+    which are predicted by the workers for every model at once. Each worker loads the models once, and the thresholds are swept in the main process.
+    Relation predictions are given without their candidate, so that graphs are not sent back from the workers.
+    The workers are forked where the fork start method is available (not on Windows), so that they inherit evaldata and the models
+    instead of receiving a pickled copy each: with another start method, giving the models as paths limits what is pickled.
+    With savepath, the predictions without threshold of each model and split are saved as columns in evaluation/{modelname}/{split}.npz:
+    true, pred, score, rule and anchortext for the relations, and ner_offsets, ner_label, ner_start and ner_end for the entities,
+    the entities of example i being at ner_offsets[i]:ner_offsets[i+1]
+
+    :param models: Models to evaluate, or paths to the projects storing them, by name
+    :type models: dict
+    :param evaldata: Dataset containing the X_dev, y_dev, X_test and y_test keys
+    :type evaldata: dict
+    :param ner_tags: Entity types to evaluate
+    :type ner_tags: List[str]
+    :param list_thresh: Semantic thresholds to evaluate
+    :type list_thresh: List[float]
+    :param dict_rel: Dictionary to rename the relations, defaults to None
+    :type dict_rel: dict, optional
+    :param dict_ent: Dictionary to rename the entity types, defaults to None
+    :type dict_ent: dict, optional
+    :param n_core: Number of processes, defaults to 6
+    :type n_core: int, optional
+    :param shard_size: Number of examples predicted at once by a worker, defaults to 1000
+    :type shard_size: int, optional
+    :param savepath: Path to project where to save the predictions, defaults to ''
+    :type savepath: str, optional
+    :return: Evaluation of each model for each threshold
+    :rtype: dict
+    """
+    from nervaluate import Evaluator
+    from .model import ELIJERE
+
+    splits = ('dev', 'test')
+    # shards of all models are interleaved, so that they are evaluated in parallel
+    tasks = [
+        (modelname, split, start, min(start + shard_size, len(evaldata[f'X_{split}'])))
+        for split in splits
+        for start in range(0, len(evaldata[f'X_{split}']), shard_size)
+        for modelname in models.keys()
+    ]
+
+    # the fork context is explicit, as the default start method is spawn on macOS and, from Python 3.14, on Linux
+    context = get_context('fork' if 'fork' in get_all_start_methods() else None)
+
+    shards = defaultdict(list)
+    with context.Pool(n_core, initializer=initEvaluationWorker, initargs=(models, evaldata)) as p:
+        for task, shard in p.imap_unordered(partial(evaluateShard, dict_ent=dict_ent), tasks):
+            shards[task[:2]].append((task[2], shard))
+
+    truth = {split: getTruth(evaldata[f'X_{split}'], evaldata[f'y_{split}'], dict_rel, dict_ent) for split in splits}
+
+    eval_dict = {}
+    for modelname in models.keys():
+        columns = {}
+        for split in splits:
+            shards[(modelname, split)].sort(key=lambda x: x[0])
+            raw = {k: [y for _, shard in shards[(modelname, split)] for y in shard[k]] for k in ('pred', 'score', 'rule', 'anchortext', 'ner')}
+            columns[split] = {
+                "pred": np.array(raw['pred'], dtype=str),
+                "score": np.array(raw['score'], dtype=float),
+                "rule": np.array(raw['rule'], dtype=str),
+                "anchortext": np.array(raw['anchortext'], dtype=str),
+                "ner": raw['ner']
+            }
+
+            if savepath:
+                ner = [y for x in raw['ner'] for y in x]
+                os.makedirs(f"{savepath}/evaluation/{modelname}", exist_ok=True)
+                np.savez_compressed(
+                    f"{savepath}/evaluation/{modelname}/{split}.npz",
+                    true=np.array(truth[split][0], dtype=str),
+                    pred=columns[split]['pred'],
+                    score=columns[split]['score'],
+                    rule=columns[split]['rule'],
+                    anchortext=columns[split]['anchortext'],
+                    ner_offsets=np.cumsum([0] + [len(x) for x in raw['ner']]),
+                    ner_label=np.array([x['label'] for x in ner], dtype=str),
+                    ner_start=np.array([x['start'] for x in ner], dtype=int),
+                    ner_end=np.array([x['end'] for x in ner], dtype=int)
+                )
+
+        thresh_dict = {}
+        for thresh in list_thresh:
+            results = {}
+            for split in splits:
+                col = columns[split]
+                # predictions under the threshold become the default class, without entities
+                semantic = col['rule'] == 'semantic'
+                too_weak = semantic & ~(col['score'] > thresh)
+                pred = np.where(too_weak, 'Other', col['pred'])
+                rule = np.where(too_weak, 'tooWeak', col['rule'])
+
+                rel_predictions = [
+                    {"pred": p, "score": s, "rule": r, "anchortext": a}
+                    for p, s, r, a in zip(pred.tolist(), col['score'].tolist(), rule.tolist(), col['anchortext'].tolist())
+                ]
+                total_ner_predictions = [[] if weak else x for x, weak in zip(col['ner'], too_weak)]
+
+                true_rel, true_ner = truth[split]
+                rel_eval = ELIJERE.evaluate(true_rel, pred.tolist())
+                ner_eval, ner_type_eval = Evaluator(true_ner, total_ner_predictions, tags=ner_tags).evaluate()
+                results[split] = (rel_predictions, true_rel, rel_eval, ner_eval, ner_type_eval, total_ner_predictions, true_ner)
+
+            thresh_dict[thresh] = {
+                "devPred": results['dev'][0],
+                'trueDev': results['dev'][1],
+                "dev": results['dev'][2],
+                'devNer': results['dev'][3],
+                'devNerType': results['dev'][4],
+                'devNerPred': results['dev'][5],
+                'devNerTrue': results['dev'][6],
+
+                "testPred": results['test'][0],
+                'trueTest': results['test'][1],
+                "test": results['test'][2],
+                'testNer': results['test'][3],
+                'testNerType': results['test'][4],
+                'testNerPred': results['test'][5],
+                'testNerTrue': results['test'][6],
+            }
+        eval_dict[modelname] = thresh_dict
+    return eval_dict
+
 def nereval2df(data_eval, name):
+    import pandas as pd
+
     index_list = ['ent_type', 'partial', 'strict', 'exact']
     df = pd.DataFrame.from_dict([{
         'P': data_eval[i]['precision'], 
@@ -834,6 +1719,8 @@ def nereval2df(data_eval, name):
     return df
 
 def nerevaltype2df(data_eval, name):
+    import pandas as pd
+
     df = pd.DataFrame.from_dict(data_eval)
     index_list = ['ent_type', 'partial', 'strict', 'exact']
 
@@ -0,0 +1,41 @@
+import random
+import warnings
+
+import pytest
+
+from elijere.model import ELIJERE
+from elijere.utils import StreamingEvaluator
+
+LABELS = ['P19', 'P20', 'P26', 'P108', 'Other']
+
+
+def makePredictions(seed: int = 0, n: int = 500) -> tuple:
+    rng = random.Random(seed)
+    y_true = [rng.choice(LABELS) for _ in range(n)]
+    # most predictions are right, so that every label is both true and predicted
+    y_pred = [x if rng.random() < .7 else rng.choice(LABELS) for x in y_true]
+    return y_true, y_pred
+
+
+@pytest.mark.parametrize('ignoreOther', [True, False])
+def test_relation_results(ignoreOther):
+    y_true, y_pred = makePredictions()
+    evaluator = StreamingEvaluator(ner_tags=[], ignoreOther=ignoreOther)
+    for true, pred in zip(y_true, y_pred):
+        evaluator.update(true, pred)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = ELIJERE.evaluate(y_true, y_pred, ignoreOther=ignoreOther)
+    results = evaluator.relationResults()
+
+    for metric in ('P', 'R', 'F1'):
+        assert results[metric] == pytest.approx(expected[metric])
+    # the supports are counts, printed as integers
+    assert results['report'] == expected['report']
+
+
+def test_empty_report():
+    report = StreamingEvaluator(ner_tags=[]).relationResults()['report']
+    accuracy = next(line for line in report.splitlines() if line.strip().startswith('accuracy'))
+    assert accuracy.split()[-1] == '0'
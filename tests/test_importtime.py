@@ -0,0 +1,45 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# maximum import time of elijere.model, in seconds, as in benchmarks/importtime.py
+BUDGET = 1.0
+
+# only needed to train, evaluate or plot, or to parse texts, they must not be loaded on import
+FORBIDDEN = ['pandas', 'sklearn', 'scipy', 'matplotlib', 'Levenshtein', 'nervaluate', 'spacy']
+
+
+def importTime(module: str) -> dict:
+    """
+    Imports module in a fresh interpreter with -X importtime, and returns the cumulative import time in seconds of each imported module
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(x for x in [SRC, os.environ.get('PYTHONPATH', '')] if x))
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], env=env, capture_output=True, text=True)
+    assert res.returncode == 0, res.stderr
+
+    # lines are formatted as "import time: self [us] | cumulative | imported package"
+    dict_time = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        dict_time[name.strip()] = int(cumulative) / 1e6
+    return dict_time
+
+
+@pytest.fixture(scope='module')
+def model_import_time() -> dict:
+    return importTime('elijere.model')
+
+
+@pytest.mark.parametrize('module', FORBIDDEN)
+def test_heavy_dependencies_not_imported(model_import_time, module):
+    assert module not in model_import_time
+
+
+def test_import_time_budget(model_import_time):
+    assert model_import_time['elijere.model'] < BUDGET
@@ -0,0 +1,76 @@
+import random
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from elijere.matcher import stagedSimMatrix, matchRecall
+
+# minimum share of the brute force matches the staged matcher must find
+MIN_RECALL = 0.95
+
+LABELS = [
+    'Marie Curie', 'Pierre Curie', 'University of Paris', 'Nobel Prize in Physics', 'Warsaw', 'Sorbonne',
+    'Victor Hugo', 'Les Misérables', 'Besançon', 'Académie française', 'Frida Kahlo', 'Diego Rivera',
+]
+
+FILLERS = [
+    'the', 'was', 'born', 'in', 'and', 'with', 'of', 'a', 'famous', 'city', 'where', 'he', 'she', 'worked',
+    'married', 'studied', 'wrote', 'received', 'later', 'moved', 'to', 'during', 'war', 'years',
+]
+
+
+def makeMention(rng: random.Random, label: str) -> str:
+    """
+    Returns a mention of label as found in texts: verbatim, with another case, without its accents, with a typo,
+    or with a missing word
+    """
+
+    kind = rng.choice(['exact', 'exact', 'case', 'accents', 'typo', 'truncated'])
+    if kind == 'case':
+        return label.lower()
+    if kind == 'accents':
+        return label.replace('é', 'e').replace('ç', 'c')
+    if kind == 'typo':
+        i = rng.randrange(1, len(label) - 1)
+        return label[:i] + label[i + 1] + label[i] + label[i + 2:]
+    if kind == 'truncated' and ' ' in label:
+        return label.rsplit(' ', 1)[0]
+    return label
+
+
+def makeSentences(seed: int = 0, n_sents: int = 300) -> list:
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(n_sents):
+        words = [rng.choice(FILLERS) for _ in range(rng.randint(5, 15))]
+        # some sentences mention no label at all
+        for _ in range(rng.choice([0, 1, 1, 2])):
+            words.insert(rng.randrange(len(words) + 1), makeMention(rng, rng.choice(LABELS)))
+        sent = ' '.join(words)
+        sentences.append(sent[0].upper() + sent[1:] + '.')
+    return sentences
+
+
+def test_staged_matcher_recall():
+    sentences = makeSentences()
+    assert matchRecall(sentences, LABELS, fuzz.partial_ratio, 90) >= MIN_RECALL
+
+
+def test_staged_matcher_scores():
+    # pairs found by both matchers have the same score
+    sentences = makeSentences(seed=1)
+    brute = process.cdist(sentences, LABELS, scorer=fuzz.partial_ratio, score_cutoff=90, workers=-1)
+    staged = stagedSimMatrix(sentences, LABELS, fuzz.partial_ratio, 90)
+
+    found = staged > 0
+    assert (brute[found] == staged[found]).all()
+
+
+def test_exact_matches():
+    # without fuzzy matching, exactly the labels occurring verbatim in a sentence score 100
+    sentences = makeSentences(seed=2)
+    staged = stagedSimMatrix(sentences, LABELS, fuzz.partial_ratio, 90, fuzzy=False)
+    expected = np.array([[100 if label in sent else 0 for label in LABELS] for sent in sentences], dtype=staged.dtype)
+
+    assert expected.any()
+    assert (staged == expected).all()
@@ -0,0 +1,165 @@
+import json
+import socket
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from elijere import server
+
+
+class StubNLP:
+    def __init__(self) -> None:
+        self.batches = []
+
+    def pipe(self, texts):
+        self.batches.append(len(texts))
+        return iter(texts)
+
+
+class StubModel:
+    """
+    Model whose facts are the text and the threshold it is given
+    """
+
+    def __init__(self) -> None:
+        self.nlp = StubNLP()
+        self.index = None
+
+    def extractFacts(self, doc, thresh=0):
+        return [{"text": doc, "thresh": thresh}]
+
+
+@pytest.fixture
+def model(monkeypatch):
+    stub = StubModel()
+    monkeypatch.setattr(server, 'worker_model', stub)
+    return stub
+
+
+async def request(port: int, method: str, target: str, body: bytes = b'') -> tuple:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'{method} {target} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    while (await reader.readline()) not in (b'\r\n', b''):
+        pass
+    payload = await reader.read()
+    writer.close()
+    return status, json.loads(payload) if payload.startswith((b'{', b'[')) else payload.decode('utf-8')
+
+
+def runWithServer(extraction_server: server.ExtractionServer, client) -> object:
+    """
+    Serves on a free port while the coroutine function client(port) runs, and returns its result
+    """
+    async def main():
+        sock = socket.create_server(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        serving = asyncio.get_running_loop().create_task(extraction_server.serve(sock=sock))
+        try:
+            return await client(port)
+        finally:
+            serving.cancel()
+            try:
+                await serving
+            except asyncio.CancelledError:
+                pass
+
+    return asyncio.run(main())
+
+
+def test_extract(model):
+    extraction_server = server.ExtractionServer(ThreadPoolExecutor(1), thresh=.5)
+
+    async def client(port):
+        return await asyncio.gather(
+            request(port, 'POST', '/extract', b'{"text": "a"}'),
+            request(port, 'POST', '/extract', b'{"texts": ["b", "c"], "thresh": 0.9}'),
+        )
+
+    (status_a, facts_a), (status_bc, facts_bc) = runWithServer(extraction_server, client)
+    assert status_a == 200 and facts_a == [{"text": "a", "thresh": .5}]
+    assert status_bc == 200 and facts_bc == [[{"text": "b", "thresh": .9}], [{"text": "c", "thresh": .9}]]
+
+
+def test_micro_batching(model):
+    extraction_server = server.ExtractionServer(ThreadPoolExecutor(1), max_batch_size=4, max_wait=.2)
+
+    async def client(port):
+        return await asyncio.gather(*[request(port, 'POST', '/extract', json.dumps({"text": str(i)}).encode()) for i in range(10)])
+
+    results = runWithServer(extraction_server, client)
+    assert [facts[0]['text'] for _, facts in results] == [str(i) for i in range(10)]
+    assert sum(model.nlp.batches) == 10
+    # requests waiting together are parsed together, in batches of at most max_batch_size texts
+    assert max(model.nlp.batches) == 4
+    assert len(model.nlp.batches) < 10
+
+
+def test_bad_requests(model):
+    extraction_server = server.ExtractionServer(ThreadPoolExecutor(1))
+
+    async def client(port):
+        return await asyncio.gather(
+            request(port, 'POST', '/extract', b'{not json'),
+            request(port, 'POST', '/extract', b'{"texts": [1, 2]}'),
+            request(port, 'GET', '/extract'),
+            request(port, 'GET', '/unknown'),
+        )
+
+    assert [status for status, _ in runWithServer(extraction_server, client)] == [400, 400, 405, 404]
+
+
+def test_full_queue_and_oversize_batch(model):
+    extraction_server = server.ExtractionServer(ThreadPoolExecutor(1), max_queue=2)
+
+    async def main():
+        # no batch loop: the queue is filled by hand
+        extraction_server.queue = asyncio.Queue(extraction_server.max_queue)
+        extraction_server.slots = asyncio.Semaphore(1)
+        extraction_server.queue.put_nowait(('x', 0, asyncio.get_running_loop().create_future()))
+
+        overloaded = await extraction_server.route('POST', '/extract', b'{"texts": ["a", "b"]}')
+        oversize = await extraction_server.route('POST', '/extract', b'{"texts": ["a", "b", "c"]}')
+        return overloaded, oversize
+
+    overloaded, oversize = asyncio.run(main())
+    # a request the queue cannot take now can be retried, one larger than the queue cannot
+    assert overloaded[0] == 503
+    assert oversize[0] == 413
+
+
+def test_health_of_broken_workers(model):
+    def fail():
+        raise RuntimeError('cannot load the model')
+
+    # the worker thread fails to start, as a killed process breaks a ProcessPoolExecutor
+    extraction_server = server.ExtractionServer(ThreadPoolExecutor(1, initializer=fail))
+
+    async def client(port):
+        health_before = await request(port, 'GET', '/health')
+        extract = await request(port, 'POST', '/extract', b'{"text": "a"}')
+        health_after = await request(port, 'GET', '/health')
+        extract_after = await request(port, 'POST', '/extract', b'{"text": "a"}')
+        return health_before, extract, health_after, extract_after
+
+    health_before, extract, health_after, extract_after = runWithServer(extraction_server, client)
+    assert health_before[0] == 200 and health_before[1]['status'] == 'ok'
+    assert extract[0] in (500, 503)
+    assert health_after[0] == 503 and health_after[1]['status'] == 'broken'
+    assert extract_after[0] == 503
+
+
+def test_metrics(model):
+    extraction_server = server.ExtractionServer(ThreadPoolExecutor(1))
+
+    async def client(port):
+        await request(port, 'POST', '/extract', b'{"text": "a"}')
+        return await request(port, 'GET', '/metrics')
+
+    status, metrics = runWithServer(extraction_server, client)
+    assert status == 200
+    assert f'elijere_requests_total{{pid="{server.os.getpid()}",status="200"}} 1' in metrics
+    assert 'elijere_batch_size_count' in metrics
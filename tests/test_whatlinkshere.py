@@ -0,0 +1,82 @@
+import re
+import json
+
+import pytest
+import requests
+
+from elijere import dares
+
+N_PAGES = 5
+LIMIT = 3
+
+
+class FakeWikidata:
+    """
+    WhatLinksHere pages of N_PAGES pages of LIMIT items, answering with the given status to the given pages
+    """
+
+    def __init__(self, failures: dict = {}) -> None:
+        # page -> list of statuses to answer before the page
+        self.failures = {k: list(v) for k, v in failures.items()}
+        self.calls = []
+
+    def get(self, url: str) -> requests.Response:
+        self.calls.append(url)
+        search_page = re.search(r'from=(\d+)', url)
+        page = int(search_page.group(1)) if search_page else 0
+
+        res = requests.Response()
+        res.url = url
+        if self.failures.get(page):
+            res.status_code = self.failures[page].pop(0)
+            res._content = b'<html><body>Too many requests</body></html>'
+            return res
+
+        items = ''.join(f'<li><a href="/wiki/Q{page * LIMIT + i}">item</a></li>' for i in range(LIMIT))
+        next_page = ''
+        if page < N_PAGES - 1:
+            next_page = f'<a href="/w/index.php?title=Special:WhatLinksHere/Q5&amp;limit={LIMIT}&amp;from={page + 1}">next {LIMIT}</a>'
+        res.status_code = 200
+        res._content = f'<html><body><ul id="mw-whatlinkshere-list">{items}</ul>{next_page}</body></html>'.encode('utf-8')
+        return res
+
+
+@pytest.fixture
+def wikidata(monkeypatch):
+    def install(failures: dict = {}) -> FakeWikidata:
+        fake = FakeWikidata(failures)
+        monkeypatch.setattr(dares.requests, 'get', fake.get)
+        monkeypatch.setattr(dares.time, 'sleep', lambda x: None)
+        return fake
+    return install
+
+
+def crawl(folderpath: str) -> dict:
+    return dares.WhatLinksHere().getWhatLinksHere('Q5', limit=LIMIT, save_step=1, folderpath=folderpath)[0]
+
+
+def test_retries_rate_limited_pages(wikidata, tmp_path):
+    fake = wikidata({2: [429, 503]})
+    data = crawl(str(tmp_path))
+
+    assert len(data['urls']) == N_PAGES
+    assert sorted(data['ent_id']) == sorted(f'Q{i}' for i in range(N_PAGES * LIMIT))
+    assert len(fake.calls) == N_PAGES + 2
+
+
+def test_failed_page_does_not_end_the_crawl(wikidata, tmp_path):
+    wikidata({2: [503] * 10})
+    with pytest.raises(requests.HTTPError):
+        crawl(str(tmp_path))
+
+    with open(tmp_path / 'whatlinkshere' / 'Q5-whatlinkshere.json', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    assert not checkpoint.get('done')
+    assert checkpoint['cursor'] == '2'
+
+    # the resumed crawl starts from the page that failed and gives back the pages of the previous run
+    fake = wikidata()
+    data = crawl(str(tmp_path))
+    assert len(data['urls']) == N_PAGES
+    assert sorted(data['ent_id']) == sorted(f'Q{i}' for i in range(N_PAGES * LIMIT))
+    assert 'from=2' in fake.calls[0]
@@ -0,0 +1,120 @@
+import os
+import sys
+import json
+import signal
+import socket
+import asyncio
+import argparse
+import subprocess
+
+import pytest
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks')
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, BENCHMARKS)
+
+pytestmark = pytest.mark.skipif(not os.path.exists('/proc/self/smaps_rollup') or not hasattr(os, 'fork'),
+                                reason='needs fork and /proc/<pid>/smaps_rollup')
+
+N_WORKERS = 4
+# mean USS of the workers, in MB: a worker loading its own copy of the model and of its libraries takes more than 100 MB
+MAX_USS_MB = 16
+# growth of the mean USS of the workers from 1 to N_WORKERS workers, in MB
+MAX_USS_GROWTH_MB = 4
+
+# serves the frozen runtime with serveForked, parsing the held-out sentences of the synthetic corpus into their Docs
+SERVE = """
+import sys
+from synthetic import generateCorpus
+from elijere import server
+
+path, port, n_workers = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+
+class HeldOutNLP:
+    def __init__(self):
+        self.docs = {doc.text: doc for _, docs in generateCorpus(20, seed=1) for doc in docs}
+
+    def pipe(self, texts):
+        return [self.docs[text] for text in texts]
+
+server.initServerWorker(path, runtime=True, frozen=True)
+server.worker_model.nlp = HeldOutNLP()
+sys.exit(server.serveForked({}, n_workers, port=port))
+"""
+
+
+@pytest.fixture(scope='module')
+def project(tmp_path_factory):
+    from synthetic import generateCorpus
+    from elijere.utils import loadCorpus, prepare_corpus
+    from elijere.model import SyntacticIndex, SemanticIndex
+    from elijere.runtime import compileModel
+
+    savepath = str(tmp_path_factory.mktemp('synthetic'))
+    anchor_textvalue = ['lemma', 'pos']
+    for _ in generateCorpus(300, savepath=savepath):
+        pass
+    data = prepare_corpus(loadCorpus(savepath), train_size=1, clean=True)
+    SyntacticIndex().trainSyntacticIndex(list_graphs=data['X_train'], anchor_textvalue=anchor_textvalue, graphkey='sdpgraph', propkey='prop',
+                                         savepath=savepath)
+    SemanticIndex().trainSemanticIndex(list_graphs=data['X_train'], textvalue=anchor_textvalue, removePROPN=True, savepath=savepath)
+    with open(f"{savepath}/model/elijere_config.json", 'w', encoding='utf-8') as f:
+        json.dump({"spacy_model": "blank:en", "anchor_textvalue": anchor_textvalue}, f, indent=4)
+
+    # also freezes the runtime
+    compileModel(savepath)
+    return savepath
+
+
+@pytest.fixture(scope='module')
+def texts():
+    from synthetic import generateCorpus
+    return [doc.text for _, docs in generateCorpus(20, seed=1) for doc in docs]
+
+
+def measureWorkers(project: str, n_workers: int, texts: list) -> tuple:
+    """
+    Serves project with n_workers forked workers, sends them requests, and returns the memory of the parent and of each worker
+    """
+    from loadgen import run
+    from worker_rss import readMemory, getChildren, waitHealthy
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    url = f'http://127.0.0.1:{port}'
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(x for x in [SRC, BENCHMARKS, os.environ.get('PYTHONPATH', '')] if x))
+    process = subprocess.Popen([sys.executable, '-c', SERVE, project, str(port), str(n_workers)], stdout=subprocess.DEVNULL, env=env)
+    try:
+        waitHealthy(url, process, 60)
+        load = argparse.Namespace(url=url, requests=100 * n_workers, concurrency=4 * n_workers, seed=0)
+        report = asyncio.run(run(load, texts))
+        assert report['statuses'] == {'200': 100 * n_workers}
+
+        parent = readMemory(process.pid)
+        workers = [readMemory(pid) for pid in getChildren(process.pid)]
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    assert len(workers) == n_workers
+    return parent, workers
+
+
+def test_forked_workers_share_the_model(project, texts):
+    _, workers_1 = measureWorkers(project, 1, texts)
+    parent, workers_n = measureWorkers(project, N_WORKERS, texts)
+
+    mean_uss_1 = sum(x['uss'] for x in workers_1) / len(workers_1)
+    mean_uss_n = sum(x['uss'] for x in workers_n) / len(workers_n)
+    print(f'parent RSS {parent["rss"]:.1f} MB, mean USS of 1 worker {mean_uss_1:.1f} MB, of {N_WORKERS} workers {mean_uss_n:.1f} MB')
+
+    assert mean_uss_n < MAX_USS_MB
+    assert mean_uss_n - mean_uss_1 < MAX_USS_GROWTH_MB
+    # most of the memory of a worker is shared with the parent
+    assert mean_uss_n < parent['rss'] / 2